@@ -0,0 +1,88 @@
+"""Benchmark parsing of time series of a restarted run.
+
+A synthetic time.dat file with restarts is written in a temporary directory
+and parsed with :func:`stagpy.stagyyparsers.time_series`.  The removal of
+lines superseded by restarts is also timed on its own, along with the
+previous line-by-line implementation for reference.
+
+Run with ``python benchmarks/time_series.py [--nlines N]``.
+"""
+
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from stagpy import stagyyparsers
+
+
+def write_time_dat(path, nlines, ncols, nrestarts, seed=0):
+    """Write a time.dat file of a run restarted several times."""
+    rng = np.random.default_rng(seed)
+    chunks = []
+    istep = 0
+    for size in np.diff(np.linspace(0, nlines, nrestarts + 2, dtype=int)):
+        # each restart goes back up to 1000 steps
+        istep = max(istep - rng.integers(1, 1000), 0)
+        chunks.append(np.arange(istep, istep + size))
+        istep += size
+    isteps = np.concatenate(chunks)
+    values = rng.random((nlines, ncols))
+    with path.open('w') as fid:
+        fid.write('istep ' + ' '.join(f'v{i}' for i in range(ncols)) + '\n')
+        np.savetxt(fid, np.column_stack((isteps, values)),
+                   fmt=['%10d'] + ['%15.7E'] * ncols)
+
+
+def drop_restarted_loop(data):
+    """Line-by-line removal of superseded lines, for reference."""
+    rows_to_del = []
+    irow = len(data) - 1
+    while irow > 0:
+        iprev = irow - 1
+        while iprev >= 0 and data.index[irow] <= data.index[iprev]:
+            rows_to_del.append(iprev)
+            iprev -= 1
+        irow = iprev
+    rows_to_keep = sorted(set(range(len(data))) - set(rows_to_del))
+    return data.take(rows_to_keep)
+
+
+def timed(func, *args):
+    """Return output and execution time of a function call."""
+    start = perf_counter()
+    out = func(*args)
+    return out, perf_counter() - start
+
+
+def main():
+    """Run the benchmark."""
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nlines', type=int, default=5_000_000)
+    parser.add_argument('--ncols', type=int, default=4)
+    parser.add_argument('--nrestarts', type=int, default=20)
+    parser.add_argument('--no-reference', action='store_true',
+                        help='do not time the line-by-line implementation')
+    args = parser.parse_args()
+    with TemporaryDirectory() as tmpdir:
+        timefile = Path(tmpdir) / 'time.dat'
+        _, elapsed = timed(write_time_dat, timefile, args.nlines, args.ncols,
+                           args.nrestarts)
+        print(f'wrote {args.nlines} lines in {elapsed:.2f}s')
+        data, elapsed = timed(stagyyparsers.time_series, timefile, [])
+        print(f'time_series: {elapsed:.2f}s, {len(data)} lines kept')
+        raw = pd.read_csv(timefile, delim_whitespace=True, header=None,
+                          skiprows=1, index_col=0)
+    vec, elapsed = timed(stagyyparsers._drop_restarted, raw)
+    print(f'vectorized removal: {elapsed:.3f}s')
+    if not args.no_reference:
+        ref, elapsed = timed(drop_restarted_loop, raw)
+        print(f'line-by-line removal: {elapsed:.3f}s')
+        assert ref.equals(vec)
+
+
+if __name__ == '__main__':
+    main()
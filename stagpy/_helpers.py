@@ -5,6 +5,7 @@ from inspect import getdoc
 from typing import TYPE_CHECKING, Generic, TypeVar
 
 import matplotlib.pyplot as plt
+import numpy as np
 
 from . import conf
 
@@ -162,3 +163,48 @@ class CachedReadOnlyProperty(Generic[T, V]):
     def __set__(self, instance: T, _: Any) -> NoReturn:
         raise AttributeError(
             f'Cannot set {self._name} property of {instance!r}')
+
+
+class GrowingArray:
+    """Array to which rows are appended in amortized constant time.
+
+    Rows are stored in a buffer whose capacity is doubled when it is full,
+    the array being a view of the filled part of the buffer.  Arrays
+    obtained before some rows are discarded are left untouched.
+
+    Args:
+        rows: initial content of the array.  It is not copied, but it is
+            never modified either since the buffer is full at first.
+    """
+
+    def __init__(self, rows: ndarray):
+        self._buffer = np.asarray(rows)
+        self._len = len(rows)
+
+    @property
+    def values(self) -> ndarray:
+        """Content of the array, a view of the buffer."""
+        return self._buffer[:self._len]
+
+    def truncate(self, length: int) -> None:
+        """Discard the rows following the first length rows."""
+        if length >= self._len:
+            return
+        # rows are copied in a new buffer rather than overwritten later on
+        # since previously obtained arrays may still show them
+        buffer = np.empty_like(self._buffer)
+        buffer[:length] = self._buffer[:length]
+        self._buffer = buffer
+        self._len = length
+
+    def append(self, rows: ndarray) -> None:
+        """Append rows at the end of the array."""
+        nrows = self._len + len(rows)
+        dtype = np.result_type(self._buffer, rows)
+        if nrows > len(self._buffer) or dtype != self._buffer.dtype:
+            buffer = np.empty((max(nrows, 2 * len(self._buffer)),
+                               *self._buffer.shape[1:]), dtype=dtype)
+            buffer[:self._len] = self.values
+            self._buffer = buffer
+        self._buffer[self._len:nrows] = rows
+        self._len = nrows
@@ -0,0 +1,294 @@
+"""Persistent indices of snapshots of StagYY outputs.
+
+Note:
+    This module and the classes it defines are internals of StagPy, they
+    should not be used in an external script.  Instead, use the
+    :class:`~stagpy.stagyydata.StagyyData` class.
+"""
+
+from __future__ import annotations
+from hashlib import sha1
+import json
+import os
+from tempfile import NamedTemporaryFile
+import typing
+
+import numpy as np
+
+from . import stagyyparsers
+from .config import CACHE_DIR
+
+if typing.TYPE_CHECKING:
+    from typing import Any, Dict, Iterable, List, Optional, Set
+    from pathlib import Path
+    from .stagyyparsers import XdmfIndex
+
+_VERSION = 1
+_XDMF_VERSION = 2
+_GEOM_KEYS = ('nts', 'ntb', 'aspect', 'ncs', 'ncb', 'rcmb')
+
+
+def index_path(parpath: Path) -> Path:
+    """Return path of the index file of a run.
+
+    Args:
+        parpath: path of the par file of the run.
+
+    Returns:
+        the path of the index file in the StagPy cache directory.
+    """
+    digest = sha1(str(parpath.resolve()).encode()).hexdigest()
+    return CACHE_DIR / 'index' / f'{digest}.json'
+
+
+def _stamps(files: Iterable[Path]) -> Dict[str, List[int]]:
+    """Modification time and size of existing files."""
+    stamps = {}
+    for fpath in files:
+        try:
+            stat = fpath.stat()
+        except OSError:
+            continue
+        stamps[fpath.name] = [stat.st_mtime_ns, stat.st_size]
+    return stamps
+
+
+def _write_json(content: Dict[str, Any], path: Path) -> bool:
+    """Atomically write a JSON file.
+
+    The content is written to a temporary file unique to this writer which
+    then replaces the file, so that concurrent writers in several threads or
+    processes never see a partial file.
+
+    Returns:
+        whether the file was written.
+    """
+    tmp_name = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile('w', dir=path.parent, prefix=f'{path.name}.',
+                                delete=False) as fid:
+            tmp_name = fid.name
+            json.dump(content, fid, separators=(',', ':'))
+        os.replace(tmp_name, path)
+    except OSError:
+        if tmp_name is not None and os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        return False
+    return True
+
+
+class SnapIndex:
+    """Index of snapshots of a run.
+
+    The index maps snapshot indices to the time step, time, and geometry
+    information found in the header of binary field files.  Each entry
+    records the names, modification times and sizes of the files it was
+    built from, and is only trusted as long as these are unchanged.  Entries
+    are filled lazily, and added to the index file when :meth:`save` is
+    called.
+
+    Args:
+        path: path of the index file, None to keep the index in memory only.
+    """
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self._entries = self._load()
+        # entries checked against files and entries to be saved
+        self._valid: Set[int] = set()
+        self._new: Set[int] = set()
+
+    def _load(self) -> Dict[int, Dict[str, Any]]:
+        """Read the index file."""
+        if self.path is None:
+            return {}
+        try:
+            with self.path.open() as fid:
+                content = json.load(fid)
+            if content['version'] != _VERSION:
+                return {}
+            return {int(isnap): entry
+                    for isnap, entry in content['snaps'].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def entry(self, isnap: int,
+              binfiles: Set[Path]) -> Optional[Dict[str, Any]]:
+        """Return index entry of a snapshot.
+
+        The entry is read from the header of one of the binary files if it
+        isn't in the index yet or if the files changed since it was recorded.
+
+        Args:
+            isnap: snapshot index.
+            binfiles: the set of binary files available for this snapshot.
+
+        Returns:
+            a dict with the ``istep``, ``time``, ``files`` and geometry
+            information of the snapshot, None if there is no binary file.
+        """
+        stamps = _stamps(binfiles)
+        if not stamps:
+            return None
+        entry = self._entries.get(isnap)
+        if entry is not None and entry['files'] == stamps:
+            self._valid.add(isnap)
+            return entry
+        header = stagyyparsers.field_header(next(iter(binfiles)))
+        if header is None:
+            return None
+        entry = {'istep': header['ti_step'], 'time': header['ti_ad']}
+        entry.update((key, header[key]) for key in _GEOM_KEYS)
+        entry = {key: np.asarray(val).tolist() for key, val in entry.items()}
+        entry['files'] = stamps
+        self._entries[isnap] = entry
+        self._valid.add(isnap)
+        self._new.add(isnap)
+        return entry
+
+    def stats(self, isnap: int, name: str) -> Optional[Dict[str, float]]:
+        """Return recorded statistics of a field.
+
+        Args:
+            isnap: snapshot index, its entry should have been obtained with
+                :meth:`entry` beforehand.
+            name: name of the field.
+
+        Returns:
+            the statistics recorded with :meth:`set_stats`, None if there are
+            none or if the entry wasn't checked against the files.
+        """
+        if isnap not in self._valid:
+            return None
+        return self._entries[isnap].get('stats', {}).get(name)
+
+    def set_stats(self, isnap: int, name: str,
+                  stats: Dict[str, float]) -> None:
+        """Record statistics of a field, such as its extrema.
+
+        Args:
+            isnap: snapshot index, its entry should have been obtained with
+                :meth:`entry` beforehand.
+            name: name of the field.
+            stats: statistics of the field.
+        """
+        if isnap not in self._valid:
+            return
+        self._entries[isnap].setdefault('stats', {})[name] = stats
+        self._new.add(isnap)
+
+    def save(self) -> None:
+        """Add new entries to the index file.
+
+        Entries found in the index file are kept, so that several processes
+        can work on the same run.  Failing to write the file is not an error,
+        the index is then simply rebuilt the next time.
+        """
+        if self.path is None or not self._new:
+            return
+        entries = self._load()
+        entries.update((isnap, self._entries[isnap]) for isnap in self._new)
+        content = {'version': _VERSION,
+                   'snaps': {str(isnap): entries[isnap]
+                             for isnap in sorted(entries)}}
+        if not _write_json(content, self.path):
+            return
+        self._new.clear()
+
+
+def xdmf_index_path(xdmf_file: Path) -> Path:
+    """Return path of the cached index of an XDMF file.
+
+    Args:
+        xdmf_file: path of the xdmf file.
+
+    Returns:
+        the path of the index file in the StagPy cache directory.
+    """
+    digest = sha1(str(xdmf_file.resolve()).encode()).hexdigest()
+    return CACHE_DIR / 'xdmf' / f'{digest}.json'
+
+
+def _xdmf_snap(content: List[Any]) -> stagyyparsers.XdmfSnap:
+    """Build snapshot record from its JSON representation."""
+    time, mo_lambda, mo_thick_sol, grids = content
+    item = stagyyparsers.XdmfItem
+    return stagyyparsers.XdmfSnap(time, mo_lambda, mo_thick_sol, [
+        stagyyparsers.XdmfGrid(
+            name, geom_type,
+            None if geometry is None else [item(*it) for it in geometry],
+            {att: None if it is None else item(*it)
+             for att, it in attributes.items()})
+        for name, geom_type, geometry, attributes in grids])
+
+
+def _save_xdmf_index(xdmf: XdmfIndex, stamp: List[int], path: Path) -> None:
+    """Write the index file of an XDMF file."""
+    resume = None
+    if xdmf.resume is not None:
+        resume = [xdmf.resume.head.decode('latin-1'), *xdmf.resume[1:]]
+    content = {'version': _XDMF_VERSION, 'file': stamp, 'resume': resume,
+               'snaps': xdmf.snaps}
+    _write_json(content, path)
+
+
+def xdmf_index(xdmf_file: Path, path: Optional[Path]) -> XdmfIndex:
+    """Return index of an XDMF file.
+
+    The index is read from the index file if it was built from an xdmf file
+    with the same modification time and size.  If the xdmf file changed
+    since, the snapshots appended to it are added to the index, see
+    :meth:`~stagpy.stagyyparsers.XdmfIndex.extend`.  Otherwise, the xdmf file
+    is parsed.  The index file is then written, failing to do so is not an
+    error.
+
+    Args:
+        xdmf_file: path of the xdmf file.
+        path: path of the index file, None to always parse the xdmf file.
+
+    Returns:
+        the index of the xdmf file.
+    """
+    stamp = _stamps([xdmf_file]).get(xdmf_file.name)
+    if path is None or stamp is None:
+        return stagyyparsers.XdmfIndex.parse(xdmf_file)
+    xdmf = None
+    try:
+        with path.open() as fid:
+            content = json.load(fid)
+        if content['version'] == _XDMF_VERSION:
+            resume = content['resume']
+            if resume is not None:
+                head, start, end, digest = resume
+                resume = stagyyparsers.XdmfResume(
+                    head.encode('latin-1'), start, end, digest)
+            xdmf = stagyyparsers.XdmfIndex(
+                xdmf_file, [_xdmf_snap(snap) for snap in content['snaps']],
+                resume)
+            if content['file'] == stamp:
+                return xdmf
+    except (OSError, ValueError, KeyError, TypeError):
+        xdmf = None
+    if xdmf is None:
+        xdmf = stagyyparsers.XdmfIndex.parse(xdmf_file)
+    else:
+        xdmf.extend()
+    _save_xdmf_index(xdmf, stamp, path)
+    return xdmf
+
+
+def extend_xdmf_index(xdmf: XdmfIndex, path: Optional[Path]) -> None:
+    """Add snapshots appended to an XDMF file to its index.
+
+    See :meth:`~stagpy.stagyyparsers.XdmfIndex.extend`.  The index file is
+    written as well, failing to do so is not an error.
+
+    Args:
+        xdmf: the index of the xdmf file.
+        path: path of the index file, None to keep the index in memory only.
+    """
+    stamp = _stamps([xdmf.xdmf_file]).get(xdmf.xdmf_file.name)
+    xdmf.extend()
+    if path is not None and stamp is not None:
+        _save_xdmf_index(xdmf, stamp, path)
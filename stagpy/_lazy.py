@@ -0,0 +1,175 @@
+"""Arrays read on demand.
+
+Note:
+    This module and the class it defines are internals of StagPy, they
+    should not be used in an external script.  Instances of
+    :class:`LazyArray` are obtained with :meth:`stagpy._step._Fields.lazy`.
+"""
+
+from __future__ import annotations
+from itertools import product
+import typing
+
+import numpy as np
+
+if typing.TYPE_CHECKING:
+    from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+    from numpy import ndarray
+    from numpy.typing import DTypeLike
+
+
+class LazyArray:
+    """Array whose values are only read when needed.
+
+    The array is split in chunks, the values of a chunk being read together.
+    Indexing the array reads only the chunks intersecting the requested
+    region, and reductions are performed one chunk at a time so that the
+    whole array is never held in memory.  Use :func:`numpy.asarray` to obtain
+    the full array.
+
+    Args:
+        read: function returning the values of the array in a region defined
+            by a slice along each dimension.
+        edges: for each dimension, indices of the first element of each
+            chunk followed by the size of the array along that dimension.
+        dtype: data type of the values.
+
+    Attributes:
+        edges: boundaries of the chunks along each dimension.
+        dtype: data type of the values.
+    """
+
+    def __init__(self, read: Callable[[Tuple[slice, ...]], ndarray],
+                 edges: Iterable[Iterable[int]], dtype: DTypeLike):
+        self._read = read
+        self.edges = [tuple(int(edge) for edge in dim_edges)
+                      for dim_edges in edges]
+        self.dtype = np.dtype(dtype)
+
+    @classmethod
+    def from_array(cls, values: ndarray) -> LazyArray:
+        """Wrap an array already in memory in a single chunk."""
+        return cls(values.__getitem__, [(0, size) for size in values.shape],
+                   values.dtype)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """Shape of the array."""
+        return tuple(dim_edges[-1] for dim_edges in self.edges)
+
+    @property
+    def ndim(self) -> int:
+        """Number of dimensions of the array."""
+        return len(self.edges)
+
+    @property
+    def size(self) -> int:
+        """Number of elements of the array."""
+        return int(np.prod(self.shape))
+
+    @property
+    def nchunks(self) -> int:
+        """Number of chunks."""
+        return int(np.prod([len(dim_edges) - 1 for dim_edges in self.edges]))
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __repr__(self) -> str:
+        return (f'LazyArray(shape={self.shape}, dtype={self.dtype}, '
+                f'nchunks={self.nchunks})')
+
+    def __getitem__(self, key: Any) -> ndarray:
+        """Read a region of the array.
+
+        Only basic indexing (integers, slices, and ellipsis) is supported.
+        """
+        if not isinstance(key, tuple):
+            key = (key,)
+        if key.count(Ellipsis) > 1:
+            raise IndexError('an index can only have a single ellipsis')
+        if Ellipsis in key:
+            iell = key.index(Ellipsis)
+            fill = (slice(None),) * (self.ndim - len(key) + 1)
+            key = key[:iell] + fill + key[iell + 1:]
+        if len(key) > self.ndim:
+            raise IndexError(f'too many indices for array: array is '
+                             f'{self.ndim}-dimensional, but {len(key)} were '
+                             'indexed')
+        key = key + (slice(None),) * (self.ndim - len(key))
+        box = []
+        for idx, size in zip(key, self.shape):
+            if isinstance(idx, slice):
+                box.append(idx)
+                continue
+            try:
+                idx = int(idx)
+            except TypeError:
+                raise IndexError('only integers, slices and ellipsis are '
+                                 'valid indices of a LazyArray')
+            if not -size <= idx < size:
+                raise IndexError(f'index {idx} is out of bounds for axis '
+                                 f'with size {size}')
+            idx %= size
+            box.append(slice(idx, idx + 1))
+        # dimensions indexed with an integer are removed
+        squeeze: Tuple[Any, ...] = tuple(
+            slice(None) if isinstance(idx, slice) else 0 for idx in key)
+        return self._read(tuple(box))[squeeze]
+
+    def __array__(self, dtype: Optional[DTypeLike] = None,
+                  copy: Optional[bool] = None) -> ndarray:
+        values = self[...]
+        return values if dtype is None else values.astype(dtype, copy=False)
+
+    def chunks(self) -> Iterator[Tuple[Tuple[slice, ...], ndarray]]:
+        """Iterate through chunks.
+
+        Yields:
+            tuple (region, values) where region is the location of the chunk
+            in the array as a slice along each dimension.
+        """
+        ranges = [[slice(start, stop) for start, stop
+                   in zip(dim_edges[:-1], dim_edges[1:]) if stop > start]
+                  for dim_edges in self.edges]
+        for region in product(*ranges):
+            yield region, self._read(region)
+
+    def sum(self) -> Any:
+        """Sum of all the elements of the array."""
+        return sum((np.sum(values, dtype=np.float64)
+                    for _, values in self.chunks()), np.float64(0))
+
+    def mean(self) -> Any:
+        """Mean of all the elements of the array."""
+        return self.sum() / self.size
+
+    def min(self) -> Any:
+        """Minimum of the array."""
+        return min(np.min(values) for _, values in self.chunks())
+
+    def max(self) -> Any:
+        """Maximum of the array."""
+        return max(np.max(values) for _, values in self.chunks())
+
+    def histogram(
+        self, bins: int = 10, range: Optional[Tuple[float, float]] = None
+    ) -> Tuple[ndarray, ndarray]:
+        """Histogram of the values of the array.
+
+        Args:
+            bins: number of bins.
+            range: lower and upper bounds of the bins.  If set to None, the
+                minimum and maximum of the array are used, which requires
+                reading the array twice.
+        Returns:
+            the histogram and the edges of the bins, see
+            :func:`numpy.histogram`.
+        """
+        if range is None:
+            range = (self.min(), self.max())
+        hist = np.zeros(bins, dtype=np.int64)
+        bin_edges = np.histogram_bin_edges([], bins, range)
+        for _, values in self.chunks():
+            hist += np.histogram(values, bin_edges)[0]
+        return hist, bin_edges
@@ -15,11 +15,13 @@ import numpy as np
 
 from . import error, phyvars, stagyyparsers
 from ._helpers import CachedReadOnlyProperty as crop
-from .datatypes import Field, Rprof, Varr
+from ._lazy import LazyArray
+from .datatypes import Field, LazyField, Rprof, Varr
 
 if typing.TYPE_CHECKING:
-    from typing import (Dict, Any, Mapping, List, Iterator, Tuple, Optional,
-                        Callable, NoReturn)
+    from typing import (Dict, Any, Mapping, List, Iterable, Iterator, Tuple,
+                        Optional, Callable, NoReturn, Union)
+    from pathlib import Path
     from numpy import ndarray
     from pandas import DataFrame, Series
     from .datatypes import Varf
@@ -255,22 +257,32 @@ class _Fields(abc.Mapping):
 
     def __getitem__(self, name: str) -> Field:
         if name in self._data:
+            self.step.sdat.fields_cache.touch(self.step.istep, name)
             return self._data[name]
         if name in self._vars:
             fld_names, parsed_data = self._get_raw_data(name)
         elif name in self._extra:
-            self._data[name] = self._extra[name](self.step)
+            fld = self._extra[name](self.step)
+            self._data[name] = Field(
+                fld.values.astype(self.step.sdat.dtype, copy=False), fld.meta)
             return self._data[name]
         else:
             raise error.UnknownFieldVarError(name)
         if parsed_data is None:
             raise error.MissingDataError(
                 f'Missing field {name} in step {self.step.istep}')
+        return self._install(name, fld_names, parsed_data)
+
+    def _install(self, name: str, fld_names: List[str],
+                 parsed_data: Any) -> Field:
+        """Set fields obtained with :meth:`_get_raw_data`."""
         header, fields = parsed_data
         self._cropped__header = header
         for fld_name, fld in zip(fld_names, fields):
-            self._set(fld_name, fld)
-        return self._data[name]
+            if fld_name != name:
+                self._set(fld_name, fld)
+        # requested field is set last so that it is the most recently used
+        return self._set(name, fields[fld_names.index(name)])
 
     @crop
     def _present_fields(self) -> List[str]:
@@ -292,22 +304,53 @@ class _Fields(abc.Mapping):
     def __eq__(self, other: object) -> bool:
         return self is other
 
-    def _get_raw_data(self, name: str) -> Tuple[List[str], Any]:
-        """Find file holding data and return its content."""
-        # try legacy first, then hdf5
-        filestem = ''
+    def _legacy_file(self, name: str) -> Optional[Tuple[Path, List[str]]]:
+        """Find the legacy binary file holding a field.
+
+        Returns:
+            the path of the file and the list of variables it holds, None if
+            the field isn't available in legacy format.
+        """
+        if self.step.isnap is None:
+            return None
         for filestem, list_fvar in self._files.items():
             if name in list_fvar:
                 break
-        parsed_data = None
-        if self.step.isnap is None:
-            return list_fvar, None
+        else:
+            return None
         fieldfile = self.step.sdat.filename(filestem, self.step.isnap,
                                             force_legacy=True)
         if not fieldfile.is_file():
             fieldfile = self.step.sdat.filename(filestem, self.step.isnap)
-        if fieldfile.is_file():
-            parsed_data = stagyyparsers.fields(fieldfile)
+        return (fieldfile, list_fvar) if fieldfile.is_file() else None
+
+    def _get_raw_data(
+        self, name: str, box: Optional[Tuple[slice, ...]] = None
+    ) -> Tuple[List[str], Any]:
+        """Find file holding data and return its content.
+
+        Only the requested variable is extracted from files holding several
+        variables when possible.  The list of names of extracted variables is
+        returned along with the parsed data.  If box is not None, only this
+        region of the fields is returned.
+        """
+        parsed_data = None
+        if self.step.isnap is None:
+            return [name], None
+        runstore = self.step.sdat._store
+        if runstore is not None:
+            values = runstore.field(self.step.isnap, name, box)
+            if values is None:
+                return [name], None
+            values = values.astype(self.step.sdat.dtype, copy=False)
+            return [name], (self._header, values[np.newaxis])
+        # try legacy first, then hdf5
+        legacy = self._legacy_file(name)
+        if legacy is not None:
+            fieldfile, list_fvar = legacy
+            parsed_data = stagyyparsers.fields(
+                fieldfile, ivars=[list_fvar.index(name)], box=box,
+                dtype=self.step.sdat.dtype)
         elif self.step.sdat.hdf5 and self._filesh5:
             # files in which the requested data can be found
             files = [(stem, fvars) for stem, fvars in self._filesh5.items()
@@ -316,30 +359,149 @@ class _Fields(abc.Mapping):
                 if filestem in phyvars.SFIELD_FILES_H5:
                     xmff = 'Data{}.xmf'.format(
                         'Bottom' if name.endswith('bot') else 'Surface')
-                    header = self._header
+                    if not (self.step.sdat.hdf5 / xmff).is_file():
+                        continue
+                    header: Optional[Dict[str, Any]] = self._header
                 else:
                     xmff = 'Data.xmf'
-                    header = None
+                    # geometry is read along with the field unless only part
+                    # of the field is needed
+                    header = None if box is None else self._header
                 parsed_data = stagyyparsers.read_field_h5(
                     self.step.sdat.hdf5 / xmff, filestem,
-                    self.step.isnap, header)
+                    self.step.isnap, header, ivars=[list_fvar.index(name)],
+                    xdmf=self.step.sdat._xdmf(xmff),
+                    h5pool=self.step.sdat._h5pool, box=box,
+                    dtype=self.step.sdat.dtype)
                 if parsed_data is not None:
+                    if parsed_data[1].shape[0] == len(list_fvar):
+                        # all components had to be read
+                        return list_fvar, parsed_data
                     break
-        return list_fvar, parsed_data
+        return [name], parsed_data
+
+    def sliced(self, name: str, ix: Union[int, slice] = slice(None),
+               iy: Union[int, slice] = slice(None),
+               iz: Union[int, slice] = slice(None)) -> Field:
+        """Return part of a field.
+
+        For fields that are not in memory yet, only the requested part is
+        read when possible, and it isn't kept in memory.  This is the case in
+        legacy binary files and HDF5 outputs of 3D runs (except for vector
+        fields in spherical geometry), where only the subdomains intersecting
+        the requested part are read.  Otherwise, the whole field is obtained
+        and then sliced.
+
+        Args:
+            name: name of the field.
+            ix: index or slice along the x/theta direction.
+            iy: index or slice along the y/phi direction.
+            iz: index or slice along the z/r direction, ignored for surface
+                fields.
+        Returns:
+            the requested part of the field.  Directions indexed with an
+            integer are removed from its values, like with numpy indexing.
+        """
+        indices = (ix, iy, iz)
+        if (name in self._data or name not in self._vars or
+                name in phyvars.SFIELD):
+            fld = self[name]
+            ndim = fld.values.ndim - 1
+            return Field(fld.values[indices[:ndim]], fld.meta)
+        box = tuple(slice(idx, idx + 1 or None) if isinstance(idx, int)
+                    else idx for idx in indices)
+        fld_names, parsed_data = self._get_raw_data(name, box)
+        if parsed_data is None:
+            raise error.MissingDataError(
+                f'Missing field {name} in step {self.step.istep}')
+        values = parsed_data[1][fld_names.index(name)]
+        ndim = values.ndim - 1
+        values = values[tuple(0 if isinstance(idx, int) else slice(None)
+                              for idx in indices[:ndim])]
+        return Field(values, self._vars[name])
 
-    def _set(self, name: str, fld: ndarray) -> None:
-        sdat = self.step.sdat
-        col_fld = sdat._collected_fields
-        col_fld.append((self.step.istep, name))
-        if sdat.nfields_max is not None:
-            while len(col_fld) > sdat.nfields_max:
-                istep, fld_name = col_fld.pop(0)
-                del sdat.steps[istep].fields[fld_name]
+    def _subdomain_edges(self, name: str) -> Optional[List[ndarray]]:
+        """Boundaries of the subdomains of a field that are read separately.
+
+        None is returned if the field cannot be read by parts.
+        """
+        runstore = self.step.sdat._store
+        if runstore is not None:
+            assert self.step.isnap is not None
+            shape = runstore.field_shape(self.step.isnap, name)
+            header = self._header
+            if shape is None or header is None or 'ncs' not in header:
+                return None
+            edges = stagyyparsers.subdomain_edges({**header, 'xyp': 0})
+            for dim_edges, size in zip(edges, shape):
+                dim_edges[-1] = size
+            return edges
+        legacy = self._legacy_file(name)
+        if legacy is not None:
+            header = stagyyparsers.field_header(legacy[0])
+            return (None if header is None
+                    else stagyyparsers.subdomain_edges(header))
+        ncomps = [len(fvars) for fvars in self._filesh5.values()
+                  if name in fvars]
+        header = self._header if self.step.sdat.hdf5 and ncomps else None
+        if header is None or min(header['nts']) == 1:
+            return None
+        vector = ncomps[0] == 3
+        if vector and header['rcmb'] >= 0:
+            # components of spherical vectors are read together
+            return None
+        return stagyyparsers.subdomain_edges({**header, 'xyp': int(vector)})
+
+    def lazy(self, name: str) -> LazyField:
+        """Return a field whose values are read on demand.
+
+        The values of the returned field are a
+        :class:`~stagpy._lazy.LazyArray` split in chunks matching the
+        parallel subdomains in which StagYY wrote the field, i.e. the blocks
+        of each CPU in legacy binary files and the datasets of each core in
+        HDF5 outputs.  Indexing it and computing reductions only reads the
+        relevant subdomains, and the values read are not kept in memory.
+        Fields that are already in memory, surface fields, derived fields,
+        and fields that cannot be read by parts (2D HDF5 outputs and vector
+        fields in spherical HDF5 outputs) are obtained with
+        :meth:`__getitem__` and wrapped in a single chunk.
+
+        Args:
+            name: name of the field.
+        Returns:
+            the field with its values read on demand.
+        """
+        edges = None
+        if (name not in self._data and name in self._vars and
+                name not in phyvars.SFIELD):
+            edges = self._subdomain_edges(name)
+        if edges is None:
+            fld = self[name]
+            return LazyField(LazyArray.from_array(fld.values), fld.meta)
+
+        def read(box: Tuple[slice, ...]) -> ndarray:
+            if name in self._data:
+                return self._data[name].values[box]
+            fld_names, parsed_data = self._get_raw_data(name, box)
+            if parsed_data is None:
+                raise error.MissingDataError(
+                    f'Missing field {name} in step {self.step.istep}')
+            return parsed_data[1][fld_names.index(name)]
+
+        # check that the field is available without reading it
+        read(tuple(slice(0, 0) for _ in edges))
+        return LazyField(LazyArray(read, edges, self.step.sdat.dtype),
+                         self._vars[name])
+
+    def _set(self, name: str, fld: ndarray) -> Field:
         self._data[name] = Field(fld, self._vars[name])
+        self.step.sdat.fields_cache.insert(self, name)
+        return self._data[name]
 
     def __delitem__(self, name: str) -> None:
         if name in self._data:
             del self._data[name]
+            self.step.sdat.fields_cache.remove(self.step.istep, name)
 
     @crop
     def _header(self) -> Optional[Dict[str, Any]]:
@@ -347,11 +509,15 @@ class _Fields(abc.Mapping):
             return None
         binfiles = self.step.sdat._binfiles_set(self.step.isnap)
         header = None
-        if binfiles:
+        if self.step.sdat._store is not None:
+            header = self.step.sdat._store.header(self.step.isnap)
+        elif binfiles:
             header = stagyyparsers.field_header(binfiles.pop())
         elif self.step.sdat.hdf5:
             xmf = self.step.sdat.hdf5 / 'Data.xmf'
-            header = stagyyparsers.read_geom_h5(xmf, self.step.isnap)[0]
+            header = stagyyparsers.read_geom_h5(
+                xmf, self.step.isnap, self.step.sdat._xdmf(xmf.name),
+                self.step.sdat._h5pool, self.step.sdat.dtype)[0]
         return header if header else None
 
     @crop
@@ -376,6 +542,13 @@ class _Tracers:
     names such as 'Type' or 'Mass'.  The position of tracers are the 'x', 'y'
     and 'z' items.
 
+    Each attribute read from a binary tracers file is extracted from the
+    records of all tracers, which takes a pass over the whole file.  Getting
+    an item only reads that attribute (or the three positions for the 'x',
+    'y' and 'z' items) to keep memory usage low, at the cost of one pass per
+    item.  Use :meth:`load` to read several attributes in a single pass when
+    they are all needed.
+
     Attributes:
         step: the :class:`Step` owning the :class:`_Tracers` instance.
     """
@@ -385,24 +558,56 @@ class _Tracers:
         self._data: Dict[str, Optional[List[ndarray]]] = {}
 
     def __getitem__(self, name: str) -> Optional[List[ndarray]]:
-        if name in self._data:
-            return self._data[name]
-        if self.step.isnap is None:
-            return None
+        positions = ('x', 'y', 'z')
+        if name in positions:
+            return self.load(positions)[name]
+        return self.load([name])[name]
+
+    def load(
+        self, names: Iterable[str]
+    ) -> Dict[str, Optional[List[ndarray]]]:
+        """Read several tracers attributes at once.
+
+        Attributes that are not in memory yet are read together, in a single
+        pass over the output files.  Only the requested attributes are read,
+        in particular positions of tracers are only read if the ``'x'``,
+        ``'y'`` or ``'z'`` items are requested.
+
+        Args:
+            names: names of the attributes.
+        Returns:
+            the data of each attribute, organized by block.  It is None for
+            attributes that aren't available.
+        """
+        names = list(names)
+        missing = [name for name in dict.fromkeys(names)
+                   if name not in self._data]
+        if missing:
+            self._data.update(self._read(missing))
+            for name in missing:
+                self._data.setdefault(name, None)
+        return {name: self._data[name] for name in names}
+
+    def _read(self, names: List[str]) -> Dict[str, List[ndarray]]:
+        """Read tracers attributes from output files."""
+        isnap = self.step.isnap
+        sdat = self.step.sdat
+        if isnap is None:
+            return {}
+        if sdat._store is not None:
+            stored = ((name, sdat._store.tracers(isnap, name))
+                      for name in names)
+            return {name: data for name, data in stored if data is not None}
         data = stagyyparsers.tracers(
-            self.step.sdat.filename('tra', timestep=self.step.isnap,
-                                    force_legacy=True))
-        if data is None and self.step.sdat.hdf5:
-            position = any(axis not in self._data for axis in 'xyz')
-            self._data.update(
-                stagyyparsers.read_tracers_h5(
-                    self.step.sdat.hdf5 / 'DataTracers.xmf', name,
-                    self.step.isnap, position))
-        elif data is not None:
-            self._data.update(data)
-        if name not in self._data:
-            self._data[name] = None
-        return self._data[name]
+            sdat.filename('tra', timestep=isnap, force_legacy=True),
+            names=names)
+        if data is not None:
+            return data
+        if sdat.hdf5 and (sdat.hdf5 / 'DataTracers.xmf').is_file():
+            return stagyyparsers.read_tracers_h5(
+                sdat.hdf5 / 'DataTracers.xmf', names, isnap,
+                sdat._xdmf('DataTracers.xmf'), sdat._h5pool)
+        return {}
 
     def __iter__(self) -> NoReturn:
         raise TypeError('tracers collection is not iterable')
@@ -596,18 +801,5 @@ class Step:
         It is None if no snapshot exists for the time step.
         """
         if self._isnap == -1:
-            istep = None
-            isnap = -1
-            # could be more efficient if do 0 and -1 then bisection
-            # (but loose intermediate <- would probably use too much
-            # memory for what it's worth if search algo is efficient)
-            while (istep is None or istep < self.istep) and isnap < 99999:
-                isnap += 1
-                try:
-                    istep = self.sdat.snaps[isnap].istep
-                except KeyError:
-                    pass
-                # all intermediate istep could have their ._isnap to None
-            if istep != self.istep:
-                self._isnap = None
+            self._isnap = self.sdat.snaps._isnap_of(self.istep)
         return self._isnap
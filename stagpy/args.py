@@ -10,7 +10,8 @@ from loam.cli import Subcmd, CLIManager
 
 from . import __doc__ as doc_module
 from . import conf, PARSING_OUT, load_mplstyle
-from . import commands, field, rprof, time_series, refstate, plates
+from . import (commands, field, rprof, time_series, refstate, plates,
+               watch)
 from ._helpers import baredoc
 from .config import CONFIG_DIR
 
@@ -37,6 +38,8 @@ SUB_CMDS = MappingProxyType({
     'time': _sub(time_series, 'core', 'plot', 'scaling'),
     'refstate': _sub(refstate, 'core', 'plot'),
     'plates': _sub(plates, 'core', 'plot', 'scaling'),
+    'watch': _sub(watch, 'core', 'plot', 'scaling'),
+    'convert': _sub(commands.convert_cmd, 'core'),
     'info': _sub(commands.info_cmd, 'core', 'scaling'),
     'var': _sub(commands.var_cmd),
     'version': _sub(commands.version_cmd),
@@ -12,9 +12,9 @@ import loam.tools
 import pandas
 
 from . import conf, phyvars, __version__
-from . import stagyydata
+from . import stagyydata, store
 from .config import CONFIG_FILE, CONFIG_LOCAL
-from ._helpers import baredoc
+from ._helpers import baredoc, out_name
 
 if typing.TYPE_CHECKING:
     from typing import (Sequence, Tuple, Optional, Mapping, Callable, Union,
@@ -73,6 +73,23 @@ def info_cmd() -> None:
         print()
 
 
+def convert_cmd() -> None:
+    """Export StagYY run to a chunked store.
+
+    The store can be read back with :class:`~stagpy.stagyydata.StagyyData`,
+    see :func:`stagpy.store.convert`.
+
+    Other Parameters:
+        conf.convert
+    """
+    fmt = conf.convert.format
+    dest = conf.convert.dest
+    if dest is None:
+        dest = out_name('store') + ('.h5' if fmt == 'h5' else '')
+    sdat = stagyydata.StagyyData()
+    print(f'Run in {sdat.path} exported to {store.convert(sdat, dest, fmt)}')
+
+
 def _pretty_print(key_val: Sequence[Tuple[str, str]], sep: str = ': ',
                   min_col_width: int = 39,
                   text_width: Optional[int] = None) -> None:
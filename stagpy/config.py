@@ -47,6 +47,7 @@ HOME_DIR = pathlib.Path.home()
 CONFIG_DIR = HOME_DIR / '.config' / 'stagpy'
 CONFIG_FILE = CONFIG_DIR / 'config.toml'
 CONFIG_LOCAL = pathlib.Path('.stagpy.toml')
+CACHE_DIR = HOME_DIR / '.cache' / 'stagpy'
 
 CONF_DEF = {}
 
@@ -66,6 +67,11 @@ CONF_DEF['core'] = dict(
     snapshots=Conf(None, True, 's',
                    {'nargs': '?', 'const': '', 'type': _index_collection},
                    False, 'snapshots slice'),
+    index=switch_opt(True, None, 'keep an index of snapshots on disk'),
+    prefetch=Conf(0, True, None, {'type': int},
+                  True, 'number of snapshots read in advance'),
+    dtype=Conf('float64', True, None, {'choices': ['float32', 'float64']},
+               True, 'floating point type of fields'),
 )
 
 CONF_DEF['plot'] = dict(
@@ -79,6 +85,8 @@ CONF_DEF['plot'] = dict(
     vmax=Conf(None, True, None, {'type': float},
               False, 'maximal value on plot'),
     cminmax=switch_opt(False, 'C', 'constant min max across plots'),
+    cpercentile=Conf(None, True, None, {'type': float}, False,
+                     'percentile used as min max with cminmax'),
     isolines=Conf(None, True, None, {'type': _float_list},
                   False, 'arbitrary isoline value, comma separated'),
     mplstyle=Conf('stagpy-paper', True, None,
@@ -121,6 +129,8 @@ CONF_DEF['field'] = dict(
                'sII': 'plasma_r',
                'edot': 'Reds'},
               False, None, {}, True, 'custom colormaps'),
+    jobs=Conf(1, True, 'j', {'type': int},
+              False, 'number of processes plotting snapshots'),
 )
 
 CONF_DEF['rprof'] = dict(
@@ -128,6 +138,8 @@ CONF_DEF['rprof'] = dict(
               True, 'variables to plot (see stagpy var)'),
     style=Conf('-', True, None, {}, True, 'matplotlib line style'),
     average=switch_opt(False, 'a', 'plot temporal average'),
+    tweight=switch_opt(False, None,
+                       'weight temporal average by time span of steps'),
     grid=switch_opt(False, 'g', 'plot grid'),
     depth=switch_opt(False, 'd', 'depth as vertical axis'),
 )
@@ -175,6 +187,25 @@ CONF_DEF['plates'] = dict(
     zoom=Conf(None, True, None, {'type': float}, False, 'zoom around surface'),
 )
 
+CONF_DEF['watch'] = dict(
+    time=Conf('Nutop,ebalance,Nubot.Tmean', True, None,
+              {'nargs': '?', 'const': ''},
+              True, 'time series to plot (see stagpy var)'),
+    field=Conf('T,stream', True, None, {'nargs': '?', 'const': ''},
+               True, 'fields of the last snapshot to plot (see stagpy var)'),
+    interval=Conf(60., True, 'i', {'type': float},
+                  True, 'seconds between checks for new data'),
+    nchecks=Conf(None, True, None, {'type': int},
+                 False, 'number of checks before exiting, no limit if unset'),
+)
+
+CONF_DEF['convert'] = dict(
+    dest=Conf(None, True, 'd', {}, False,
+              'path of the store, defaults to {outname}_store[.h5]'),
+    format=Conf('h5', True, 'f', {'choices': ['h5', 'npy']},
+                True, 'format of the store'),
+)
+
 CONF_DEF['info'] = dict(
     output=Conf('t,Tmean,vrms,Nutop,Nubot', True, 'o', {},
                 True, 'time series to print'),
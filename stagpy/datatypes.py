@@ -5,6 +5,7 @@ from typing import NamedTuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from numpy import ndarray
+    from ._lazy import LazyArray
 
 
 class Varf(NamedTuple):
@@ -32,6 +33,18 @@ class Field(NamedTuple):
     meta: Varf
 
 
+class LazyField(NamedTuple):
+    """Scalar field read on demand and associated metadata.
+
+    Attributes:
+        values: the field itself, its values are only read when needed.
+        meta: the metadata of the field.
+    """
+
+    values: LazyArray
+    meta: Varf
+
+
 class Varr(NamedTuple):
     """Metadata of radial profiles.
 
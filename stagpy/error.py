@@ -105,6 +105,20 @@ class ParsingError(StagpyError):
         super().__init__(file, msg)
 
 
+class StoreError(StagpyError):
+    """Raised when a store of a run cannot be written or read.
+
+    Attributes:
+        path: path of the store.
+        msg: error message.
+    """
+
+    def __init__(self, path: PathLike, msg: str):
+        self.path = path
+        self.msg = msg
+        super().__init__(path, msg)
+
+
 class InvalidTimestepError(StagpyError, KeyError):
     """Raised when invalid time step is requested.
 
@@ -1,6 +1,8 @@
 """Plot scalar and vector fields."""
 
 from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from itertools import chain
 import typing
 
@@ -11,11 +13,12 @@ import matplotlib.patches as mpat
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 
 from . import conf, phyvars, _helpers
+from .datatypes import Field
 from .error import NotAvailableError
 from .stagyydata import StagyyData
 
 if typing.TYPE_CHECKING:
-    from typing import Tuple, Optional, Any, Iterable, Dict
+    from typing import Tuple, Optional, Any, Iterable, Dict, Set, List
     from numpy import ndarray
     from matplotlib.axes import Axes
     from matplotlib.figure import Figure
@@ -32,7 +35,10 @@ if typing.TYPE_CHECKING:
 def _threed_extract(
     step: Step, var: str, walls: bool = False
 ) -> Tuple[Tuple[ndarray, ndarray], Any]:
-    """Return suitable slices and coords for 3D fields."""
+    """Return suitable slices and coords for 3D fields.
+
+    Only the relevant slices are read from HDF5 files when possible.
+    """
     is_vector = not valid_field_var(var)
     hwalls = is_vector or walls
     i_x = conf.field.ix
@@ -59,11 +65,13 @@ def _threed_extract(
         ycoord = step.geom.y_walls if hwalls else step.geom.y_centers
         i_x = i_y = slice(None)
         varx, vary = var + '1', var + '2'
+    data: Any
     if is_vector:
-        data = (step.fields[varx].values[i_x, i_y, i_z, 0],
-                step.fields[vary].values[i_x, i_y, i_z, 0])
+        data = (step.fields.sliced(varx, i_x, i_y, i_z).values[..., 0],
+                step.fields.sliced(vary, i_x, i_y, i_z).values[..., 0])
     else:
-        data = step.fields[var].values[i_x, i_y, i_z, 0]
+        fld = step.fields.sliced(var, i_x, i_y, i_z)
+        data = Field(fld.values[..., 0], fld.meta)
     return (xcoord, ycoord), data
 
 
@@ -95,22 +103,23 @@ def get_meshes_fld(
         x position, y position, the values and the metadata of the requested
         field.
     """
-    fld, meta = step.fields[var]
-    hwalls = (walls or fld.shape[0] != step.geom.nxtot or
-              fld.shape[1] != step.geom.nytot)
     if step.geom.threed and step.geom.cartesian:
-        (xcoord, ycoord), fld = _threed_extract(step, var, walls)
-    elif step.geom.twod_xz:
-        xcoord = step.geom.x_walls if hwalls else step.geom.x_centers
-        ycoord = step.geom.z_walls if walls else step.geom.z_centers
-        fld = fld[:, 0, :, 0]
-    else:  # twod_yz
-        xcoord = step.geom.y_walls if hwalls else step.geom.y_centers
-        ycoord = step.geom.z_walls if walls else step.geom.z_centers
-        if step.geom.curvilinear:
-            pmesh, rmesh = np.meshgrid(xcoord, ycoord, indexing='ij')
-            xmesh, ymesh = rmesh * np.cos(pmesh), rmesh * np.sin(pmesh)
-        fld = fld[0, :, :, 0]
+        (xcoord, ycoord), (fld, meta) = _threed_extract(step, var, walls)
+    else:
+        fld, meta = step.fields[var]
+        hwalls = (walls or fld.shape[0] != step.geom.nxtot or
+                  fld.shape[1] != step.geom.nytot)
+        if step.geom.twod_xz:
+            xcoord = step.geom.x_walls if hwalls else step.geom.x_centers
+            ycoord = step.geom.z_walls if walls else step.geom.z_centers
+            fld = fld[:, 0, :, 0]
+        else:  # twod_yz
+            xcoord = step.geom.y_walls if hwalls else step.geom.y_centers
+            ycoord = step.geom.z_walls if walls else step.geom.z_centers
+            if step.geom.curvilinear:
+                pmesh, rmesh = np.meshgrid(xcoord, ycoord, indexing='ij')
+                xmesh, ymesh = rmesh * np.cos(pmesh), rmesh * np.sin(pmesh)
+            fld = fld[0, :, :, 0]
     if step.geom.cartesian:
         xmesh, ymesh = np.meshgrid(xcoord, ycoord, indexing='ij')
     return xmesh, ymesh, fld, meta
@@ -308,52 +317,113 @@ def plot_vec(axis: Axes, step: Step, var: str) -> None:
                 linewidths=1)
 
 
+def _stats_keys(percentile: Optional[float]) -> List[str]:
+    """Names of statistics giving the color limits of a field."""
+    if percentile is None:
+        return ['min', 'max']
+    return [f'p{percentile:g}', f'p{100 - percentile:g}']
+
+
+def _field_stats(step: Step, var: str,
+                 percentile: Optional[float]) -> Optional[Dict[str, float]]:
+    """Compute extrema and percentiles of a field.
+
+    The field is not kept in the fields cache.  None is returned if the field
+    is not available.
+    """
+    fields = step.fields
+    if var in fields._data or var not in fields._vars:
+        if var not in fields:
+            return None
+        values = fields[var].values
+    else:
+        fld_names, parsed_data = fields._get_raw_data(var)
+        if parsed_data is None:
+            return None
+        values = parsed_data[1][fld_names.index(var)]
+    stats = {'min': float(np.nanmin(values)), 'max': float(np.nanmax(values))}
+    if percentile is not None:
+        keys = _stats_keys(percentile)
+        bounds = np.nanpercentile(values, [percentile, 100 - percentile])
+        stats.update(zip(keys, map(float, bounds)))
+    return stats
+
+
 def _findminmax(
     sdat: StagyyData, sovs: Iterable[str]
 ) -> Dict[str, Tuple[float, float]]:
-    """Find min and max values of several fields."""
-    minmax: Dict[str, Tuple[float, float]] = {}
-    for step in sdat.walk.filter(snap=True):
-        for var in sovs:
-            if var in step.fields:
-                field, meta = step.fields[var]
-                field, _ = sdat.scale(field, meta.dim)
-                if var in minmax:
-                    minmax[var] = (min(minmax[var][0], np.nanmin(field)),
-                                   max(minmax[var][1], np.nanmax(field)))
-                else:
-                    minmax[var] = np.nanmin(field), np.nanmax(field)
-    return minmax
-
+    """Find min and max values of several fields.
 
-def cmd() -> None:
-    """Implementation of field subcommand.
+    Statistics of each snapshot are recorded in the snapshot index of the
+    run, so that they are only computed once.  Missing statistics are
+    computed in ``conf.field.jobs`` threads.
 
     Other Parameters:
-        conf.field
-        conf.core
+        conf.plot.cpercentile: if set, the color limits are the lowest and
+            highest percentiles of that order rather than the extrema.
     """
-    sdat = StagyyData()
-    lovs = _helpers.list_of_vars(conf.field.plot)
-    # no more than two fields in a subplot
-    lovs = [[slov[:2] for slov in plov] for plov in lovs]
-    minmax = {}
-    if conf.plot.cminmax:
-        conf.plot.vmin = None
-        conf.plot.vmax = None
-        sovs = set(slov[0] for plov in lovs for slov in plov)
-        minmax = _findminmax(sdat, sovs)
+    percentile = conf.plot.cpercentile
+    keys = _stats_keys(percentile)
+    index = sdat._snap_index
+    stats: Dict[Tuple[int, str], Optional[Dict[str, float]]] = {}
+    # fields of a snapshot share lazily read state such as their header,
+    # they are therefore handled by the same thread
+    todo: List[Tuple[Step, List[str]]] = []
     for step in sdat.walk.filter(snap=True):
-        for vfig in lovs:
-            fig, axes = plt.subplots(ncols=len(vfig), squeeze=False,
-                                     figsize=(6 * len(vfig), 6))
+        assert step.isnap is not None
+        missing = []
+        for var in sovs:
+            known = index.stats(step.isnap, var)
+            if known is not None and all(key in known for key in keys):
+                stats[step.isnap, var] = known
+            else:
+                missing.append(var)
+        if missing:
+            todo.append((step, missing))
+    with ThreadPoolExecutor(max(conf.field.jobs, 1)) as pool:
+        computed = pool.map(
+            lambda job: [_field_stats(job[0], var, percentile)
+                         for var in job[1]], todo)
+        for (step, svars), sstats in zip(todo, computed):
+            assert step.isnap is not None
+            for var, fstats in zip(svars, sstats):
+                stats[step.isnap, var] = fstats
+                if fstats is not None:
+                    index.set_stats(step.isnap, var, fstats)
+    minmax: Dict[str, Tuple[float, float]] = {}
+    dims: Dict[str, str] = {}
+    for (isnap, var), fstats in stats.items():
+        if fstats is None:
+            continue
+        vmin, vmax = fstats[keys[0]], fstats[keys[1]]
+        if var in minmax:
+            vmin = min(minmax[var][0], vmin)
+            vmax = max(minmax[var][1], vmax)
+        else:
+            dims[var] = (phyvars.FIELD[var].dim if var in phyvars.FIELD
+                         else sdat.snaps[isnap].fields[var].meta.dim)
+        minmax[var] = vmin, vmax
+    index.save()
+    return {var: (sdat.scale(vmin, dims[var])[0],
+                  sdat.scale(vmax, dims[var])[0])
+            for var, (vmin, vmax) in minmax.items()}
+
+
+def _plot_snap(step: Step, lovs: List[List[List[str]]],
+               minmax: Dict[str, Tuple[float, float]]) -> None:
+    """Plot and save the requested fields of a snapshot."""
+    for vfig in lovs:
+        fig, axes = plt.subplots(ncols=len(vfig), squeeze=False,
+                                 figsize=(6 * len(vfig), 6))
+        try:
             for axis, var in zip(axes[0], vfig):
                 if var[0] not in step.fields:
                     print(f"{var[0]!r} field on snap {step.isnap} not found")
                     continue
                 opts: Dict[str, Any] = {}
                 if var[0] in minmax:
-                    opts = dict(vmin=minmax[var[0]][0], vmax=minmax[var[0]][1])
+                    opts = dict(vmin=minmax[var[0]][0],
+                                vmax=minmax[var[0]][1])
                 plot_scalar(step, var[0], axis=axis, **opts)
                 if len(var) == 2:
                     if valid_field_var(var[1]):
@@ -361,10 +431,66 @@ def cmd() -> None:
                     elif valid_field_var(var[1] + '1'):
                         plot_vec(axis, step, var[1])
             if conf.field.timelabel:
-                time, unit = sdat.scale(step.timeinfo['t'], 's')
+                time, unit = step.sdat.scale(step.timeinfo['t'], 's')
                 time = _helpers.scilabel(time)
                 axes[0, 0].text(0.02, 1.02, f'$t={time}$ {unit}',
                                 transform=axes[0, 0].transAxes)
-            oname = '_'.join(chain.from_iterable(vfig))
-            plt.tight_layout(w_pad=3)
-            _helpers.saveplot(fig, oname, step.isnap)
+        except BaseException:
+            # the snapshot may be plotted again later, e.g. by watch
+            plt.close(fig)
+            raise
+        oname = '_'.join(chain.from_iterable(vfig))
+        plt.tight_layout(w_pad=3)
+        _helpers.saveplot(fig, oname, step.isnap)
+
+
+_WORKER_SDAT: Dict[str, StagyyData] = {}
+
+
+def _init_worker(conf_values: Dict[str, Dict[str, Any]]) -> None:
+    """Set up a process plotting snapshots."""
+    conf.update_(conf_values, conf_arg=False)
+    _WORKER_SDAT['sdat'] = StagyyData()
+
+
+def _plot_snap_job(isnap: int, lovs: List[List[List[str]]],
+                   minmax: Dict[str, Tuple[float, float]]) -> None:
+    """Plot a snapshot in a worker process."""
+    _plot_snap(_WORKER_SDAT['sdat'].snaps[isnap], lovs, minmax)
+
+
+def cmd() -> None:
+    """Implementation of field subcommand.
+
+    Other Parameters:
+        conf.field
+        conf.core
+    """
+    sdat = StagyyData()
+    lovs = _helpers.list_of_vars(conf.field.plot)
+    # no more than two fields in a subplot
+    lovs = [[slov[:2] for slov in plov] for plov in lovs]
+    minmax = {}
+    if conf.plot.cminmax:
+        conf.plot.vmin = None
+        conf.plot.vmax = None
+        sovs = set(slov[0] for plov in lovs for slov in plov)
+        minmax = _findminmax(sdat, sovs)
+    if conf.field.jobs > 1:
+        isnaps = [step.isnap for step in sdat.walk.filter(snap=True)]
+        conf_values = {sct: dict(conf[sct].opt_vals_())
+                       for sct in conf.sections_()}
+        with ProcessPoolExecutor(conf.field.jobs, initializer=_init_worker,
+                                 initargs=(conf_values,)) as pool:
+            # iterate through results to propagate errors
+            for _ in pool.map(partial(_plot_snap_job, lovs=lovs,
+                                      minmax=minmax), isnaps):
+                pass
+        return
+    prefetch: Set[str] = set()
+    for fvar in chain.from_iterable(chain.from_iterable(lovs)):
+        prefetch.update(name for name in (fvar, fvar + '1', fvar + '2',
+                                          fvar + '3')
+                        if name in phyvars.FIELD)
+    for step in sdat.walk.filter(snap=True).prefetch(prefetch):
+        _plot_snap(step, lovs, minmax)
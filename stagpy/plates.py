@@ -363,7 +363,8 @@ def cmd() -> None:
         fid.write('#  istep     time   time_My   phi_trench  vel_trench  '
                   'distance     phi_cont  age_trench_My\n')
 
-        for step in sdat.walk.filter(fields=['T']):
+        prefetch = ['v2', 'v3', 'c', 'age', conf.plates.field]
+        for step in sdat.walk.filter(fields=['T']).prefetch(prefetch):
             # could check other fields too
             _write_trench_diagnostics(step, vrms_surf, fid)
             plot_at_surface(step, conf.plates.plot)
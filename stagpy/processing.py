@@ -11,7 +11,7 @@ import typing
 import numpy as np
 from scipy import integrate
 
-from .error import NotAvailableError
+from .error import MissingDataError, NotAvailableError
 from .datatypes import Field, Varf, Rprof, Varr, Tseries, Vart
 
 if typing.TYPE_CHECKING:
@@ -88,12 +88,16 @@ def mobility(sdat: StagyyData) -> Tseries:
     Returns:
         mobility and time arrays.
     """
-    time = []
-    mob = []
-    for step in sdat.steps.filter(rprofs=True):
-        time.append(step.timeinfo['t'])
-        mob.append(step.rprofs['vrms'].values[-1] / step.timeinfo['vrms'])
-    return Tseries(np.array(mob), np.array(time),
+    rprofs = sdat.rprofs_array
+    isteps = sdat.tseries.isteps
+    ipos = np.minimum(np.searchsorted(isteps, rprofs.isteps), len(isteps) - 1)
+    missing = isteps[ipos] != rprofs.isteps
+    if missing.any():
+        raise MissingDataError(
+            f'No time series for step {rprofs.isteps[missing][0]} of {sdat}')
+    # both vrms are scaled alike, their ratio is the same as if unscaled
+    mob = rprofs['vrms'][:, -1] / sdat.tseries['vrms'].values[ipos]
+    return Tseries(mob, sdat.tseries.time[ipos],
                    Vart("Plates mobility", 'Mobility', '1'))
 
 
@@ -100,7 +100,9 @@ def cmd() -> None:
             plot_grid(step)
 
     if conf.rprof.average:
-        plot_rprofs(sdat.walk.rprofs_averaged, conf.rprof.plot)
+        rprofs = sdat.walk.rprofs_averaged
+        rprofs.time_weighted = conf.rprof.tweight
+        plot_rprofs(rprofs, conf.rprof.plot)
     else:
         for step in sdat.walk.filter(rprofs=True):
             plot_rprofs(step.rprofs, conf.rprof.plot)
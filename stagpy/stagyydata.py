@@ -8,27 +8,38 @@ Note:
 """
 
 from __future__ import annotations
-from collections import abc
+from collections import abc, deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from itertools import zip_longest
 from pathlib import Path
 import re
+import threading
 import typing
+import weakref
 
 import numpy as np
+import pandas as pd
 
 from . import conf, error, parfile, phyvars, stagyyparsers, _helpers, _step
+from . import store
+from ._index import (SnapIndex, index_path, xdmf_index, xdmf_index_path,
+                     extend_xdmf_index)
 from ._helpers import CachedReadOnlyProperty as crop
 from ._step import Step
 from .datatypes import Rprof, Tseries, Vart
 
 if typing.TYPE_CHECKING:
     from typing import (Tuple, List, Dict, Optional, Union, Sequence, Iterator,
-                        Set, Callable, Iterable, Any)
+                        Set, Callable, Iterable, Any, Deque, Mapping)
+    from concurrent.futures import Future
     from os import PathLike
     from f90nml.namelist import Namelist
     from numpy import ndarray
+    from numpy.typing import DTypeLike
     from pandas import DataFrame, Series
+    from ._step import _Fields
+    from .datatypes import Varr
     StepIndex = Union[int, slice]
 
 
@@ -162,6 +173,11 @@ class _Refstate:
     @crop
     def _data(self) -> Tuple[List[List[DataFrame]], List[DataFrame]]:
         """Read reference state profile."""
+        if self._sdat._store is not None:
+            data = self._sdat._store.refstate()
+            if data is None:
+                raise error.NoRefstateError(self._sdat)
+            return data
         reffile = self._sdat.filename('refstat.dat')
         if self._sdat.hdf5 and not reffile.is_file():
             # check legacy folder as well
@@ -224,20 +240,95 @@ class _Tseries:
     def __init__(self, sdat: StagyyData):
         self.sdat = sdat
         self._cached_extra: Dict[str, Tseries] = {}
+        self._cached_data: Optional[DataFrame] = None
+        # time steps and values of the cached data, grown as data is read
+        self._isteps: Optional[_helpers.GrowingArray] = None
+        self._rows: Optional[_helpers.GrowingArray] = None
+        # file read and position from which it should be read next
+        self._position: Optional[Tuple[Path, int]] = None
 
-    @crop
+    @property
     def _data(self) -> Optional[DataFrame]:
+        if self._position is None:
+            self.refresh()
+        return self._cached_data
+
+    def _timefile(self) -> Path:
+        """Path of the time series file."""
         timefile = self.sdat.filename('TimeSeries.h5')
-        data = stagyyparsers.time_series_h5(
-            timefile, list(phyvars.TIME.keys()))
-        if data is not None:
-            return data
+        if timefile.is_file():
+            return timefile
         timefile = self.sdat.filename('time.dat')
         if self.sdat.hdf5 and not timefile.is_file():
             # check legacy folder as well
             timefile = self.sdat.filename('time.dat', force_legacy=True)
-        data = stagyyparsers.time_series(timefile, list(phyvars.TIME.keys()))
-        return data
+        return timefile
+
+    def refresh(self) -> bool:
+        """Read time series written since they were last read.
+
+        Only the lines (or rows of the HDF5 file) written since the last read
+        are parsed, and they are appended to the data already read, so that a
+        running simulation can be followed cheaply.
+
+        Returns:
+            whether new data was found.
+        """
+        if self.sdat._store is not None:
+            if self._position is not None:
+                return False
+            self._position = (self.sdat._store.path, 0)
+            self._cached_data = self.sdat._store.tseries()
+            return self._cached_data is not None
+        if self._position is None:
+            timefile, start = self._timefile(), 0
+        else:
+            timefile, start = self._position
+        colnames = list(phyvars.TIME.keys())
+        if timefile.suffix == '.h5':
+            data, end = stagyyparsers.time_series_h5_chunk(
+                timefile, colnames, start)
+        else:
+            data, end = stagyyparsers.time_series_chunk(
+                timefile, colnames, start)
+        if end < start:
+            # the file shrank, read it again
+            self._position = None
+            self._cached_data = None
+            return self.refresh()
+        self._position = (timefile, end)
+        if data is None:
+            return False
+        self._append(stagyyparsers._drop_restarted(data))
+        self._cached_extra.clear()
+        return True
+
+    def _append(self, data: DataFrame) -> None:
+        """Append rows to the cached data.
+
+        Args:
+            data: rows to append, with increasing time steps.
+        """
+        cached = self._cached_data
+        if (cached is None or self._isteps is None or self._rows is None or
+                not data.columns.equals(cached.columns)):
+            if cached is not None:
+                # columns changed, build the whole data again
+                data = stagyyparsers._drop_restarted(pd.concat([cached, data]))
+            self._isteps = _helpers.GrowingArray(data.index.to_numpy())
+            self._rows = _helpers.GrowingArray(data.to_numpy())
+        else:
+            # cached rows are already cleaned, only those superseded by a
+            # restart from an earlier time step are dropped
+            first = data.index.to_numpy()[0]
+            nkeep = int(np.searchsorted(self._isteps.values, first))
+            self._isteps.truncate(nkeep)
+            self._rows.truncate(nkeep)
+            self._isteps.append(data.index.to_numpy())
+            self._rows.append(data.to_numpy())
+        self._cached_data = pd.DataFrame(
+            self._rows.values, columns=data.columns,
+            index=pd.Index(self._isteps.values, name=data.index.name))
 
     @property
     def _tseries(self) -> DataFrame:
@@ -302,6 +393,146 @@ class _Tseries:
         return self._tseries.loc[istep]
 
 
+class _RprofsArray:
+    """Radial profiles of all time steps in a single array.
+
+    The :attr:`StagyyData.rprofs_array` attribute is an instance of this
+    class.
+
+    This is a columnar alternative to the per-step :attr:`Step.rprofs
+    <stagpy._step.Step.rprofs>` interface: profiles of every time step are
+    stored in one (nsteps, nz, nvars) array so that analyses across time
+    steps are plain NumPy reductions.  :class:`_RprofsArray` implements the
+    getitem mechanism.  Keys are names of profiles output by StagYY, items
+    are (nsteps, nz) arrays.  Note that profiles are automatically scaled if
+    conf.scaling.dimensional is True.
+
+    Attributes:
+        sdat: the :class:`StagyyData` instance owning the
+            :class:`_RprofsArray` instance.
+    """
+
+    def __init__(self, sdat: StagyyData):
+        self.sdat = sdat
+        self._cached_data: Optional[Tuple[ndarray, ndarray, List[str]]] = None
+        # time steps and profiles, grown as new profiles are read
+        self._isteps: Optional[_helpers.GrowingArray] = None
+        self._values: Optional[_helpers.GrowingArray] = None
+
+    @property
+    def _data(self) -> Tuple[ndarray, ndarray, List[str]]:
+        if self._cached_data is None:
+            if self.sdat._store is not None:
+                isteps, values, names = self.sdat._store.rprof_array()
+            else:
+                isteps, values, names = stagyyparsers.rprof_array(
+                    self.sdat._rprof_and_times[0])
+            self._isteps = _helpers.GrowingArray(isteps)
+            self._values = _helpers.GrowingArray(values)
+            self._cached_data = isteps, values, names
+        return self._cached_data
+
+    def _update(self, nkeep: int) -> None:
+        """Read profiles of time steps added since the array was built.
+
+        New profiles are appended to the array, the cost of an update is
+        therefore proportional to the number of new profiles.
+
+        Args:
+            nkeep: number of leading time steps whose profiles are unchanged.
+        """
+        if (self._cached_data is None or self._isteps is None or
+                self._values is None):
+            return
+        _, values, names = self._cached_data
+        new_isteps, new_values, new_names = stagyyparsers.rprof_array(
+            self.sdat._rprof_and_times[0], nkeep)
+        if new_isteps.size and (new_names != names or
+                                new_values.shape[1:] != values.shape[1:]):
+            # profiles changed shape, build the whole array again
+            self._cached_data = None
+            return
+        self._isteps.truncate(nkeep)
+        self._values.truncate(nkeep)
+        if new_isteps.size:
+            self._isteps.append(new_isteps)
+            self._values.append(new_values)
+        self._cached_data = self._isteps.values, self._values.values, names
+
+    @property
+    def values(self) -> ndarray:
+        """Non-scaled (nsteps, nz, nvars) array of profiles.
+
+        Profiles with fewer points than others are padded with NaN.
+        """
+        values = self._data[1]
+        if not values.size:
+            raise error.MissingDataError(f'No rprof data in {self.sdat}')
+        return values
+
+    @property
+    def isteps(self) -> ndarray:
+        """Time steps of the profiles, along the first axis of values."""
+        return self._data[0]
+
+    @property
+    def names(self) -> List[str]:
+        """Names of the profiles, along the last axis of values."""
+        return self._data[2]
+
+    @property
+    def time(self) -> ndarray:
+        """Time of each time step."""
+        return self.sdat.rtimes.loc[self.isteps].values[:, 0]
+
+    def index(self, istep: int) -> int:
+        """Position of a time step along the first axis of values.
+
+        Args:
+            istep: the time step.
+        """
+        isteps = self.isteps
+        ipos = int(np.searchsorted(isteps, istep))
+        if ipos == len(isteps) or isteps[ipos] != istep:
+            raise error.MissingDataError(
+                f'No rprof data in step {istep} of {self.sdat}')
+        return ipos
+
+    def __getitem__(self, name: str) -> ndarray:
+        try:
+            ivar = self.names.index(name)
+        except ValueError:
+            raise error.UnknownRprofVarError(name)
+        meta = phyvars.RPROF.get(name)
+        rprofs = self.values[:, :, ivar]
+        if meta is not None:
+            rprofs, _ = self.sdat.scale(rprofs, meta.dim)
+        return rprofs
+
+
+def _weighted_percentiles(values: ndarray, weights: ndarray,
+                          percentiles: Sequence[float]) -> ndarray:
+    """Percentiles along the first axis of weighted samples.
+
+    Args:
+        values: (nsamples, npoints) array.
+        weights: (nsamples,) weights, summing to one.
+        percentiles: percentiles to compute, between 0 and 100.
+
+    Returns:
+        (len(percentiles), npoints) array.
+    """
+    order = np.argsort(values, axis=0)
+    svalues = np.take_along_axis(values, order, axis=0)
+    sweights = weights[order]
+    cumw = np.cumsum(sweights, axis=0) - sweights / 2
+    quantiles = np.asarray(percentiles) / 100
+    out = np.empty((len(quantiles), values.shape[1]))
+    for ipt in range(values.shape[1]):
+        out[:, ipt] = np.interp(quantiles, cumw[:, ipt], svalues[:, ipt])
+    return out
+
+
 class _RprofsAveraged(_step._Rprofs):
     """Radial profiles time-averaged over a :class:`_StepsView`.
 
@@ -309,34 +540,119 @@ class _RprofsAveraged(_step._Rprofs):
     class.
 
     It implements the same interface as :class:`~stagpy._step._Rprofs` but
-    returns time-averaged profiles instead.
+    returns time-averaged profiles instead.  Profiles of a variable are
+    gathered for all the steps at once, :meth:`average` and
+    :meth:`percentiles` compute statistics of several variables in one go.
 
     Attributes:
         steps: the :class:`_StepsView` owning the :class:`_RprofsAveraged`
             instance.
+        time_weighted: if True, each profile is weighted by the time span it
+            represents (trapezoidal rule on :attr:`StagyyData.rtimes`).
+            Otherwise, all profiles have the same weight.  Defaults to False.
     """
 
     def __init__(self, steps: _StepsView):
         self.steps = steps.filter(rprofs=True)
-        self._cached_data: Dict[str, Rprof] = {}
+        self.time_weighted = False
+        self._stacked: Dict[str, ndarray] = {}
         super().__init__(next(iter(self.steps)))
 
     def __getitem__(self, name: str) -> Rprof:
-        # the averaging method has two shortcomings:
-        # - does not take into account time changing geometry;
-        # - does not take into account time changing timestep.
-        if name in self._cached_data:
-            return self._cached_data[name]
-        steps_iter = iter(self.steps)
-        rprof, rad, meta = next(steps_iter).rprofs[name]
-        rprof = np.copy(rprof)
-        nprofs = 1
-        for step in steps_iter:
-            nprofs += 1
-            rprof += step.rprofs[name].values
-        rprof /= nprofs
-        self._cached_data[name] = Rprof(rprof, rad, meta)
-        return self._cached_data[name]
+        # time changing geometry is not taken into account
+        return self.average([name])[name]
+
+    @crop
+    def _isteps(self) -> ndarray:
+        """Time steps of the averaged profiles."""
+        return np.array([step.istep for step in self.steps])
+
+    def _gather(self, names: Iterable[str]) -> None:
+        """Stack profiles of all steps for variables not gathered yet."""
+        sdat = self.step.sdat
+        missing = [name for name in dict.fromkeys(names)
+                   if name not in self._stacked]
+        if not missing:
+            return
+        rprofs = sdat.rprofs_array
+        # reading the whole file only pays off for a large share of steps
+        dense = 4 * len(self._isteps) >= len(sdat._rprof_and_times[0])
+        if dense:
+            ipos = np.searchsorted(rprofs.isteps, self._isteps)
+        for name in missing:
+            if dense and name in rprofs.names:
+                meta = phyvars.RPROF.get(name)
+                stacked = rprofs.values[ipos, :, rprofs.names.index(name)]
+                if meta is not None:
+                    stacked, _ = sdat.scale(stacked, meta.dim)
+            else:
+                stacked = np.stack([step.rprofs[name].values
+                                    for step in self.steps])
+            self._stacked[name] = stacked
+
+    def _weights(self) -> ndarray:
+        """Weights of the profiles of each step, summing to one."""
+        nsteps = len(self._isteps)
+        weights = np.full(nsteps, 1 / nsteps)
+        if not self.time_weighted or nsteps < 2:
+            return weights
+        time = self.step.sdat.rtimes.loc[self._isteps].values[:, 0]
+        dtime = np.diff(time)
+        spans = np.zeros(nsteps)
+        spans[:-1] += dtime / 2
+        spans[1:] += dtime / 2
+        total = spans.sum()
+        return spans / total if total > 0 else weights
+
+    def _meta(self, name: str) -> Tuple[ndarray, Varr]:
+        """Radial position and metadata of a profile."""
+        _, rad, meta = super().__getitem__(name)
+        return rad, meta
+
+    def average(self, names: Iterable[str]) -> Dict[str, Rprof]:
+        """Compute time-averaged profiles of several variables.
+
+        Args:
+            names: names of the profiles.
+
+        Returns:
+            the averaged profiles indexed by their name.
+        """
+        names = list(names)
+        self._gather(names)
+        weights = self._weights()
+        averages = {}
+        for name in names:
+            rad, meta = self._meta(name)
+            avg = np.tensordot(weights, self._stacked[name], axes=1)
+            averages[name] = Rprof(avg, rad, meta)
+        return averages
+
+    def percentiles(self, names: Iterable[str],
+                    percentiles: Sequence[float]) -> Dict[str, List[Rprof]]:
+        """Compute percentiles over time of profiles of several variables.
+
+        Args:
+            names: names of the profiles.
+            percentiles: percentiles to compute, between 0 and 100.
+
+        Returns:
+            lists of profiles, one per requested percentile, indexed by the
+            name of the variables.
+        """
+        names = list(names)
+        self._gather(names)
+        weights = self._weights()
+        out = {}
+        for name in names:
+            rad, meta = self._meta(name)
+            stacked = self._stacked[name]
+            if self.time_weighted:
+                profs = _weighted_percentiles(stacked, weights, percentiles)
+            else:
+                profs = np.percentile(stacked, percentiles, axis=0)
+            out[name] = [Rprof(prof, rad, meta) for prof in profs]
+        return out
 
     @property
     def stepstr(self) -> str:
@@ -344,6 +660,102 @@ class _RprofsAveraged(_step._Rprofs):
         return self.steps.stepstr
 
 
+class _FieldsCache:
+    """Cache of fields read from output files.
+
+    The :attr:`StagyyData.fields_cache` attribute is an instance of this
+    class.  Fields are evicted from memory in least recently used order when
+    the total size of cached fields exceeds :attr:`bytes_max` or their number
+    exceeds :attr:`nfields_max`.  The most recently read field is never
+    evicted.
+
+    Args:
+        bytes_max: maximum size of cached fields in bytes.
+
+    Attributes:
+        bytes_max: maximum size of cached fields in bytes, None for no limit.
+        nfields_max: maximum number of cached fields, None for no limit.
+        nbytes: total size of cached fields in bytes.
+        hits: number of accesses to cached fields.
+        misses: number of fields read from output files.
+        evictions: number of fields evicted from the cache.
+    """
+
+    def __init__(self, bytes_max: Optional[int]):
+        self.bytes_max = bytes_max
+        self.nfields_max: Optional[int] = None
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (istep, name) -> (owning _Fields, nbytes)
+        self._entries: OrderedDict[Tuple[int, str], Tuple[_Fields, int]] = \
+            OrderedDict()
+
+    def __repr__(self) -> str:
+        return (f'<fields cache: {len(self)} fields, {self.nbytes} bytes, '
+                f'{self.hits} hits, {self.misses} misses, '
+                f'{self.evictions} evictions>')
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def _full(self) -> bool:
+        """Whether the cache exceeds one of its limits."""
+        if self.bytes_max is not None and self.nbytes > self.bytes_max:
+            return True
+        return (self.nfields_max is not None and
+                len(self._entries) > self.nfields_max)
+
+    def touch(self, istep: int, name: str) -> None:
+        """Record an access to a cached field."""
+        key = (istep, name)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+    def insert(self, fields: _Fields, name: str) -> None:
+        """Record a field read from output files.
+
+        Least recently used fields are evicted if needed.
+
+        Args:
+            fields: the :class:`~stagpy._step._Fields` instance holding the
+                field.
+            name: name of the field.
+        """
+        key = (fields.step.istep, name)
+        self.remove(*key)
+        nbytes = fields._data[name].values.nbytes
+        self._entries[key] = (fields, nbytes)
+        self.nbytes += nbytes
+        self.misses += 1
+        while len(self._entries) > 1 and self._full():
+            (_, old_name), (owner, _) = next(iter(self._entries.items()))
+            del owner[old_name]
+            self.evictions += 1
+
+    def remove(self, istep: int, name: str) -> None:
+        """Forget about a field that has been dropped from memory."""
+        entry = self._entries.pop((istep, name), None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+    def discard(self, fields: _Fields) -> None:
+        """Drop all fields held by a :class:`~stagpy._step._Fields`."""
+        for name in list(fields._data):
+            del fields[name]
+
+    def clear(self) -> None:
+        """Drop all cached fields."""
+        while self._entries:
+            (_, name), (owner, _) = next(iter(self._entries.items()))
+            del owner[name]
+
+
 class _Steps:
     """Collections of time steps.
 
@@ -415,8 +827,9 @@ class _Steps:
 
     def __delitem__(self, istep: Optional[int]) -> None:
         if istep is not None and istep in self._data:
-            self.sdat._collected_fields = [
-                (i, f) for i, f in self.sdat._collected_fields if i != istep]
+            step = self._data[istep]
+            self.sdat.fields_cache.discard(step.fields)
+            self.sdat.fields_cache.discard(step.sfields)
             del self._data[istep]
 
     def __len__(self) -> int:
@@ -498,11 +911,9 @@ class _Snaps(_Steps):
                 isnap, None if self._all_isteps_known else -1)
         if istep == -1:
             # isnap not in _isteps but not all isteps known, keep looking
-            binfiles = self.sdat._binfiles_set(isnap)
-            if binfiles:
-                istep = stagyyparsers.field_istep(binfiles.pop())
-            else:
-                istep = None
+            entry = self.sdat._snap_index.entry(
+                isnap, self.sdat._binfiles_set(isnap))
+            istep = None if entry is None else entry['istep']
             if istep is not None:
                 self._bind(isnap, istep)
             else:
@@ -520,7 +931,12 @@ class _Snaps(_Steps):
     def __len__(self) -> int:
         if self._len is None:
             length = -1
-            if self.sdat.hdf5:
+            if self.sdat._store is not None:
+                for isnap, istep in self.sdat._store.snaps.items():
+                    self._bind(isnap, istep)
+                length = max(self.sdat._store.snaps, default=-1)
+                self._all_isteps_known = True
+            elif self.sdat.hdf5:
                 isnap = -1
                 for isnap, istep in stagyyparsers.read_time_h5(self.sdat.hdf5):
                     self._bind(isnap, istep)
@@ -540,6 +956,52 @@ class _Snaps(_Steps):
             self._len = length + 1
         return self._len
 
+    def _refresh(self) -> bool:
+        """Look for new snapshots.
+
+        Returns:
+            whether the number of snapshots changed.
+        """
+        if self._len is None or self.sdat._store is not None:
+            return False
+        old_len = self._len
+        # only the last known snapshot may have been incomplete
+        last = old_len - 1
+        if self._isteps.get(last, -1) is None:
+            del self._isteps[last]
+        length = self._new_binfiles(last)
+        if self.sdat.hdf5:
+            for isnap, istep in stagyyparsers.read_time_h5(self.sdat.hdf5,
+                                                           old_len):
+                self._bind(isnap, istep)
+                length = max(isnap, length)
+        self._len = max(length + 1, old_len)
+        return self._len != old_len
+
+    def _new_binfiles(self, first: int) -> int:
+        """Look for binary files of snapshots from a given one onward.
+
+        Snapshots are looked at in turn until one without binary files is
+        found, the files found are added to those of the run.
+
+        Args:
+            first: the first snapshot to look at.
+        Returns:
+            the last snapshot with binary files, first - 1 if there is none.
+        """
+        files = self.sdat._files
+        isnap = first
+        while True:
+            binfiles = set(
+                fname for fname in (
+                    self.sdat.filename(fstem, isnap, force_legacy=True)
+                    for fstem in phyvars.FIELD_FILES)
+                if fname.is_file())
+            if not binfiles:
+                return isnap - 1
+            files.update(binfiles)
+            isnap += 1
+
     def at_time(self, time: float, after: bool = False) -> Step:
         """Return snap corresponding to a given physical time.
 
@@ -567,6 +1029,72 @@ class _Snaps(_Steps):
             igp -= 1
         return self[igp]
 
+    def _istep(self, isnap: int) -> Optional[int]:
+        """Time step of a snapshot, None if the snapshot doesn't exist."""
+        try:
+            return self[isnap].istep
+        except error.InvalidSnapshotError:
+            return None
+
+    def _bisect(self, istep: int) -> Optional[int]:
+        """Index of the first snapshot at or after a given time step.
+
+        This relies on time steps increasing with snapshot indices, missing
+        snapshots are skipped.
+
+        Args:
+            istep: time step index.
+        Returns:
+            the snapshot index, None if there is no snapshot after istep.
+        """
+        found = None
+        istep_found = None
+        imin, imax = 0, len(self)
+        while imin < imax:
+            imid = (imin + imax) // 2
+            for isnap in range(imid, imax):
+                istep_found = self._istep(isnap)
+                if istep_found is not None:
+                    break
+            if istep_found is None:
+                imax = imid
+            elif istep_found >= istep:
+                found = isnap
+                imax = imid
+            else:
+                imin = isnap + 1
+        return found
+
+    def _isnap_of(self, istep: int) -> Optional[int]:
+        """Snapshot index of a time step, None if it isn't a snapshot."""
+        isnap = self._bisect(istep)
+        if isnap is not None and self._isteps[isnap] == istep:
+            return isnap
+        return None
+
+    def _bind_steps(self, isteps: range) -> None:
+        """Resolve the snapshot index of all time steps in a range.
+
+        Only the snapshots within the range are looked at, time steps of the
+        range which aren't snapshots are marked as such.
+
+        Args:
+            isteps: range of time step indices.
+        """
+        if not isteps:
+            return
+        isnap = self._bisect(min(isteps[0], isteps[-1]))
+        last = max(isteps[0], isteps[-1])
+        while isnap is not None and isnap < len(self):
+            istep = self._istep(isnap)
+            if istep is not None and istep > last:
+                break
+            isnap += 1
+        for istep in isteps:
+            step = self.sdat.steps[istep]
+            if step._isnap == -1:
+                step._isnap = None
+
     def _bind(self, isnap: int, istep: int) -> None:
         """Register the isnap / istep correspondence.
 
@@ -613,6 +1141,80 @@ class _Filters:
         return ', '.join(flts)
 
 
+def _read_step_fields(
+    reads: List[Tuple[_Fields, str]]
+) -> List[Optional[Tuple[List[str], Any]]]:
+    """Read fields of a step in turn, None for those that couldn't be read.
+
+    Fields of a step share lazily computed state such as their header, they
+    are therefore all read by the same thread.
+    """
+    results: List[Optional[Tuple[List[str], Any]]] = []
+    for fields, name in reads:
+        try:
+            results.append(fields._get_raw_data(name))
+        except Exception:
+            # the error is raised again if the field is accessed
+            results.append(None)
+    return results
+
+
+def _install_prefetched(
+    step: Step, reads: List[Tuple[_Fields, str]], future: Optional[Future]
+) -> Tuple[Step, int]:
+    """Set fields read in the background, return their size in bytes."""
+    if future is None:
+        return step, 0
+    nbytes = 0
+    for (fields, name), result in zip(reads, future.result()):
+        if result is None:
+            continue
+        fld_names, parsed_data = result
+        if parsed_data is not None and name not in fields._data:
+            fields._install(name, fld_names, parsed_data)
+            nbytes += parsed_data[1].nbytes
+    return step, nbytes
+
+
+def _prefetched(steps: Iterator[Step], names: Sequence[str],
+                ahead: int) -> Iterator[Step]:
+    """Iterate through steps while reading their fields in the background.
+
+    The number of steps read in advance is also limited so that their fields
+    fit in the fields cache.
+
+    Args:
+        steps: the steps to iterate through.
+        names: names of fields and surface fields to read.
+        ahead: maximum number of steps read in advance.
+    """
+    pending: Deque[Tuple[Step, List[Tuple[_Fields, str]],
+                         Optional[Future]]] = deque()
+    nahead = ahead
+    with ThreadPoolExecutor(max_workers=ahead) as pool:
+        for step in steps:
+            reads = []
+            future = None
+            if step.isnap is not None:
+                step.sdat.hdf5  # resolved here rather than in threads
+                for name in names:
+                    fields = (step.sfields if name in phyvars.SFIELD
+                              else step.fields)
+                    if name in fields._vars and name not in fields._data:
+                        reads.append((fields, name))
+                if reads:
+                    future = pool.submit(_read_step_fields, reads)
+            pending.append((step, reads, future))
+            while len(pending) > nahead:
+                ready, nbytes = _install_prefetched(*pending.popleft())
+                bytes_max = ready.sdat.fields_cache.bytes_max
+                if nbytes and bytes_max is not None:
+                    nahead = max(min(ahead, bytes_max // nbytes - 1), 0)
+                yield ready
+        while pending:
+            yield _install_prefetched(*pending.popleft())[0]
+
+
 class _StepsView:
     """Filtered iterator over steps or snaps.
 
@@ -631,6 +1233,7 @@ class _StepsView:
         self._items = items
         self._rprofs_averaged: Optional[_RprofsAveraged] = None
         self._flt = _Filters()
+        self._prefetch: Tuple[List[str], Optional[int]] = ([], None)
 
     @property
     def rprofs_averaged(self) -> _RprofsAveraged:
@@ -705,10 +1308,49 @@ class _StepsView:
             self._flt.funcs.append(func)
         return self
 
+    def prefetch(self, fields: Iterable[str],
+                 ahead: Optional[int] = None) -> _StepsView:
+        """Read fields of the next steps in the background during iteration.
+
+        While a step produced by the view is being processed, fields of the
+        following steps are read in a thread pool.  For example, with this
+        code::
+
+            for step in sdat.snaps[:].prefetch(['T', 'v3'], ahead=4):
+                do_something(step.fields['T'], step.fields['v3'])
+
+        the temperature and vertical velocity of the next four snapshots are
+        read while ``do_something`` runs.
+
+        Args:
+            fields: names of fields and surface fields to read.
+            ahead: maximum number of steps read in advance.  Set it to 0 to
+                disable prefetching.
+
+        Returns:
+            self.
+
+        Other Parameters:
+            conf.core.prefetch: default value of ``ahead``.
+        """
+        self._prefetch = (list(fields), ahead)
+        return self
+
     def __iter__(self) -> Iterator[Step]:
+        names, ahead = self._prefetch
+        if ahead is None:
+            ahead = conf.core.prefetch
+        if names and ahead > 0:
+            return _prefetched(self._iter(), names, ahead)
+        return self._iter()
+
+    def _iter(self) -> Iterator[Step]:
+        """Iterate through steps passing the filters."""
         for item in self._items:
             if isinstance(item, slice):
                 idx = item.indices(len(self._col))
+                if self._flt.snap and not isinstance(self._col, _Snaps):
+                    self._col.sdat.snaps._bind_steps(range(*idx))
                 yield from (self._col[i] for i in range(*idx)
                             if self._pass(i))
             elif self._pass(item):
@@ -727,34 +1369,57 @@ class StagyyData:
         path: path of the StagYY run. It can either be the path of the
             directory containing the par file, or the path of the par file. If
             the path given is a directory, the path of the par file is assumed
-            to be path/par.  If no path is given (or None) it is set to
-            ``conf.core.path``.
+            to be path/par.  It can also be the path of a store written by
+            :func:`stagpy.store.convert`, data is then read from the store.
+            If no path is given (or None) it is set to ``conf.core.path``.
+        dtype: floating point type of fields and meshes, such as
+            ``'float32'`` to halve the memory they use.  If no type is given
+            (or None) it is set to ``conf.core.dtype``.
 
     Other Parameters:
         conf.core.path: the default path.
+        conf.core.dtype: the default type of fields.
 
     Attributes:
         steps (:class:`_Steps`): collection of time steps.
         snaps (:class:`_Snaps`): collection of snapshots.
         scales (:class:`_Scales`): dimensionful scaling factors.
         refstate (:class:`_Refstate`): reference state profiles.
+        rprofs_array (:class:`_RprofsArray`): radial profiles of all time
+            steps in a single array.
+        fields_cache (:class:`_FieldsCache`): cache of fields read from output
+            files, it keeps at most 1 GiB of data by default.
+        dtype (:class:`numpy.dtype`): floating point type of fields.
     """
 
-    def __init__(self, path: Optional[PathLike] = None):
+    def __init__(self, path: Optional[PathLike] = None,
+                 dtype: Optional[DTypeLike] = None):
         if path is None:
             path = conf.core.path
+        self.dtype = np.dtype(conf.core.dtype if dtype is None else dtype)
         self._parpath = Path(path)
+        self._h5pool = stagyyparsers.H5FilePool()
+        self._store: Optional[store.RunStore] = None
+        if store.is_store(self._parpath):
+            self._store = store.RunStore(self._parpath, self._h5pool)
         if not self._parpath.is_file():
             self._parpath /= 'par'
-        self._par = parfile.readpar(self.parpath, self.path)
+        if self._store is not None:
+            self._par = self._store.par()
+        else:
+            self._par = parfile.readpar(self.parpath, self.path)
         self.scales = _Scales(self)
         self.refstate = _Refstate(self)
         self.tseries = _Tseries(self)
+        self.rprofs_array = _RprofsArray(self)
         self.steps = _Steps(self)
         self.snaps = _Snaps(self)
-        self._nfields_max: Optional[int] = 50
-        # list of (istep, field_name) in memory
-        self._collected_fields: List[Tuple[int, str]] = []
+        self.fields_cache = _FieldsCache(bytes_max=2**30)
+        self._rprofs_read: Optional[
+            Tuple[Mapping[int, DataFrame], Optional[DataFrame]]] = None
+        self._found_files: Optional[Set[Path]] = None
+        self._xdmf_indices: Dict[str, stagyyparsers.XdmfIndex] = {}
+        self._xdmf_lock = threading.Lock()
 
     def __repr__(self) -> str:
         return f'StagyyData({self.path!r})'
@@ -775,6 +1440,8 @@ class StagyyData:
     @crop
     def hdf5(self) -> Optional[Path]:
         """Path of output hdf5 folder if relevant, None otherwise."""
+        if self._store is not None:
+            return None
         h5_folder = self.path / self.par['ioin']['hdf5_output_folder']
         return h5_folder if (h5_folder / 'Data.xmf').is_file() else None
 
@@ -787,10 +1454,20 @@ class StagyyData:
         """
         return self._par
 
-    @crop
+    @property
     def _rprof_and_times(
         self
-    ) -> Tuple[Dict[int, DataFrame], Optional[DataFrame]]:
+    ) -> Tuple[Mapping[int, DataFrame], Optional[DataFrame]]:
+        if self._rprofs_read is None:
+            self._rprofs_read = self._read_rprofs()
+        return self._rprofs_read
+
+    def _read_rprofs(
+        self
+    ) -> Tuple[Mapping[int, DataFrame], Optional[DataFrame]]:
+        """Read radial profiles and their times."""
+        if self._store is not None:
+            return self._store.rprofs()
         rproffile = self.filename('rprof.h5')
         data = stagyyparsers.rprof_h5(rproffile, list(phyvars.RPROF.keys()))
         if data[1] is not None:
@@ -806,14 +1483,137 @@ class StagyyData:
         """Radial profiles times."""
         return self._rprof_and_times[1]
 
-    @crop
+    @property
     def _files(self) -> Set[Path]:
         """Set of found binary files output by StagYY."""
-        out_stem = Path(self.par['ioin']['output_file_stem'] + '_')
-        out_dir = self.path / out_stem.parent
-        if out_dir.is_dir():
-            return set(out_dir.iterdir())
-        return set()
+        if self._found_files is None and self._store is not None:
+            self._found_files = set()
+        if self._found_files is None:
+            out_stem = Path(self.par['ioin']['output_file_stem'] + '_')
+            out_dir = self.path / out_stem.parent
+            self._found_files = (set(out_dir.iterdir()) if out_dir.is_dir()
+                                 else set())
+        return self._found_files
+
+    @crop
+    def _snap_index(self) -> SnapIndex:
+        """Index of legacy snapshots, saved when the instance is collected.
+
+        Other Parameters:
+            conf.core.index: whether the index is persisted on disk.
+        """
+        index = SnapIndex(index_path(self.parpath) if conf.core.index
+                          else None)
+        weakref.finalize(self, index.save)
+        return index
+
+    def _xdmf(self, name: str) -> stagyyparsers.XdmfIndex:
+        """Index of an XDMF file of the HDF5 output folder.
+
+        Args:
+            name: name of the xdmf file, such as ``'Data.xmf'``.
+
+        Other Parameters:
+            conf.core.index: whether the index is persisted on disk.
+        """
+        with self._xdmf_lock:
+            # fields are read from several threads, the index is only built
+            # by the first one to need it
+            if name not in self._xdmf_indices:
+                if self.hdf5 is None:
+                    raise error.MissingDataError(f'No HDF5 output in {self}')
+                xdmf_file = self.hdf5 / name
+                self._xdmf_indices[name] = xdmf_index(
+                    xdmf_file,
+                    xdmf_index_path(xdmf_file) if conf.core.index else None)
+            return self._xdmf_indices[name]
+
+    def close(self) -> None:
+        """Close the HDF5 files kept open by this instance.
+
+        HDF5 files are kept open between reads of fields and tracers, the
+        least recently used ones being closed when there are too many of
+        them.  The instance can still be used after this, files are then
+        opened again when needed.
+        """
+        self._h5pool.close()
+
+    def refresh(self) -> bool:
+        """Look for data written since it was last read.
+
+        This allows following a running simulation with the same instance.
+        Only the parts of time series and radial profiles files written since
+        they were last read are parsed, and new snapshots are looked for.
+        Data that was never read is left alone, it is read when first
+        accessed.  Steps affected by new data are discarded from
+        :attr:`steps`, :class:`~stagpy._step.Step` instances should therefore
+        be obtained again after a refresh.
+
+        Returns:
+            whether new data was found.
+        """
+        new_tseries = False
+        if self.tseries._position is not None:
+            new_tseries = self.tseries.refresh()
+        if new_tseries:
+            self.steps._len = None
+        istep_min = self._refresh_rprofs()
+        new_snaps = self.snaps._refresh()
+        if new_snaps:
+            with self._xdmf_lock:
+                for xdmf in self._xdmf_indices.values():
+                    extend_xdmf_index(
+                        xdmf, xdmf_index_path(xdmf.xdmf_file)
+                        if conf.core.index else None)
+        # files of the last snapshot may have been incomplete
+        self.close()
+        for istep in list(self.steps._data):
+            stale_rprofs = istep_min is not None and istep >= istep_min
+            not_snap = self.steps._data[istep]._isnap is None
+            if stale_rprofs or (new_snaps and not_snap):
+                del self.steps[istep]
+        return new_tseries or istep_min is not None or new_snaps
+
+    def _refresh_rprofs(self) -> Optional[int]:
+        """Read radial profiles written since they were last read.
+
+        Returns:
+            the first time step whose profiles changed, None if there are no
+            new profiles.
+        """
+        if self._rprofs_read is None:
+            return None
+        profs, times = self._rprofs_read
+        if isinstance(profs, stagyyparsers.RprofFile):
+            first = profs.blocks[0][0] if profs.blocks else None
+            nkeep = profs.refresh()
+            self._rprofs_read = (profs, profs.times if profs.blocks else None)
+            # time steps of blocks are increasing, and blocks that changed
+            # are replaced by blocks of earlier or same time steps, except
+            # when the file is scanned again from its start
+            changed = []
+            if nkeep < len(profs.blocks):
+                changed.append(profs.blocks[nkeep][0])
+            if nkeep == 0 and first is not None:
+                changed.append(first)
+        else:
+            # no file or rprof.h5, read again
+            old_isteps = list(profs)
+            nkeep = 0
+            self._rprofs_read = self._read_rprofs()
+            new_times = self._rprofs_read[1]
+            if times is None or new_times is None:
+                unchanged = times is new_times
+            else:
+                unchanged = times.equals(new_times)
+            if unchanged:
+                self._rprofs_read = profs, times
+                return None
+            changed = old_isteps + list(self._rprofs_read[0])
+        if not changed:
+            return None
+        self.rprofs_array._update(nkeep)
+        return min(changed)
 
     @property
     def walk(self) -> _StepsView:
@@ -831,21 +1631,21 @@ class StagyyData:
 
     @property
     def nfields_max(self) -> Optional[int]:
-        """Maximum number of scalar fields kept in memory.
+        """Maximum number of fields kept in memory.
 
         Setting this to a value lower or equal to 5 raises a
-        :class:`~stagpy.error.InvalidNfieldsError`.  Set this to ``None`` if
-        you do not want any limit on the number of scalar fields kept in
-        memory.  Defaults to 50.
+        :class:`~stagpy.error.InvalidNfieldsError`.  Defaults to ``None``,
+        the memory used by fields being limited by
+        :attr:`fields_cache.bytes_max <_FieldsCache.bytes_max>` instead.
         """
-        return self._nfields_max
+        return self.fields_cache.nfields_max
 
     @nfields_max.setter
     def nfields_max(self, nfields: Optional[int]) -> None:
         """Check nfields > 5 or None."""
         if nfields is not None and nfields <= 5:
             raise error.InvalidNfieldsError(nfields)
-        self._nfields_max = nfields
+        self.fields_cache.nfields_max = nfields
 
     @typing.overload
     def scale(self, data: ndarray, unit: str) -> Tuple[ndarray, str]:
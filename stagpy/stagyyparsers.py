@@ -6,29 +6,43 @@ Note:
     of :class:`~stagpy.stagyydata.StagyyData`.
 """
 from __future__ import annotations
+from collections import abc, OrderedDict
+from contextlib import contextmanager
 from functools import partial
+from hashlib import sha1
 from itertools import product
 from operator import itemgetter
 from xml.etree import ElementTree as xmlET
+from xml.parsers import expat
+import io
+import mmap
 import re
+import threading
 import typing
+import warnings
 
 import numpy as np
+from numpy.lib.recfunctions import repack_fields
 import pandas as pd
 import h5py
 
+from ._helpers import GrowingArray
 from .error import ParsingError
 from .phyvars import FIELD_FILES_H5, SFIELD_FILES_H5
 
 if typing.TYPE_CHECKING:
     from typing import (List, Optional, Tuple, Dict, BinaryIO, Any, Callable,
-                        Iterator)
+                        Iterable, Iterator, Sequence, Mapping)
     from pathlib import Path
     from xml.etree.ElementTree import Element
     from numpy import ndarray
+    from numpy.typing import DTypeLike
     from pandas import DataFrame
 
 
+_FORTRAN_EXP = re.compile(r'^([-+]?(?:\d+\.?\d*|\.\d+))([-+]\d+)$')
+
+
 def _tidy_names(names: List[str], nnames: int,
                 extra_names: List[str] = None) -> None:
     """Truncate or extend names so that its len is nnames.
@@ -47,6 +61,157 @@ def _tidy_names(names: List[str], nnames: int,
     del names[nnames:]
 
 
+def _numeric_columns(data: DataFrame) -> DataFrame:
+    """Convert columns that could not be read as numbers.
+
+    Only the values that fail to be converted directly are parsed again,
+    handling Fortran-style exponents without ``E`` (such as ``1.0-100``).
+    Values that still can't be converted are set to NaN.
+
+    Args:
+        data: data read from a text file, modified in-place.
+
+    Returns:
+        the data with numeric columns.
+    """
+    for col in data.columns[data.dtypes == object]:
+        raw = data[col]
+        values = pd.to_numeric(raw, errors='coerce')
+        bad = values.isna() & raw.notna()
+        if bad.any():
+            fixed = raw[bad].str.replace(_FORTRAN_EXP, r'\1E\2', regex=True)
+            values[bad] = pd.to_numeric(fixed, errors='coerce')
+        data[col] = values
+    return data
+
+
+def _drop_restarted(data: DataFrame) -> DataFrame:
+    """Remove lines made useless by restarts of a run.
+
+    When a run is restarted from an earlier time step, the lines written
+    after that time step by the previous run are superseded.  A line is
+    therefore only kept if its time step is lower than the time steps of all
+    the following lines.  When the remaining time steps are increasing, this
+    amounts to keeping the last occurrence of duplicated time steps.
+
+    Args:
+        data: data indexed by time steps, in the order of the file.
+
+    Returns:
+        the data with increasing time steps.
+    """
+    isteps = data.index.values
+    if isteps.size < 2:
+        return data
+    # minimum of the time steps following each line
+    next_min = np.minimum.accumulate(isteps[:0:-1])[::-1]
+    keep = np.append(isteps[:-1] < next_min, True)
+    if keep.all():
+        return data
+    return data.iloc[keep]
+
+
+class _FileRange(io.RawIOBase):
+    """Read-only file object limited to a range of bytes of a file."""
+
+    def __init__(self, fid: BinaryIO, start: int, end: int):
+        super().__init__()
+        self._fid = fid
+        self._fid.seek(start)
+        self._left = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        size = min(len(buffer), self._left)
+        nread = self._fid.readinto(memoryview(buffer)[:size])  # type: ignore
+        self._left -= nread
+        return nread
+
+
+def _lines_end(fid: BinaryIO, start: int) -> int:
+    """Offset following the last complete line of a file.
+
+    Args:
+        fid: file object opened in binary mode.
+        start: offset from which lines are looked for.
+
+    Returns:
+        the offset following the last newline character after :data:`start`,
+        :data:`start` if there is none.  If the file is shorter than
+        :data:`start`, its size is returned instead.
+    """
+    end = fid.seek(0, io.SEEK_END)
+    if end < start:
+        return end
+    while end > start:
+        chunk_start = max(start, end - 2**16)
+        fid.seek(chunk_start)
+        inl = fid.read(end - chunk_start).rfind(b'\n')
+        if inl >= 0:
+            return chunk_start + inl + 1
+        end = chunk_start
+    return start
+
+
+def time_series_chunk(timefile: Path, colnames: List[str],
+                      start: int = 0) -> Tuple[Optional[DataFrame], int]:
+    """Read complete lines of a temporal series text file.
+
+    This reads the lines written after a given offset, so that the file can
+    be followed while StagYY is writing it.  Lines superseded by restarts of
+    the run are not removed, see :func:`time_series`.
+
+    Args:
+        timefile: path of the time.dat file.
+        colnames: names of the variables expected in :data:`timefile` (may be
+            modified).
+        start: offset in bytes from which lines are read.  The header line is
+            skipped when reading from the beginning of the file.
+
+    Returns:
+        A tuple (data, end).  :data:`data` is a :class:`pandas.DataFrame`
+        containing the time series, None if there is no new complete line.
+        :data:`end` is the offset following the last complete line, from
+        which the file should be read next.  It is lower than :data:`start`
+        if the file shrank.
+    """
+    if not timefile.is_file():
+        return None, start
+    with timefile.open('rb') as fid:
+        end = _lines_end(fid, start)
+        if start == 0 and end > 0:
+            fid.seek(0)
+            start = len(fid.readline())
+        if end <= start:
+            return None, end
+        try:
+            with warnings.catch_warnings():
+                # columns with malformed values are handled by _numeric_columns
+                warnings.simplefilter('ignore', pd.errors.DtypeWarning)
+                lines = io.BufferedReader(_FileRange(fid, start, end),
+                                          buffer_size=2**20)
+                data = pd.read_csv(lines, delim_whitespace=True, header=None,
+                                   index_col=0, engine='c',
+                                   on_bad_lines='skip')
+        except pd.errors.EmptyDataError:
+            return None, end
+    if data.index.dtype == object:
+        # drop lines without a valid time step
+        isteps = pd.to_numeric(data.index.to_numpy(), errors='coerce')
+        valid = ~np.isnan(isteps)
+        data = data.loc[valid]
+        data.index = isteps[valid].astype(np.int64)
+    data = _numeric_columns(data)
+
+    ncols = data.shape[1]
+    _tidy_names(colnames, ncols)
+    data.columns = colnames
+
+    return data, end
+
+
 def time_series(timefile: Path, colnames: List[str]) -> Optional[DataFrame]:
     """Read temporal series text file.
 
@@ -65,29 +230,46 @@ def time_series(timefile: Path, colnames: List[str]) -> Optional[DataFrame]:
     """
     if not timefile.is_file():
         return None
-    data = pd.read_csv(timefile, delim_whitespace=True, dtype=str,
-                       header=None, skiprows=1, index_col=0,
-                       engine='c', memory_map=True, on_bad_lines='skip')
-    data = data.apply(pd.to_numeric, raw=True, errors='coerce')
+    data, _ = time_series_chunk(timefile, colnames)
+    if data is None:
+        return None
+    return _drop_restarted(data)
 
-    # detect useless lines produced when run is restarted
-    rows_to_del = []
-    irow = len(data) - 1
-    while irow > 0:
-        iprev = irow - 1
-        while iprev >= 0 and data.index[irow] <= data.index[iprev]:
-            rows_to_del.append(iprev)
-            iprev -= 1
-        irow = iprev
-    if rows_to_del:
-        rows_to_keep = set(range(len(data))) - set(rows_to_del)
-        data = data.take(list(rows_to_keep))
 
-    ncols = data.shape[1]
-    _tidy_names(colnames, ncols)
-    data.columns = colnames
+def time_series_h5_chunk(
+    timefile: Path, colnames: List[str], start: int = 0
+) -> Tuple[Optional[DataFrame], int]:
+    """Read rows of temporal series HDF5 file.
 
-    return data
+    This reads the rows written after a given row, see
+    :func:`time_series_chunk`.
+
+    Args:
+        timefile: path of the TimeSeries.h5 file.
+        colnames: names of the variables expected in :data:`timefile` (may be
+            modified).
+        start: index of the first row to read.
+
+    Returns:
+        A tuple (data, end).  :data:`data` is a :class:`pandas.DataFrame`
+        containing the time series, None if there is no new row.  :data:`end`
+        is the number of rows in the file, from which the file should be read
+        next.
+    """
+    if not timefile.is_file():
+        return None, start
+    with h5py.File(timefile, 'r') as h5f:
+        dset = h5f['tseries']
+        end, ncols = dset.shape
+        ncols -= 1  # first is istep
+        h5names = h5f['names'].asstr()[len(colnames) + 1:]
+        _tidy_names(colnames, ncols, h5names)
+        if end <= start:
+            return None, end
+        data = dset[start:]
+    pdf = pd.DataFrame(data[:, 1:],
+                       index=np.int_(data[:, 0]), columns=colnames)
+    return pdf, end
 
 
 def time_series_h5(timefile: Path, colnames: List[str]) -> Optional[DataFrame]:
@@ -107,59 +289,266 @@ def time_series_h5(timefile: Path, colnames: List[str]) -> Optional[DataFrame]:
     """
     if not timefile.is_file():
         return None
-    with h5py.File(timefile, 'r') as h5f:
-        dset = h5f['tseries']
-        _, ncols = dset.shape
-        ncols -= 1  # first is istep
-        h5names = h5f['names'].asstr()[len(colnames) + 1:]
-        _tidy_names(colnames, ncols, h5names)
-        data = dset[()]
-    pdf = pd.DataFrame(data[:, 1:],
-                       index=np.int_(data[:, 0]), columns=colnames)
-    # remove duplicated lines in case of restart
-    return pdf.loc[~pdf.index.duplicated(keep='last')]
-
-
-def _extract_rsnap_isteps(
-    rproffile: Path, data: DataFrame
-) -> List[Tuple[int, float, DataFrame]]:
-    """Extract istep, time and build separate rprof df."""
-    step_regex = re.compile(r'^\*+step:\s*(\d+) ; time =\s*(\S+)')
-    isteps = []  # list of (istep, time, df)
-    line = ' '
-    with rproffile.open() as stream:
-        while line[0] != '*':
-            line = stream.readline()
-        match = step_regex.match(line)
+    pdf, _ = time_series_h5_chunk(timefile, colnames)
+    if pdf is None:
+        return None
+    return _drop_restarted(pdf)
+
+
+_RPROF_HEADER = re.compile(rb'^\*[^\n]*', re.MULTILINE)
+_RPROF_STEP = re.compile(rb'^\*+step:\s*(\d+) ; time =\s*(\S+)')
+
+
+def rprof_blocks(
+    rproffile: Path, start: int = 0,
+    blocks: Optional[List[Tuple[int, float, int, int]]] = None,
+) -> Tuple[List[Tuple[int, float, int, int]], int]:
+    """Find radial profile blocks in a rprof.dat file.
+
+    The file is scanned once for the headers of profile blocks.  Blocks made
+    useless by restarts of the run are discarded.  Only complete lines are
+    considered, so that the file can be followed while StagYY is writing it.
+
+    Args:
+        rproffile: path of the rprof.dat file.
+        start: offset from which the file is scanned.
+        blocks: blocks found before :data:`start` by a previous call.
+
+    Returns:
+        A tuple (blocks, end).  :data:`blocks` is a list of (istep, time,
+        start, end) tuples, :data:`start` and :data:`end` being the byte
+        offsets of the profiles of the time step in the file.  :data:`end` is
+        the offset following the last complete line, from which the file
+        should be scanned next.
+    """
+    blocks = [] if blocks is None else list(blocks)
+    end, _, _ = _add_rprof_blocks(rproffile, start, blocks)
+    return blocks, end
+
+
+def _add_rprof_blocks(
+    rproffile: Path, start: int, blocks: List[Tuple[int, float, int, int]]
+) -> Tuple[int, int, List[Tuple[int, float, int, int]]]:
+    """Add radial profile blocks found after an offset to a list in place.
+
+    See :func:`rprof_blocks`, the work done is proportional to the size of
+    the part of the file scanned and to the number of new blocks.
+
+    Args:
+        rproffile: path of the rprof.dat file.
+        start: offset from which the file is scanned.
+        blocks: blocks found before :data:`start`, modified in place.
+
+    Returns:
+        A tuple (end, nkeep, removed).  :data:`end` is the offset from which
+        the file should be scanned next, :data:`nkeep` is the number of
+        leading blocks left unchanged, and :data:`removed` holds the blocks
+        that were changed or removed.
+    """
+    with rproffile.open('rb') as fid:
+        try:
+            fmap = mmap.mmap(fid.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return start, len(blocks), []
+        with fmap:
+            tail = max(fmap.rfind(b'\n', start) + 1, start)
+            headers = [(hdr.group(), hdr.start(), hdr.end() + 1)
+                       for hdr in _RPROF_HEADER.finditer(fmap, start, tail)]
+    nkeep = len(blocks)
+    removed = []
+    if blocks:
+        # profiles of the last block may have been written since
+        istep, time, bstart, bend = blocks[-1]
+        end = headers[0][1] if headers else tail
+        if end != bend:
+            removed.append(blocks[-1])
+            blocks[-1] = (istep, time, bstart, end)
+            nkeep -= 1
+    ends = [hstart for _, hstart, _ in headers[1:]] + [tail]
+    for (header, _, bstart), bend in zip(headers, ends):
+        match = _RPROF_STEP.match(header)
         if match is None:
-            raise ParsingError(rproffile, f"Badly formatted line {line!r}")
+            raise ParsingError(rproffile, f"Badly formatted line {header!r}")
         istep = int(match.group(1))
-        time = float(match.group(2))
-        nlines = 0
-        iline = 0
-        for line in stream:
-            if line[0] == '*':
-                isteps.append((istep, time, data.iloc[iline - nlines:iline]))
-                match = step_regex.match(line)
-                if match is None:
-                    raise ParsingError(rproffile,
-                                       f"Badly formatted line {line!r}")
-                istep = int(match.group(1))
-                time = float(match.group(2))
-                nlines = 0
-                # remove useless lines produced when run is restarted
-                while isteps and istep <= isteps[-1][0]:
-                    isteps.pop()
-            else:
-                nlines += 1
-                iline += 1
-        isteps.append((istep, time, data.iloc[iline - nlines:iline]))
-    return isteps
+        # remove useless blocks produced when run is restarted
+        while blocks and istep <= blocks[-1][0]:
+            removed.append(blocks.pop())
+        nkeep = min(nkeep, len(blocks))
+        blocks.append((istep, float(match.group(2)), min(bstart, bend), bend))
+    return tail, nkeep, removed
+
+
+class RprofFile(abc.Mapping):
+    """Radial profiles of a rprof.dat file.
+
+    This maps time steps to their radial profiles
+    (:class:`pandas.DataFrame`).  Profile blocks are located once when the
+    instance is created, the profiles of a given time step are only read
+    when they are requested.  Blocks written afterwards are found with
+    :meth:`refresh`.
+
+    Args:
+        rproffile: path of the rprof.dat file.
+        colnames: names of the variables expected in :data:`rproffile`.
+
+    Attributes:
+        blocks: list of (istep, time, start, end) tuples, see
+            :func:`rprof_blocks`.
+    """
+
+    def __init__(self, rproffile: Path, colnames: List[str]):
+        self._path = rproffile
+        self._colnames = colnames
+        self.blocks: List[Tuple[int, float, int, int]] = []
+        self._scanned = 0
+        self._offsets: Dict[int, Tuple[int, int]] = {}
+        self._data: Dict[int, DataFrame] = {}
+        # time steps and times of blocks, grown as new blocks are found
+        self._tsteps = GrowingArray(np.empty(0, dtype=np.int_))
+        self._tvalues = GrowingArray(np.empty(0))
+        self._times: Optional[DataFrame] = None
+        self.refresh()
+
+    def __getitem__(self, istep: int) -> DataFrame:
+        if istep not in self._data:
+            start, end = self._offsets[istep]
+            with self._path.open('rb') as fid:
+                fid.seek(start)
+                content = fid.read(end - start)
+            self._data[istep] = self._read_block(content)
+        return self._data[istep]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def refresh(self) -> int:
+        """Find profile blocks written since the file was last scanned.
+
+        Only the part of the file written since the last scan is read, unless
+        the file shrank in which case it is scanned again entirely.
+
+        Returns:
+            the number of leading blocks left unchanged.
+        """
+        try:
+            size = self._path.stat().st_size
+        except OSError:
+            size = 0
+        nkeep = len(self.blocks)
+        removed: List[Tuple[int, float, int, int]] = []
+        if size < self._scanned:
+            removed, self.blocks, self._scanned = self.blocks, [], 0
+            nkeep = 0
+        if size > self._scanned:
+            self._scanned, nkeep_scan, removed_scan = _add_rprof_blocks(
+                self._path, self._scanned, self.blocks)
+            nkeep = min(nkeep, nkeep_scan)
+            removed.extend(removed_scan)
+        for istep, _, _, _ in removed:
+            self._data.pop(istep, None)
+            self._offsets.pop(istep, None)
+        new_blocks = self.blocks[nkeep:]
+        self._offsets.update((istep, (start, end))
+                             for istep, _, start, end in new_blocks)
+        # times of changed blocks whose end only moved are kept
+        ntimes = nkeep
+        tsteps, tvalues = self._tsteps.values, self._tvalues.values
+        while (ntimes < min(len(tsteps), len(self.blocks)) and
+               self.blocks[ntimes][:2] == (tsteps[ntimes], tvalues[ntimes])):
+            ntimes += 1
+        if ntimes < len(tsteps) or ntimes < len(self.blocks):
+            self._tsteps.truncate(ntimes)
+            self._tvalues.truncate(ntimes)
+            self._tsteps.append(np.array(
+                [istep for istep, _, _, _ in self.blocks[ntimes:]],
+                dtype=np.int_))
+            self._tvalues.append(np.array(
+                [time for _, time, _, _ in self.blocks[ntimes:]]))
+            self._times = None
+        return nkeep
+
+    @property
+    def times(self) -> DataFrame:
+        """Time indexed by time steps."""
+        if self._times is None:
+            self._times = pd.DataFrame(self._tvalues.values[:, np.newaxis],
+                                       index=self._tsteps.values)
+        return self._times
+
+    def array(self, first: int = 0) -> Tuple[ndarray, ndarray, List[str]]:
+        """Read the profiles of several time steps at once.
+
+        The profile blocks are parsed as a single table, which is much faster
+        than reading each block separately.
+
+        Args:
+            first: index in :attr:`blocks` of the first block to read.
+
+        Returns:
+            A tuple (isteps, profs, names), see :func:`rprof_array`.
+        """
+        blocks = self.blocks[first:]
+        isteps = np.array([istep for istep, _, _, _ in blocks], dtype=np.int_)
+        if not blocks:
+            return self._padded(isteps)
+        with self._path.open('rb') as fid:
+            fid.seek(blocks[0][2])
+            content = fid.read(blocks[-1][3] - blocks[0][2])
+        offset = blocks[0][2]
+        segments = [content[start - offset:end - offset].rstrip() + b'\n'
+                    for _, _, start, end in blocks]
+        nrows = [len(seg.split(b'\n')) - 1 if seg.strip() else 0
+                 for seg in segments]
+        if sum(nrows) == 0:
+            return self._padded(isteps)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', pd.errors.DtypeWarning)
+            data = pd.read_csv(io.BytesIO(b''.join(segments)),
+                               delim_whitespace=True, header=None,
+                               engine='c', on_bad_lines='skip',
+                               skip_blank_lines=False)
+        if data.shape[0] != sum(nrows):
+            # malformed or ragged blocks, read them one by one
+            return self._padded(isteps)
+        values = _numeric_columns(data).to_numpy(dtype=np.float64)
+        names = list(self._colnames)
+        _tidy_names(names, values.shape[1])
+        if len(set(nrows)) == 1:
+            profs = values.reshape(len(nrows), nrows[0], values.shape[1])
+            return isteps, profs, names
+        profs = np.full((len(nrows), max(nrows), values.shape[1]), np.nan)
+        bounds = np.cumsum([0] + nrows)
+        for iblock, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            profs[iblock, :end - start] = values[start:end]
+        return isteps, profs, names
+
+    def _padded(self, isteps: ndarray) -> Tuple[ndarray, ndarray, List[str]]:
+        """Gather profiles read block by block."""
+        profs, names = _stack_rprofs([self[istep] for istep in isteps])
+        return isteps, profs, names
+
+    def _read_block(self, content: bytes) -> DataFrame:
+        """Parse profiles of a block."""
+        if not content.strip():
+            return pd.DataFrame(columns=list(self._colnames))
+        with warnings.catch_warnings():
+            # columns with malformed values are handled by _numeric_columns
+            warnings.simplefilter('ignore', pd.errors.DtypeWarning)
+            data = pd.read_csv(io.BytesIO(content), delim_whitespace=True,
+                               header=None, engine='c', on_bad_lines='skip')
+        data = _numeric_columns(data)
+        step_cols = list(self._colnames)
+        _tidy_names(step_cols, data.shape[1])
+        data.columns = step_cols
+        return data
 
 
 def rprof(
     rproffile: Path, colnames: List[str]
-) -> Tuple[Dict[int, DataFrame], Optional[DataFrame]]:
+) -> Tuple[Mapping[int, DataFrame], Optional[DataFrame]]:
     """Extract radial profiles data.
 
     If :data:`colnames` is too long, it will be truncated. If it is too short,
@@ -171,30 +560,57 @@ def rprof(
         colnames: names of the variables expected in :data:`rproffile`.
 
     Returns:
-        A tuple (profs, times). :data:`profs` is a dict mapping istep to radial
-        profiles (:class:`pandas.DataFrame`). :data:`times` is the time indexed
-        by time steps.
+        A tuple (profs, times). :data:`profs` is a :class:`RprofFile` mapping
+        istep to radial profiles (:class:`pandas.DataFrame`), profiles are
+        only read when accessed. :data:`times` is the time indexed by time
+        steps.
     """
     if not rproffile.is_file():
         return {}, None
-    data = pd.read_csv(rproffile, delim_whitespace=True, dtype=str,
-                       header=None, comment='*', skiprows=1,
-                       engine='c', memory_map=True, on_bad_lines='skip')
-    data = data.apply(pd.to_numeric, raw=True, errors='coerce')
+    profs = RprofFile(rproffile, colnames)
+    if not profs.blocks:
+        return {}, None
+    return profs, profs.times
 
-    isteps = _extract_rsnap_isteps(rproffile, data)
 
-    data = {}
-    for istep, _, step_df in isteps:
-        step_df.index = range(step_df.shape[0])  # check whether necessary
-        step_cols = list(colnames)
-        _tidy_names(step_cols, step_df.shape[1])
-        step_df.columns = step_cols
-        data[istep] = step_df
+def _stack_rprofs(
+    frames: Sequence[DataFrame]
+) -> Tuple[ndarray, List[str]]:
+    """Stack profiles, padding short ones with NaN."""
+    nz = max((frame.shape[0] for frame in frames), default=0)
+    widest = max(frames, key=lambda frame: frame.shape[1], default=None)
+    names = [] if widest is None else list(widest.columns)
+    profs = np.full((len(frames), nz, len(names)), np.nan)
+    for iprof, frame in enumerate(frames):
+        nrows, ncols = frame.shape
+        profs[iprof, :nrows, :ncols] = frame.to_numpy(dtype=np.float64)
+    return profs, names
 
-    df_times = pd.DataFrame(list(map(itemgetter(1), isteps)),
-                            index=map(itemgetter(0), isteps))
-    return data, df_times
+
+def rprof_array(
+    profs: Mapping[int, DataFrame], first: int = 0
+) -> Tuple[ndarray, ndarray, List[str]]:
+    """Gather radial profiles of all time steps in a single array.
+
+    Profiles of a :class:`RprofFile` are read from the file in one go.
+    Profiles with fewer points or variables than the others are padded with
+    NaN.
+
+    Args:
+        profs: radial profiles indexed by time steps, as returned by
+            :func:`rprof` or :func:`rprof_h5`.
+        first: index of the first time step of :data:`profs` to gather.
+
+    Returns:
+        A tuple (isteps, profs, names). :data:`isteps` is the array of time
+        steps, :data:`profs` is a (nsteps, nz, nvars) array of profiles, and
+        :data:`names` the list of variable names.
+    """
+    if isinstance(profs, RprofFile):
+        return profs.array(first)
+    isteps = np.fromiter(profs.keys(), dtype=np.int_, count=len(profs))
+    values, names = _stack_rprofs(list(profs.values())[first:])
+    return isteps[first:], values, names
 
 
 def rprof_h5(
@@ -346,6 +762,7 @@ class _HeaderInfo(typing.NamedTuple):
     magic: int
     nval: int
     sfield: bool
+    file64: bool
     readbin: Callable
     header: Dict[str, Any]
 
@@ -355,7 +772,8 @@ def _legacy_header(filepath: Path, fid: BinaryIO,
     """Read the header of a legacy binary file."""
     readbin = partial(_readbin, fid)
     magic = readbin()
-    if magic > 8000:  # 64 bits
+    file64 = magic > 8000
+    if file64:
         magic -= 8000
         readbin()  # need to read 4 more bytes
         readbin = partial(readbin, file64=True)
@@ -374,7 +792,7 @@ def _legacy_header(filepath: Path, fid: BinaryIO,
     if magic < 9:
         raise ParsingError(filepath, 'magic < 9 not supported')
 
-    header_info = _HeaderInfo(magic, nval, sfield, readbin, {})
+    header_info = _HeaderInfo(magic, nval, sfield, file64, readbin, {})
     header = header_info.header
     # extra ghost point in horizontal direction
     header['xyp'] = int(nval == 4)  # magic >= 9
@@ -451,14 +869,224 @@ def field_header(fieldfile: Path) -> Optional[Dict[str, Any]]:
     return hdr.header
 
 
-def fields(fieldfile: Path) -> Optional[Tuple[Dict[str, Any], ndarray]]:
+def _box_bounds(box: Sequence[slice],
+                shape: Sequence[int]) -> List[Tuple[int, int]]:
+    """Compute bounds of the smallest region containing a box.
+
+    Args:
+        box: slices along each dimension.
+        shape: shape of the sliced array.
+    Returns:
+        the lower (included) and upper (excluded) bounds along each dimension.
+    """
+    bounds = []
+    for slc, size in zip(box, shape):
+        rng = range(*slc.indices(size))
+        bounds.append((min(rng), max(rng) + 1) if rng else (0, 0))
+    return bounds
+
+
+def _box_region(
+    first: Sequence[int], size: Sequence[int],
+    bounds: Sequence[Tuple[int, int]]
+) -> Optional[Tuple[List[slice], List[slice]]]:
+    """Intersect a subdomain with a region.
+
+    Args:
+        first: global index of the first point of the subdomain.
+        size: number of points of the subdomain in each direction.
+        bounds: bounds of the region, see :func:`_box_bounds`.
+    Returns:
+        the slices of the intersection in the subdomain and in the region,
+        None if they don't intersect.
+    """
+    local = [slice(max(low - start, 0), min(high - start, length))
+             for (low, high), start, length in zip(bounds, first, size)]
+    if any(slc.start >= slc.stop for slc in local):
+        return None
+    dest = [slice(start + slc.start - low, start + slc.stop - low)
+            for slc, start, (low, _) in zip(local, first, bounds)]
+    return local, dest
+
+
+def subdomain_edges(header: Dict[str, Any]) -> List[ndarray]:
+    """Boundaries of parallel subdomains in assembled fields.
+
+    Args:
+        header: geometry information.  Fields are assumed to be split in one
+            subdomain per block if the number of subdomains along blocks
+            isn't specified.
+    Returns:
+        for x, y, z directions and blocks, the index of the first point of
+        each subdomain followed by the number of points.
+    """
+    ntot = [*header['nts'], header['ntb']]
+    ncpu = [*header['ncs'], header.get('ncb', header['ntb'])]
+    edges = [np.arange(ncs + 1) * (nts // ncs)
+             for nts, ncs in zip(ntot, ncpu)]
+    for edge in edges[:2]:
+        edge[-1] += header['xyp']
+    return edges
+
+
+class LegacyFieldFile:
+    """Memory-mapped legacy binary field file.
+
+    The file is mapped once when the instance is created.  The data of each
+    parallel subdomain is exposed as a view of that mapping, field values are
+    only copied (and scaled) when the full field array is assembled.
+
+    Args:
+        fieldfile: path of the binary field file.
+
+    Attributes:
+        header: the header information of the binary file.
+        nval: number of values per grid point.
+        sfield: whether the file contains surface fields.
+        npc: number of points in (e1, e2, e3) directions per subdomain.
+        nbk: number of blocks per subdomain.
+    """
+
+    def __init__(self, fieldfile: Path):
+        with fieldfile.open('rb') as fid:
+            hdr = _legacy_header(fieldfile, fid)
+            header = hdr.header
+            header['scalefac'] = hdr.readbin('f') if hdr.nval > 1 else 1
+            offset = fid.tell()
+        self.header = header
+        self.nval = hdr.nval
+        self.sfield = hdr.sfield
+        self.npc = header['nts'] // header['ncs']
+        self.nbk = header['ntb'] // header['ncb']
+        xyp = header['xyp']
+        # subdomains are written in (block, z, y, x) order, and values within
+        # a subdomain are indexed by (block, z, y, x, variable)
+        shape = (header['ncb'], *header['ncs'][::-1],
+                 self.nbk, self.npc[2], self.npc[1] + xyp,
+                 self.npc[0] + xyp, self.nval)
+        dtype = 'f8' if hdr.file64 else 'f4'
+        try:
+            self._data = np.memmap(fieldfile, dtype=dtype, mode='r',
+                                   offset=offset, shape=shape)
+        except ValueError:
+            raise ParsingError(fieldfile, 'file is too short')
+
+    def subdomains(self) -> Iterator[Tuple[int, int, int, int]]:
+        """Iterate through indices of parallel subdomains.
+
+        Yields:
+            tuple (icpu block, icpu z, icpu y, icpu x).
+        """
+        yield from product(*map(range, self._data.shape[:4]))
+
+    def block(self, icpu: Tuple[int, int, int, int]) -> ndarray:
+        """Unscaled data of a parallel subdomain.
+
+        Args:
+            icpu: index of the subdomain, see :meth:`subdomains`.
+        Returns:
+            a read-only view of the mapped file indexed by variable,
+            x-direction, y-direction, z-direction, block.
+        """
+        return self._data[icpu].transpose()
+
+    def block_slices(
+        self, icpu: Tuple[int, int, int, int]
+    ) -> Tuple[slice, ...]:
+        """Position of a subdomain in the assembled array.
+
+        Args:
+            icpu: index of the subdomain, see :meth:`subdomains`.
+        Returns:
+            slices along x-direction, y-direction, z-direction, block.
+        """
+        npc = self.npc
+        xyp = self.header['xyp']
+        return (slice(icpu[3] * npc[0], (icpu[3] + 1) * npc[0] + xyp),
+                slice(icpu[2] * npc[1], (icpu[2] + 1) * npc[1] + xyp),
+                slice(icpu[1] * npc[2], (icpu[1] + 1) * npc[2]),
+                slice(icpu[0] * self.nbk, (icpu[0] + 1) * self.nbk))
+
+    def assemble(self, ivars: Optional[Sequence[int]] = None,
+                 box: Optional[Sequence[slice]] = None,
+                 dtype: DTypeLike = np.float64) -> ndarray:
+        """Build the array of fields.
+
+        Args:
+            ivars: indices of the variables to extract.  All variables are
+                extracted if set to None.  Values of a given point are
+                interleaved in the file, only the requested ones are copied.
+            box: if not None, only this region of the fields is extracted, as
+                slices along the x, y, z directions and blocks.  Missing
+                slices select the whole extent of their direction.  Only the
+                parts of the file holding the region are then read, except
+                for surface fields.
+            dtype: data type of the returned array.
+
+        Returns:
+            an array of scalar fields indexed by variable, x-direction,
+            y-direction, z-direction, block.
+        """
+        header = self.header
+        if ivars is None or self.sfield:
+            icomps: Sequence[int] = range(self.nval)
+        else:
+            icomps = ivars
+        shape = [header['nts'][0] + header['xyp'],
+                 header['nts'][1] + header['xyp'],
+                 header['nts'][2],
+                 header['ntb']]
+        bounds = None
+        if box is not None:
+            box = [*box, *(slice(None) for _ in range(4 - len(box)))]
+            if not self.sfield:
+                bounds = _box_bounds(box, shape)
+                shape = [high - low for low, high in bounds]
+        flds = np.empty((len(icomps), *shape), dtype=dtype)
+        for icpu in self.subdomains():
+            block = self.block(icpu)
+            slices = self.block_slices(icpu)
+            if bounds is not None:
+                intersection = _box_region(
+                    [slc.start for slc in slices],
+                    [slc.stop - slc.start for slc in slices], bounds)
+                if intersection is None:
+                    continue
+                region, dest = intersection
+                slices = tuple(dest)
+                # only the pages of the mapped file holding the region are
+                # actually read
+                block = block[(slice(None), *region)]
+            for iout, icomp in enumerate(icomps):
+                # scaling is performed with the precision of the file
+                np.multiply(block[icomp], header['scalefac'],
+                            dtype=block.dtype, out=flds[(iout,) + slices])
+        if self.sfield:
+            # for surface fields, variables are written along z direction
+            flds = np.swapaxes(flds, 0, 3)
+            if ivars is not None:
+                flds = flds[list(ivars)]
+        if box is not None:
+            if bounds is not None:
+                # the smallest region containing the box was read
+                box = [slice(None, None, slc.step) for slc in box]
+            flds = flds[(slice(None), *box)]
+        return flds
+
+
+def fields(
+    fieldfile: Path, ivars: Optional[Sequence[int]] = None,
+    box: Optional[Sequence[slice]] = None, dtype: DTypeLike = np.float64
+) -> Optional[Tuple[Dict[str, Any], ndarray]]:
     """Extract fields data.
 
     Args:
         fieldfile: path of the binary field file.
-        only_header: when True (and :data:`only_istep` is False), only
-            :data:`header` is returned.
-        only_istep: when True, only :data:`istep` is returned.
+        ivars: indices of the variables to extract.  All variables are
+            extracted if set to None.
+        box: if not None, only this region of the fields is extracted, see
+            :meth:`LegacyFieldFile.assemble`.
+        dtype: data type of the fields.
 
     Returns:
         the tuple :data:`(header, fields)`.  :data:`fields` is an array of
@@ -467,68 +1095,40 @@ def fields(fieldfile: Path) -> Optional[Tuple[Dict[str, Any], ndarray]]:
     """
     if not fieldfile.is_file():
         return None
-    with fieldfile.open('rb') as fid:
-        hdr = _legacy_header(fieldfile, fid)
-        header = hdr.header
-
-        # READ FIELDS
-        # number of points in (e1, e2, e3) directions PER CPU
-        npc = header['nts'] // header['ncs']
-        # number of blocks per cpu
-        nbk = header['ntb'] // header['ncb']
-        # number of values per 'read' block
-        npi = (npc[0] + header['xyp']) * (npc[1] + header['xyp']) * npc[2] * \
-            nbk * hdr.nval
-
-        header['scalefac'] = hdr.readbin('f') if hdr.nval > 1 else 1
-
-        flds = np.zeros((hdr.nval,
-                         header['nts'][0] + header['xyp'],
-                         header['nts'][1] + header['xyp'],
-                         header['nts'][2],
-                         header['ntb']))
-
-        # loop over parallel subdomains
-        for icpu in product(range(header['ncb']),
-                            range(header['ncs'][2]),
-                            range(header['ncs'][1]),
-                            range(header['ncs'][0])):
-            # read the data for one CPU
-            data_cpu = hdr.readbin('f', npi) * header['scalefac']
-
-            # icpu is (icpu block, icpu z, icpu y, icpu x)
-            # data from file is transposed to obtained a field
-            # array indexed with (x, y, z, block), as in StagYY
-            flds[:,
-                 icpu[3] * npc[0]:(icpu[3] + 1) * npc[0] + header['xyp'],  # x
-                 icpu[2] * npc[1]:(icpu[2] + 1) * npc[1] + header['xyp'],  # y
-                 icpu[1] * npc[2]:(icpu[1] + 1) * npc[2],  # z
-                 icpu[0] * nbk:(icpu[0] + 1) * nbk  # block
-                 ] = np.transpose(data_cpu.reshape(
-                     (nbk, npc[2], npc[1] + header['xyp'],
-                      npc[0] + header['xyp'], hdr.nval)))
-        if hdr.sfield:
-            # for surface fields, variables are written along z direction
-            flds = np.swapaxes(flds, 0, 3)
-    return header, flds
+    fieldmap = LegacyFieldFile(fieldfile)
+    return fieldmap.header, fieldmap.assemble(ivars, box, dtype)
 
 
-def tracers(tracersfile: Path) -> Optional[Dict[str, List[ndarray]]]:
+def tracers(
+    tracersfile: Path, names: Optional[Iterable[str]] = None,
+    memmap: bool = False
+) -> Optional[Dict[str, List[ndarray]]]:
     """Extract tracers data.
 
+    Tracers data is written as one record per tracer holding all its
+    attributes.  Records are read at once as a structured array, the data
+    of each attribute being a view of that array.  When only a few
+    attributes are requested, they are gathered from the memory-mapped file
+    instead so that the other attributes are never held in memory.
+
     Args:
         tracersfile (:class:`pathlib.Path`): path of the binary tracers file.
+        names: names of the attributes to extract, all attributes are
+            extracted if set to None.  Only the extracted attributes are
+            held in memory.
+        memmap: if True, the data is a read-only view of the memory-mapped
+            file instead of being read in memory.
 
     Returns:
         Tracers data organized by attribute names and blocks.
     """
     if not tracersfile.is_file():
         return None
-    tra: Dict[str, List[ndarray]] = {}
     with tracersfile.open('rb') as fid:
         readbin = partial(_readbin, fid)
         magic = readbin()
-        if magic > 8000:  # 64 bits
+        file64 = magic > 8000
+        if file64:
             magic -= 8000
             readbin()
             readbin = partial(readbin, file64=True)
@@ -545,38 +1145,166 @@ def tracers(tracersfile: Path) -> Optional[Dict[str, List[ndarray]]]:
         curv = readbin()
         if curv:
             readbin('f')  # r_cmb
-        infos = []  # list of info names
-        for _ in range(ninfo):
-            infos.append(b''.join(readbin('b', 16)).strip().decode())
-            tra[infos[-1]] = []
+        # info names are stored on 16 bytes (one byte per word)
+        infos = [fid.read(16).strip().decode() for _ in range(ninfo)]
         if magic > 200:
             ntrace_elt = readbin()
             if ntrace_elt > 0:
                 readbin('f', ntrace_elt)  # outgassed
-        for ntrab in ntra:  # blocks
-            data = readbin('f', ntrab * ninfo)
-            for idx, info in enumerate(infos):
-                tra[info].append(data[idx::ninfo])
-    return tra
+        offset = fid.tell()
+    records_dtype = np.dtype([(info, 'f8' if file64 else 'f4')
+                              for info in infos])
+    nrecords = int(np.sum(ntra))
+    if names is None:
+        keep = infos
+    else:
+        names = set(names)
+        keep = [info for info in infos if info in names]
+    records: ndarray
+    # gathering a few attributes from the memory-mapped file spares memory,
+    # reading all records sequentially is faster when most are needed
+    if memmap or 2 * len(keep) <= len(infos):
+        try:
+            records = np.memmap(tracersfile, dtype=records_dtype, mode='r',
+                                offset=offset, shape=(nrecords,))
+        except ValueError:
+            raise ParsingError(tracersfile, 'file is too short')
+        if not memmap:
+            # only copy the requested attributes
+            records = repack_fields(records[keep])
+    else:
+        records = np.fromfile(tracersfile, dtype=records_dtype,
+                              count=nrecords, offset=offset)
+        if records.size < nrecords:
+            raise ParsingError(tracersfile, 'file is too short')
+        if len(keep) < len(infos):
+            records = repack_fields(records[keep])
+    bounds = np.concatenate(([0], np.cumsum(ntra)))
+    return {info: [records[info][start:stop]
+                   for start, stop in zip(bounds[:-1], bounds[1:])]
+            for info in keep}
+
+
+class _H5Handle:
+    """Open HDF5 file and number of its current users."""
+
+    def __init__(self, h5file: h5py.File):
+        self.file = h5file
+        self.users = 0
 
 
-def _read_group_h5(filename: Path, groupname: str) -> ndarray:
+class H5FilePool:
+    """Pool of HDF5 files opened read-only.
+
+    Files are kept open between reads, and the least recently used ones are
+    closed when there are more than ``max_open`` of them.  Files being read
+    are never closed, the pool can therefore be shared between threads.
+
+    Args:
+        max_open: maximum number of files kept open.
+    """
+
+    def __init__(self, max_open: int = 64):
+        self.max_open = max_open
+        self._handles: OrderedDict[Path, _H5Handle] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> H5FilePool:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def _release(self, path: Path, handle: _H5Handle) -> None:
+        """Close file if it is no longer used nor pooled."""
+        if handle.users == 0 and self._handles.get(path) is not handle:
+            handle.file.close()
+
+    @contextmanager
+    def open(self, filename: Path) -> Iterator[h5py.File]:
+        """Context manager giving access to an open HDF5 file.
+
+        Args:
+            filename: path of the HDF5 file.
+        """
+        with self._lock:
+            handle = self._handles.pop(filename, None)
+            if handle is None:
+                handle = _H5Handle(h5py.File(filename, 'r'))
+            self._handles[filename] = handle
+            handle.users += 1
+            idle = [path for path, hdl in self._handles.items()
+                    if hdl.users == 0]
+            for path in idle[:max(len(self._handles) - self.max_open, 0)]:
+                self._release(path, self._handles.pop(path))
+        try:
+            yield handle.file
+        finally:
+            with self._lock:
+                handle.users -= 1
+                self._release(filename, handle)
+
+    def close(self) -> None:
+        """Close all the files.
+
+        Files currently being read are closed once the read is done.
+        """
+        with self._lock:
+            handles = list(self._handles.items())
+            self._handles.clear()
+            for path, handle in handles:
+                self._release(path, handle)
+
+
+def _read_group_h5(h5pool: H5FilePool, filename: Path, groupname: str,
+                   shape: Tuple[int, ...], icomp: Optional[int] = None,
+                   box: Tuple[slice, ...] = (),
+                   out: Optional[ndarray] = None) -> ndarray:
     """Return group content.
 
     Args:
+        h5pool: pool of HDF5 files.
         filename: path of hdf5 file.
         groupname: name of group to read.
+        shape: shape of the group content.  Components, if any, are the last
+            dimension, i.e. they are the fastest varying index.
+        icomp: if not None, only this component is read.
+        box: region of the group to read, as slices along the leading
+            dimensions of shape.  Only this region is read from the file if
+            the group isn't stored as a flat array.
+        out: if not None, the whole group is read in this contiguous array
+            of the same size instead of a new one.  It is ignored if icomp
+            or box are set.
     Returns:
         content of group.
     """
     try:
-        with h5py.File(filename, 'r') as h5f:
-            data = h5f[groupname][()]
+        with h5pool.open(filename) as h5f:
+            dset = h5f[groupname]
+            if out is not None and icomp is None and not box:
+                if out.size != dset.size:
+                    raise ParsingError(filename,
+                                       f'{groupname} has unexpected size')
+                # low-level read, faster than read_direct for small groups
+                dset.id.read(h5py.h5s.ALL, h5py.h5s.ALL, out)
+                return out.reshape(shape)
+            if box and dset.ndim > 1:
+                # hyperslab selection
+                sel: Tuple[Any, ...] = box
+                if icomp is not None:
+                    sel = (*box, ..., icomp)
+                return dset[sel]
+            if icomp is None:
+                data = dset[()]
+            elif dset.ndim > 1:
+                data = dset[..., icomp]
+            else:
+                data = dset[icomp::shape[-1]]
     except OSError as err:
         # h5py doesn't always include the filename in its error messages
         err.args += (filename,)
         raise
-    return data  # need to be reshaped
+    return data.reshape(shape if icomp is None else shape[:-1])[box]
 
 
 def _make_3d(field: ndarray, twod: Optional[str]) -> ndarray:
@@ -642,20 +1370,23 @@ def _conglomerate_meshes(meshin: List[Dict[str, ndarray]],
     return meshout
 
 
-def _read_coord_h5(files: List[Path], shapes: List[Tuple[int, ...]],
-                   header: Dict[str, Any], twod: Optional[str]) -> None:
+def _read_coord_h5(h5pool: H5FilePool, files: List[Path],
+                   shapes: List[Tuple[int, ...]], header: Dict[str, Any],
+                   twod: Optional[str], dtype: DTypeLike) -> None:
     """Read all coord hdf5 files of a snapshot.
 
     Args:
+        h5pool: pool of HDF5 files.
         files: list of NodeCoordinates files of a snapshot.
         shapes: shape of mesh grids.
         header: geometry info.
         twod: 'XZ', 'YZ' or None depending on what is relevant.
+        dtype: data type of the meshes.
     """
     all_meshes: List[Dict[str, ndarray]] = []
     for h5file, shape in zip(files, shapes):
         all_meshes.append({})
-        with h5py.File(h5file, 'r') as h5f:
+        with h5pool.open(h5file) as h5f:
             for coord, mesh in h5f.items():
                 # for some reason, the array is transposed!
                 all_meshes[-1][coord] = mesh[()].reshape(shape).T
@@ -665,7 +1396,8 @@ def _read_coord_h5(files: List[Path], shapes: List[Tuple[int, ...]],
     header['nts'] = list((all_meshes[0]['X'].shape[i] - 1) * header['ncs'][i]
                          for i in range(3))
     header['nts'] = np.array([max(1, val) for val in header['nts']])
-    meshes = _conglomerate_meshes(all_meshes, header)
+    meshes = {coord: mesh.astype(dtype, copy=False) for coord, mesh
+              in _conglomerate_meshes(all_meshes, header).items()}
     if np.any(meshes['Z'][:, :, 0] != 0):
         # spherical
         if twod is not None:  # annulus geometry...
@@ -702,47 +1434,377 @@ def _read_coord_h5(files: List[Path], shapes: List[Tuple[int, ...]],
     header['e3_coord'] = header['e3_coord'][:-1]
 
 
-def _try_get(file: Path, elt: Element, key: str) -> str:
-    """Try getting an attribute or raise a ParsingError."""
-    att = elt.get(key)
-    if att is None:
-        raise ParsingError(file, f"Element {elt} has no attribute {key!r}")
-    return att
+def _maybe_get(elt: Element, item: str, info: str,
+               conversion: Optional[Callable[[str], Any]] = None) -> Any:
+    """Extract and convert info if item is present."""
+    maybe_item = elt.find(item)
+    maybe_info = None
+    if maybe_item is not None:
+        maybe_info = maybe_item.get(info)
+        if maybe_info is not None and conversion is not None:
+            maybe_info = conversion(maybe_info)
+    return maybe_info
+
+
+class XdmfItem(typing.NamedTuple):
+    """DataItem of an XDMF document pointing to a group of an HDF5 file."""
+
+    dims: Optional[str]
+    text: Optional[str]
+
+
+class XdmfGrid(typing.NamedTuple):
+    """Subdomain Grid of a snapshot in an XDMF document.
+
+    Missing elements or attributes are recorded as None, a
+    :class:`~stagpy.error.ParsingError` is only raised if they are needed.
+    """
+
+    name: Optional[str]
+    geom_type: Optional[str]
+    geometry: Optional[List[XdmfItem]]
+    attributes: Dict[str, Optional[XdmfItem]]
+
 
+class XdmfSnap(typing.NamedTuple):
+    """Snapshot of an XDMF document."""
 
-def _try_find(file: Path, elt: Element, key: str) -> Element:
-    """Try finding a sub-element or raise a ParsingError."""
-    subelt = elt.find(key)
-    if subelt is None:
-        raise ParsingError(file, f"Element {elt} has no sub-element {key!r}")
-    return subelt
+    time: Optional[float]
+    mo_lambda: Optional[float]
+    mo_thick_sol: Optional[float]
+    grids: List[XdmfGrid]
 
 
-def _try_text(file: Path, elt: Element) -> str:
-    """Try getting text of element or raise a ParsingError."""
-    text = elt.text
-    if text is None:
-        raise ParsingError(file, f"Element {elt} has no 'text'")
-    return text
+def _xdmf_item(elt: Optional[Element]) -> Optional[XdmfItem]:
+    """Record DataItem element."""
+    if elt is None:
+        return None
+    return XdmfItem(elt.get('Dimensions'), elt.text)
+
+
+def _xdmf_grid(elt: Element) -> XdmfGrid:
+    """Record subdomain Grid element."""
+    elt_geom = elt.find('Geometry')
+    geom_type = geometry = None
+    if elt_geom is not None:
+        geom_type = elt_geom.get('Type')
+        geometry = [XdmfItem(item.get('Dimensions'), item.text)
+                    for item in elt_geom.findall('DataItem')]
+    attributes: Dict[str, Optional[XdmfItem]] = {}
+    for elt_attr in elt.findall('Attribute'):
+        name = elt_attr.get('Name')
+        if name is not None and name not in attributes:
+            attributes[name] = _xdmf_item(elt_attr.find('DataItem'))
+    return XdmfGrid(elt.get('Name'), geom_type, geometry, attributes)
+
+
+class XdmfResume(typing.NamedTuple):
+    """Position up to which an XDMF document was indexed.
+
+    Attributes:
+        head: the document up to the start tag of the temporal collection.
+        start: offset of the start tag of the last indexed snapshot.
+        end: offset of the end tag of the last indexed snapshot.
+        digest: SHA-1 digest of the document from start to end, to check
+            that the last indexed snapshot is unchanged.
+    """
+
+    head: bytes
+    start: int
+    end: int
+    digest: str
+
+
+class _XdmfStop(Exception):
+    """Raised to stop parsing after the first temporal collection."""
 
 
-def _get_dim(xdmf_file: Path, data_item: Element) -> Tuple[int, ...]:
+class _XdmfStream:
+    """Streaming parser of the snapshots of an XDMF document.
+
+    Elements are built with a :class:`xml.etree.ElementTree.TreeBuilder` fed
+    by an expat parser, which gives the position of the elements in the
+    document.  Elements are discarded as soon as they are recorded.
+
+    Attributes:
+        data: the bytes fed to the parser.
+        snaps: records of complete snapshots.
+        head_end: offset of the end of the start tag of the temporal
+            collection, None if it wasn't reached.
+        last: offsets of the start tag and end tag of the last complete
+            snapshot, None if there is none.
+    """
+
+    def __init__(self) -> None:
+        self.data = b''
+        self.snaps: List[XdmfSnap] = []
+        self.head_end: Optional[int] = None
+        self.last: Optional[Tuple[int, int]] = None
+        self._grids: List[XdmfGrid] = []
+        self._snap_start = 0
+        # Xdmf, Domain, Temporal Collection, Snapshots, Subdomains.
+        self._parents: List[Element] = []
+        self._builder = xmlET.TreeBuilder()
+        self._parser = expat.ParserCreate()
+        self._parser.buffer_text = True
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = self._builder.data
+
+    def _start(self, tag: str, attrib: Dict[str, str]) -> None:
+        self._parents.append(self._builder.start(tag, attrib))
+        if len(self._parents) == 3:
+            self.head_end = self.data.index(
+                b'>', self._parser.CurrentByteIndex) + 1
+        elif len(self._parents) == 4:
+            self._snap_start = self._parser.CurrentByteIndex
+
+    def _end(self, tag: str) -> None:
+        elt = self._builder.end(tag)
+        self._parents.pop()
+        depth = len(self._parents)
+        if depth == 4 and elt.tag == 'Grid':
+            self._grids.append(_xdmf_grid(elt))
+            self._parents[-1].remove(elt)
+        elif depth == 3:
+            self.snaps.append(XdmfSnap(
+                time=_maybe_get(elt, 'Time', 'Value', float),
+                mo_lambda=_maybe_get(elt, 'mo_lambda', 'Value', float),
+                mo_thick_sol=_maybe_get(elt, 'mo_thick_sol', 'Value', float),
+                grids=self._grids))
+            self._grids = []
+            self._parents[-1].remove(elt)
+            self.last = self._snap_start, self._parser.CurrentByteIndex
+        elif depth == 2:
+            # only the first temporal collection is relevant
+            raise _XdmfStop
+
+    def feed(self, data: bytes, final: bool) -> None:
+        """Parse the document.
+
+        Args:
+            data: the document.
+            final: whether this is the whole document.  If False, a
+                document truncated while being written is not an error.
+        """
+        self.data = data
+        try:
+            self._parser.Parse(data, final)
+        except _XdmfStop:
+            pass
+
+    def resume(self, offset: int) -> Optional[XdmfResume]:
+        """Position up to which the document was parsed.
+
+        Args:
+            offset: offset in the file of the bytes fed after the head.
+        """
+        if self.head_end is None or self.last is None:
+            return None
+        start, end = self.last
+        shift = offset - self.head_end
+        return XdmfResume(self.data[:self.head_end], start + shift,
+                          end + shift, sha1(self.data[start:end]).hexdigest())
+
+
+class XdmfIndex:
+    """Compact index of an XDMF document.
+
+    Only the information needed to locate the data of each snapshot is kept,
+    namely the names of subdomains and the HDF5 files and groups holding
+    their geometry and attributes.  The document is streamed when building
+    the index, the memory needed is therefore proportional to the size of
+    the index rather than the size of the document.  The position up to
+    which the document was parsed is recorded, so that snapshots appended
+    to the document afterwards can be added with :meth:`extend`.
+
+    Args:
+        xdmf_file: path of the xdmf file.
+        snaps: records of snapshots, in the order of the document.
+        resume: position up to which the document was parsed.
+    """
+
+    def __init__(self, xdmf_file: Path, snaps: List[XdmfSnap],
+                 resume: Optional[XdmfResume] = None):
+        self.xdmf_file = xdmf_file
+        self.snaps = snaps
+        self.resume = resume
+        self._subdomains: Dict[Tuple[int, str],
+                               Dict[Tuple[int, int], XdmfItem]] = {}
+
+    @classmethod
+    def parse(cls, xdmf_file: Path) -> XdmfIndex:
+        """Build the index of an xdmf file.
+
+        Args:
+            xdmf_file: path of the xdmf file.
+        Returns:
+            the index of the file.
+        """
+        stream = _XdmfStream()
+        try:
+            stream.feed(xdmf_file.read_bytes(), True)
+        except expat.ExpatError as err:
+            raise ParsingError(xdmf_file, str(err))
+        return cls(xdmf_file, stream.snaps,
+                   stream.resume(stream.head_end or 0))
+
+    def extend(self) -> None:
+        """Add the snapshots appended to the document since it was indexed.
+
+        Only the last indexed snapshot and what follows are read, earlier
+        snapshots being assumed unchanged.  The whole document is parsed
+        again if the last indexed snapshot changed.  Snapshots still being
+        written are left for a later call.
+        """
+        resume = self.resume
+        head = tail = b''
+        if resume is not None:
+            with self.xdmf_file.open('rb') as fid:
+                head = fid.read(len(resume.head))
+                fid.seek(resume.start)
+                tail = fid.read()
+        nlast = 0 if resume is None else resume.end - resume.start
+        if (resume is None or head != resume.head or
+                not tail.startswith(b'</', nlast) or
+                sha1(tail[:nlast]).hexdigest() != resume.digest):
+            index = XdmfIndex.parse(self.xdmf_file)
+            self.snaps, self.resume = index.snaps, index.resume
+            self._subdomains.clear()
+            return
+        # skip the end tag of the last indexed snapshot
+        skip = tail.find(b'>', nlast) + 1 or len(tail)
+        stream = _XdmfStream()
+        try:
+            stream.feed(head + tail[skip:], False)
+        except expat.ExpatError:
+            # what follows the last complete snapshot may be being written,
+            # it is parsed again at the next call
+            pass
+        new_resume = stream.resume(resume.start + skip)
+        if new_resume is not None:
+            self.snaps.extend(stream.snaps)
+            self.resume = new_resume
+
+    def snap(self, snapshot: int) -> XdmfSnap:
+        """Return record of a snapshot.
+
+        Args:
+            snapshot: snapshot number.
+        Returns:
+            the record of the snapshot.
+        """
+        if not 0 <= snapshot < len(self.snaps):
+            raise ParsingError(self.xdmf_file,
+                               f"Snapshot {snapshot} not present")
+        return self.snaps[snapshot]
+
+    def grids(self, snapshot: int) -> Iterator[Tuple[str, XdmfGrid]]:
+        """Iterate through subdomains of a snapshot.
+
+        Args:
+            snapshot: snapshot number.
+        Yields:
+            tuple (name, grid) of each subdomain.
+        """
+        for grid in self.snap(snapshot).grids:
+            if grid.name is None:
+                raise ParsingError(self.xdmf_file,
+                                   f"Grid in snapshot {snapshot} has no Name")
+            yield grid.name, grid
+
+    def subdomains(self, snapshot: int, attribute: str,
+                   ncores: int) -> Dict[Tuple[int, int], XdmfItem]:
+        """Locate an attribute in the subdomains of a snapshot.
+
+        The result is cached so that subdomains can be looked up without
+        going through all of them at each read.
+
+        Args:
+            snapshot: snapshot number.
+            attribute: name of the attribute.
+            ncores: number of cores per block.
+        Returns:
+            the DataItem of the attribute indexed by (block, core), core being
+            the index of the core within its block.  Subdomains without the
+            attribute are omitted.
+        """
+        key = (snapshot, attribute)
+        if key not in self._subdomains:
+            items = {}
+            for name, grid in self.grids(snapshot):
+                if attribute not in grid.attributes:
+                    continue
+                data_item = grid.attributes[attribute]
+                if data_item is None:
+                    raise ParsingError(
+                        self.xdmf_file,
+                        f"Attribute {attribute} has no DataItem")
+                icore = _h5_location(self.xdmf_file, data_item)[2]
+                ibk = int(name.startswith('meshYang'))
+                items[ibk, icore % ncores] = data_item
+            self._subdomains[key] = items
+        return self._subdomains[key]
+
+
+def _get_dim(xdmf_file: Path, data_item: XdmfItem) -> Tuple[int, ...]:
     """Extract shape of data item."""
-    dims = _try_get(xdmf_file, data_item, 'Dimensions')
-    return tuple(map(int, dims.split()))
+    if data_item.dims is None:
+        raise ParsingError(xdmf_file,
+                           f"DataItem {data_item.text} has no Dimensions")
+    return tuple(map(int, data_item.dims.split()))
 
 
-def _get_field(xdmf_file: Path, data_item: Element) -> Tuple[int, ndarray]:
-    """Extract field from data item."""
-    shp = _get_dim(xdmf_file, data_item)
-    data_text = _try_text(xdmf_file, data_item)
-    h5file, group = data_text.strip().split(':/', 1)
+def _h5_location(xdmf_file: Path, data_item: XdmfItem) -> Tuple[str, str, int]:
+    """Extract HDF5 file, group, and index of core from data item."""
+    if data_item.text is None:
+        raise ParsingError(xdmf_file, "DataItem has no 'text'")
+    h5file, group = data_item.text.strip().split(':/', 1)
     # Field on yin is named <var>_XXXXX_YYYYY, on yang is <var>2XXXXX_YYYYY.
     numeral_part = group[-11:]
     icore = int(numeral_part.split('_')[-2]) - 1
+    return h5file, group, icore
+
+
+def _h5_block(group: str) -> int:
+    """Index of the block of a dataset, 1 for yang and 0 otherwise."""
+    # see _h5_location for the naming of datasets
+    return int(group[-12] == '2')
+
+
+def _get_field(
+    h5pool: H5FilePool, xdmf_file: Path, data_item: XdmfItem,
+    icomps: Optional[Sequence[int]] = None, box: Tuple[slice, ...] = (),
+    out: Optional[ndarray] = None
+) -> Tuple[int, ndarray]:
+    """Extract field from data item.
+
+    Args:
+        h5pool: pool of HDF5 files.
+        xdmf_file: path of the xdmf file.
+        data_item: the DataItem pointing to the field.
+        icomps: if not None, only these components are read.  They are
+            stacked along the last dimension of the returned field.
+        box: region of the field to read, see :func:`_read_group_h5`.
+        out: array in which the whole field is read, see
+            :func:`_read_group_h5`.
+    Returns:
+        the index of the core and the field.
+    """
+    shp = _get_dim(xdmf_file, data_item)
+    h5file, group, icore = _h5_location(xdmf_file, data_item)
+
+    def read(h5path: Path) -> ndarray:
+        if icomps is None:
+            return _read_group_h5(h5pool, h5path, group, shp, box=box,
+                                  out=out)
+        return np.stack(
+            [_read_group_h5(h5pool, h5path, group, shp, icomp, box)
+             for icomp in icomps], axis=-1)
+
     fld = None
     try:
-        fld = _read_group_h5(xdmf_file.parent / h5file, group).reshape(shp)
+        fld = read(xdmf_file.parent / h5file)
     except KeyError:
         # test previous/following snapshot files as their numbers can get
         # slightly out of sync between cores
@@ -752,14 +1814,14 @@ def _get_field(xdmf_file: Path, data_item: Element) -> Tuple[int, ndarray]:
             h5file_parts[-2] = f'{fnum - 1:05d}'
             h5f = xdmf_file.parent / '_'.join(h5file_parts)
             try:
-                fld = _read_group_h5(h5f, group).reshape(shp)
+                fld = read(h5f)
             except (OSError, KeyError):
                 pass
         if fld is None:
             h5file_parts[-2] = f'{fnum + 1:05d}'
             h5f = xdmf_file.parent / '_'.join(h5file_parts)
             try:
-                fld = _read_group_h5(h5f, group).reshape(shp)
+                fld = read(h5f)
             except (OSError, KeyError):
                 pass
         if fld is None:
@@ -767,65 +1829,62 @@ def _get_field(xdmf_file: Path, data_item: Element) -> Tuple[int, ndarray]:
     return icore, fld
 
 
-def _maybe_get(elt: Element, item: str, info: str,
-               conversion: Optional[Callable[[str], Any]] = None) -> Any:
-    """Extract and convert info if item is present."""
-    maybe_item = elt.find(item)
-    maybe_info = None
-    if maybe_item is not None:
-        maybe_info = maybe_item.get(info)
-        if maybe_info is not None and conversion is not None:
-            maybe_info = conversion(maybe_info)
-    return maybe_info
-
-
 def read_geom_h5(
-    xdmf_file: Path, snapshot: int
-) -> Tuple[Dict[str, Any], Element]:
+    xdmf_file: Path, snapshot: int, xdmf: Optional[XdmfIndex] = None,
+    h5pool: Optional[H5FilePool] = None, dtype: DTypeLike = np.float64
+) -> Tuple[Dict[str, Any], XdmfIndex]:
     """Extract geometry information from hdf5 files.
 
     Args:
         xdmf_file: path of the xdmf file.
         snapshot: snapshot number.
+        xdmf: index of the xdmf file, it is built if set to None.
+        h5pool: pool of HDF5 files, files are closed after reading if set to
+            None.
+        dtype: data type of the meshes.
     Returns:
-        geometry information and root of xdmf document.
+        geometry information and index of xdmf document.
     """
+    if h5pool is None:
+        with H5FilePool() as pool:
+            return read_geom_h5(xdmf_file, snapshot, xdmf, pool, dtype)
     header: Dict[str, Any] = {}
-    xdmf_root = xmlET.parse(str(xdmf_file)).getroot()
+    if xdmf is None:
+        xdmf = XdmfIndex.parse(xdmf_file)
     if snapshot is None:
-        return {}, xdmf_root
+        return {}, xdmf
 
-    # Domain, Temporal Collection, Snapshot
     # should check that this is indeed the required snapshot
-    elt_snap = xdmf_root[0][0][snapshot]
-    if elt_snap is None:
-        raise ParsingError(xdmf_file, f"Snapshot {snapshot} not present")
-    header['ti_ad'] = _maybe_get(elt_snap, 'Time', 'Value', float)
-    header['mo_lambda'] = _maybe_get(elt_snap, 'mo_lambda', 'Value', float)
-    header['mo_thick_sol'] = _maybe_get(elt_snap, 'mo_thick_sol', 'Value',
-                                        float)
+    snap = xdmf.snap(snapshot)
+    header['ti_ad'] = snap.time
+    header['mo_lambda'] = snap.mo_lambda
+    header['mo_thick_sol'] = snap.mo_thick_sol
     header['ntb'] = 1
     coord_h5 = []  # all the coordinate files
     coord_shape = []  # shape of meshes
     twod = None
-    for elt_subdomain in elt_snap.findall('Grid'):
-        elt_name = _try_get(xdmf_file, elt_subdomain, 'Name')
-        if elt_name.startswith('meshYang'):
+    for name, grid in xdmf.grids(snapshot):
+        if name.startswith('meshYang'):
             header['ntb'] = 2
             break  # iterate only through meshYin
-        elt_geom = _try_find(xdmf_file, elt_subdomain, 'Geometry')
-        if elt_geom.get('Type') == 'X_Y' and twod is None:
+        if not grid.geometry:
+            raise ParsingError(xdmf_file, f"Grid {name} has no Geometry")
+        if grid.geom_type == 'X_Y' and twod is None:
             twod = ''
-            for data_item in elt_geom.findall('DataItem'):
-                coord = _try_text(xdmf_file, data_item).strip()[-1]
+            for data_item in grid.geometry:
+                if data_item.text is None:
+                    raise ParsingError(xdmf_file, "DataItem has no 'text'")
+                coord = data_item.text.strip()[-1]
                 if coord in 'XYZ':
                     twod += coord
-        data_item = _try_find(xdmf_file, elt_geom, 'DataItem')
-        data_text = _try_text(xdmf_file, data_item)
+        data_item = grid.geometry[0]
+        if data_item.text is None:
+            raise ParsingError(xdmf_file, "DataItem has no 'text'")
         coord_shape.append(_get_dim(xdmf_file, data_item))
-        coord_h5.append(xdmf_file.parent / data_text.strip().split(':/', 1)[0])
-    _read_coord_h5(coord_h5, coord_shape, header, twod)
-    return header, xdmf_root
+        coord_h5.append(
+            xdmf_file.parent / data_item.text.strip().split(':/', 1)[0])
+    _read_coord_h5(h5pool, coord_h5, coord_shape, header, twod, dtype)
+    return header, xdmf
 
 
 def _to_spherical(flds: ndarray, header: Dict[str, Any]) -> ndarray:
@@ -865,6 +1924,12 @@ def _flds_shape(fieldname: str, header: Dict[str, Any]) -> List[int]:
 
 def _post_read_flds(flds: ndarray, header: Dict[str, Any]) -> ndarray:
     """Process flds to handle sphericity."""
+    if flds.shape[0] == 3 and flds.shape[-1] == 2:  # YinYang vector
+        # Yang grid is rotated compared to Yin grid
+        flds[0, ..., 1] = -flds[0, ..., 1]
+        vt = flds[1, ..., 1].copy()
+        flds[1, ..., 1] = flds[2, ..., 1]
+        flds[2, ..., 1] = vt
     if flds.shape[0] >= 3 and header['rcmb'] > 0:
         # spherical vector
         header['p_mesh'] = np.roll(
@@ -876,9 +1941,136 @@ def _post_read_flds(flds: ndarray, header: Dict[str, Any]) -> ndarray:
     return flds
 
 
+def _subdomain_field(fld: ndarray, fieldname: str, header: Dict[str, Any],
+                     npc: Sequence[int]) -> ndarray:
+    """Reshape field of a subdomain to (var, x, y, z) indexing."""
+    # for some reason, the field is transposed
+    fld = fld.T
+    shp = fld.shape
+    if shp[-1] == 1 and header['nts'][0] == 1:  # YZ
+        fld = fld.reshape((shp[0], 1, shp[1], shp[2]))
+    elif shp[-1] == 1:  # XZ
+        fld = fld.reshape((shp[0], shp[1], 1, shp[2]))
+    elif fieldname in SFIELD_FILES_H5:
+        fld = fld.reshape((1, npc[0], npc[1], 1))
+    elif header['nts'][1] == 1:  # cart XZ
+        fld = fld.reshape((1, shp[0], 1, shp[1]))
+    return fld
+
+
+def _subdomain_box(
+    h5pool: H5FilePool, xdmf_file: Path, data_item: XdmfItem,
+    icomps: Optional[Sequence[int]], ifs: Sequence[int], ext: Sequence[int],
+    bounds: Sequence[Tuple[int, int]]
+) -> Optional[Tuple[List[slice], ndarray]]:
+    """Read part of a 3D subdomain within a region.
+
+    Args:
+        h5pool: pool of HDF5 files.
+        xdmf_file: path of the xdmf file.
+        data_item: the DataItem pointing to the field.
+        icomps: if not None, only these components are read.
+        ifs: global index of the first point of the subdomain, the last one
+            being the index of its block.
+        ext: number of points of the subdomain in each direction.
+        bounds: bounds of the region, see :func:`_box_bounds`.
+    Returns:
+        the location of the data in the region and the data, None if the
+        subdomain doesn't intersect the region.
+    """
+    intersection = _box_region(ifs, ext, bounds)
+    if intersection is None:
+        return None
+    region, dest = intersection
+    # for some reason, the field is transposed
+    fld = _get_field(h5pool, xdmf_file, data_item, icomps,
+                     tuple(region[2::-1]))[1].T
+    return dest, fld[..., np.newaxis]
+
+
+def _subdomains_in(
+    header: Dict[str, Any], bounds: Sequence[Tuple[int, int]]
+) -> Iterator[Tuple[int, int]]:
+    """Find the subdomains of a 3D field intersecting a region.
+
+    Args:
+        header: geometry information.
+        bounds: bounds of the region, see :func:`_box_bounds`.
+    Yields:
+        tuple (block, core) of each subdomain, core being the index of the
+        core within its block.
+    """
+    ncs = [int(ncpu) for ncpu in header['ncs']]
+    npc = [int(nts) // ncpu for nts, ncpu in zip(header['nts'], ncs)]
+    extra = (header['xp'], header['yp'], 0)
+    cpus = [[icpu for icpu in range(ncpu)
+             if icpu * npts < high and (icpu + 1) * npts + xtra > low]
+            for ncpu, npts, xtra, (low, high) in zip(ncs, npc, extra, bounds)]
+    for ibk in range(*bounds[3]):
+        for icz, icy, icx in product(*cpus[::-1]):
+            yield ibk, icx + ncs[0] * (icy + ncs[1] * icz)
+
+
+def _read_subdomain(
+    h5pool: H5FilePool, xdmf_file: Path, data_item: XdmfItem, fieldname: str,
+    header: Dict[str, Any], ibk: int, ivars: Optional[Sequence[int]],
+    bounds: Optional[Sequence[Tuple[int, int]]]
+) -> Optional[Tuple[List[slice], ndarray]]:
+    """Read field of a subdomain.
+
+    Args:
+        h5pool: pool of HDF5 files.
+        xdmf_file: path of the xdmf file.
+        data_item: the DataItem pointing to the field.
+        fieldname: name of the field.
+        header: geometry information.
+        ibk: index of the block of the subdomain.
+        ivars: indices of the components to read, None to read all of them.
+        bounds: if not None, only the part of the subdomain within these
+            bounds is read, see :func:`_box_bounds`.
+    Returns:
+        the location of the data in the (bounded) field and the data, None if
+        the subdomain is out of bounds.
+    """
+    # number of grid points per node, as plain ints since this is evaluated
+    # for every subdomain of every read
+    npc = [int(nts // ncs) for nts, ncs in zip(header['nts'], header['ncs'])]
+    twod = _get_dim(xdmf_file, data_item)[0] == 1
+    order = (0, 1, 2)
+    if twod and header['rcmb'] < 0:
+        order = (2, 0, 1) if header['nts'][0] == 1 else (1, 2, 0)
+    icomps = None
+    if ivars is not None:
+        icomps = [order[ivar] for ivar in ivars]
+    icpu = _h5_location(xdmf_file, data_item)[2]
+    ifs = []
+    for ncpu, npts in zip(header['ncs'], npc):
+        icpu, icpu_dir = divmod(icpu, int(ncpu))
+        ifs.append(icpu_dir * npts)
+    if fieldname in SFIELD_FILES_H5:
+        ifs[2] = 0
+        npc[2] = 1
+    ifs.append(ibk)
+    ext = [npc[0] + header['xp'], npc[1] + header['yp'], npc[2], 1]
+    if bounds is not None:
+        return _subdomain_box(h5pool, xdmf_file, data_item, icomps, ifs, ext,
+                              bounds)
+    fld = _get_field(h5pool, xdmf_file, data_item, icomps)[1]
+    fld = _subdomain_field(fld, fieldname, header, npc)
+    if twod and icomps is None and header['rcmb'] < 0:
+        fld = fld[order, ...]
+    if header['zp']:  # remove top row
+        fld = fld[:, :, :, :-1]
+    return ([slice(ifs[i], ifs[i] + ext[i]) for i in range(4)],
+            fld[..., np.newaxis])
+
+
 def read_field_h5(
     xdmf_file: Path, fieldname: str, snapshot: int,
-    header: Optional[Dict[str, Any]] = None
+    header: Optional[Dict[str, Any]] = None,
+    ivars: Optional[Sequence[int]] = None,
+    xdmf: Optional[XdmfIndex] = None, h5pool: Optional[H5FilePool] = None,
+    box: Optional[Sequence[slice]] = None, dtype: DTypeLike = np.float64
 ) -> Optional[Tuple[Dict[str, Any], ndarray]]:
     """Extract field data from hdf5 files.
 
@@ -887,124 +2079,183 @@ def read_field_h5(
         fieldname: name of field to extract.
         snapshot: snapshot number.
         header: geometry information.
+        ivars: indices of the components to extract.  All the components are
+            extracted if set to None, or if they cannot be read separately
+            (vector fields in spherical geometry).
+        xdmf: index of the xdmf file, it is built if set to None.
+        h5pool: pool of HDF5 files, files are closed after reading if set to
+            None.
+        box: if not None, only this region of the field is extracted, as
+            slices along the x, y, z directions and blocks.  Missing slices
+            select the whole extent of their direction.  For 3D fields, only
+            the subdomains intersecting the region are read, and only the
+            relevant part of them when possible.  Surface fields, 2D fields
+            and vector fields in spherical geometry are read entirely before
+            the region is extracted.
+        dtype: data type of the field and of the meshes if the geometry is
+            read.
     Returns:
         geometry information and field data. None is returned if data is
         unavailable.
     """
+    if h5pool is None:
+        with H5FilePool() as pool:
+            return read_field_h5(xdmf_file, fieldname, snapshot, header,
+                                 ivars, xdmf, pool, box, dtype)
+    if xdmf is None:
+        xdmf = XdmfIndex.parse(xdmf_file)
     if header is None:
-        header, xdmf_root = read_geom_h5(xdmf_file, snapshot)
-    else:
-        xdmf_root = xmlET.parse(str(xdmf_file)).getroot()
-
-    npc = header['nts'] // header['ncs']  # number of grid point per node
-    flds = np.zeros(_flds_shape(fieldname, header))
-    data_found = False
+        header = read_geom_h5(xdmf_file, snapshot, xdmf, h5pool, dtype)[0]
 
-    for elt_subdomain in xdmf_root[0][0][snapshot].findall('Grid'):
-        elt_name = _try_get(xdmf_file, elt_subdomain, 'Name')
-        ibk = int(elt_name.startswith('meshYang'))
-        for data_attr in elt_subdomain.findall('Attribute'):
-            if data_attr.get('Name') != fieldname:
-                continue
-            icore, fld = _get_field(
-                xdmf_file, _try_find(xdmf_file, data_attr, 'DataItem'))
-            # for some reason, the field is transposed
-            fld = fld.T
-            shp = fld.shape
-            if shp[-1] == 1 and header['nts'][0] == 1:  # YZ
-                fld = fld.reshape((shp[0], 1, shp[1], shp[2]))
-                if header['rcmb'] < 0:
-                    fld = fld[(2, 0, 1), ...]
-            elif shp[-1] == 1:  # XZ
-                fld = fld.reshape((shp[0], shp[1], 1, shp[2]))
-                if header['rcmb'] < 0:
-                    fld = fld[(1, 2, 0), ...]
-            elif fieldname in SFIELD_FILES_H5:
-                fld = fld.reshape((1, npc[0], npc[1], 1))
-            elif header['nts'][1] == 1:  # cart XZ
-                fld = fld.reshape((1, shp[0], 1, shp[1]))
-            ifs = [icore // np.prod(header['ncs'][:i]) % header['ncs'][i] *
-                   npc[i] for i in range(3)]
-            if fieldname in SFIELD_FILES_H5:
-                ifs[2] = 0
-                npc[2] = 1
-            if header['zp']:  # remove top row
-                fld = fld[:, :, :, :-1]
-            flds[:,
-                 ifs[0]:ifs[0] + npc[0] + header['xp'],
-                 ifs[1]:ifs[1] + npc[1] + header['yp'],
-                 ifs[2]:ifs[2] + npc[2],
-                 ibk] = fld
-            data_found = True
+    shape = _flds_shape(fieldname, header)
+    # components of cartesian vectors are independent from each other
+    if ivars is not None and shape[0] == 3 and header['rcmb'] < 0:
+        shape[0] = len(ivars)
+    else:
+        ivars = None
+    bounds = None
+    if box is not None:
+        box = [*box, *(slice(None) for _ in range(4 - len(box)))]
+        # components of spherical vectors are mixed after reading
+        independent = shape[0] == 1 or header['rcmb'] < 0
+        if (min(header['nts']) > 1 and independent and
+                fieldname not in SFIELD_FILES_H5):
+            bounds = _box_bounds(box, shape[1:])
+            shape[1:] = [high - low for low, high in bounds]
+    flds = np.zeros(shape, dtype=dtype)
+    data_items = xdmf.subdomains(snapshot, fieldname,
+                                 int(np.prod(header['ncs'])))
+    for ibk, icore in (data_items if bounds is None
+                       else _subdomains_in(header, bounds)):
+        if (ibk, icore) not in data_items:
+            continue
+        subdomain = _read_subdomain(h5pool, xdmf_file,
+                                    data_items[ibk, icore], fieldname,
+                                    header, ibk, ivars, bounds)
+        if subdomain is not None:
+            dest, fld = subdomain
+            flds[(slice(None), *dest)] = fld
 
-    if flds.shape[0] == 3 and flds.shape[-1] == 2:  # YinYang vector
-        # Yang grid is rotated compared to Yin grid
-        flds[0, ..., 1] = -flds[0, ..., 1]
-        vt = flds[1, ..., 1].copy()
-        flds[1, ..., 1] = flds[2, ..., 1]
-        flds[2, ..., 1] = vt
     flds = _post_read_flds(flds, header)
 
     if fieldname in SFIELD_FILES_H5:
         # remove z component
         flds = flds[..., 0, :]
-    return (header, flds) if data_found else None
-
-
-def read_tracers_h5(xdmf_file: Path, infoname: str, snapshot: int,
-                    position: bool) -> Dict[str, List[ndarray]]:
+    if box is not None:
+        if bounds is not None:
+            # the smallest region containing the box was read
+            box = [slice(None, None, slc.step) for slc in box]
+        elif fieldname in SFIELD_FILES_H5:
+            box = [box[0], box[1], box[3]]
+        flds = flds[(slice(None), *box)]
+    return (header, flds) if data_items else None
+
+
+def _tracers_items(
+    xdmf_file: Path, xdmf: XdmfIndex, infonames: Sequence[str], snapshot: int
+) -> Dict[Tuple[str, int], List[XdmfItem]]:
+    """Data items of tracers attributes by attribute and block.
+
+    Positions are the ``'x'``, ``'y'``, and ``'z'`` attributes.  The block
+    of a DataItem is found from the name of its dataset.  DataItems of each
+    block are ordered by core.
+    """
+    located: Dict[Tuple[str, int], List[Tuple[int, XdmfItem]]] = {}
+    for _, grid in xdmf.grids(snapshot):
+        items: Dict[str, Optional[XdmfItem]] = {}
+        if grid.geometry is not None:
+            items.update(zip('xyz', grid.geometry))
+        items.update(grid.attributes)
+        for infoname in infonames:
+            if infoname not in items:
+                continue
+            item = items[infoname]
+            if item is None:
+                raise ParsingError(
+                    xdmf_file, f"Attribute {infoname} has no DataItem")
+            _, group, icore = _h5_location(xdmf_file, item)
+            located.setdefault((infoname, _h5_block(group)), []).append(
+                (icore, item))
+    return {key: [item for _, item in sorted(items_bk, key=itemgetter(0))]
+            for key, items_bk in sorted(located.items())}
+
+
+def read_tracers_h5(
+    xdmf_file: Path, infonames: Iterable[str], snapshot: int,
+    xdmf: Optional[XdmfIndex] = None, h5pool: Optional[H5FilePool] = None
+) -> Dict[str, List[ndarray]]:
     """Extract tracers data from hdf5 files.
 
+    All the requested attributes are read in a single pass over the
+    subdomains.  The data of each attribute in each block is read directly
+    in an array allocated from the sizes recorded in the xdmf file.
+
     Args:
         xdmf_file: path of the xdmf file.
-        infoname: name of information to extract.
+        infonames: names of information to extract.  Positions of tracers
+            are the ``'x'``, ``'y'``, and ``'z'`` information, they are only
+            read if requested.
         snapshot: snapshot number.
-        position: whether to extract position of tracers.
+        xdmf: index of the xdmf file, it is built if set to None.
+        h5pool: pool of HDF5 files, files are closed after reading if set to
+            None.
     Returns:
-        Tracers data organized by attribute and block.
-    """
-    xdmf_root = xmlET.parse(str(xdmf_file)).getroot()
-    tra: Dict[str, List[Dict[int, ndarray]]] = {}
-    tra[infoname] = [{}, {}]  # two blocks, ordered by cores
-    if position:
-        for axis in 'xyz':
-            tra[axis] = [{}, {}]
-    for elt_subdomain in xdmf_root[0][0][snapshot].findall('Grid'):
-        elt_name = _try_get(xdmf_file, elt_subdomain, 'Name')
-        ibk = int(elt_name.startswith('meshYang'))
-        if position:
-            for data_attr in elt_subdomain.findall('Geometry'):
-                for data_item, axis in zip(data_attr.findall('DataItem'),
-                                           'xyz'):
-                    icore, data = _get_field(xdmf_file, data_item)
-                    tra[axis][ibk][icore] = data
-        for data_attr in elt_subdomain.findall('Attribute'):
-            if data_attr.get('Name') != infoname:
+        Tracers data organized by attribute and block, the list of blocks of
+        an attribute being indexed by block number.  A block missing before
+        a present one is an empty array.  Attributes missing from the output
+        are absent from the returned dictionary.
+    """
+    if h5pool is None:
+        with H5FilePool() as pool:
+            return read_tracers_h5(xdmf_file, infonames, snapshot, xdmf, pool)
+    if xdmf is None:
+        xdmf = XdmfIndex.parse(xdmf_file)
+    items = _tracers_items(xdmf_file, xdmf, list(infonames), snapshot)
+    bounds = {key: np.cumsum([0] + [int(np.prod(_get_dim(xdmf_file, item)))
+                                    for item in items_bk])
+              for key, items_bk in items.items()}
+    # arrays are allocated when their type is known from the first core
+    tra: Dict[Tuple[str, int], ndarray] = {}
+    ncores = max((len(items_bk) for items_bk in items.values()), default=0)
+    for ipos in range(ncores):
+        for key, items_bk in items.items():
+            if ipos >= len(items_bk):
+                continue
+            start, stop = bounds[key][ipos:ipos + 2]
+            if key in tra and stop == start:
                 continue
-            icore, data = _get_field(
-                xdmf_file, _try_find(xdmf_file, data_attr, 'DataItem'))
-            tra[infoname][ibk][icore] = data
-    tra_concat: Dict[str, List[ndarray]] = {}
-    for info in tra:
-        tra[info] = [trab for trab in tra[info] if trab]  # remove empty blocks
-        tra_concat[info] = []
-        for trab in tra[info]:
-            tra_concat[info].append(
-                np.concatenate([trab[icore] for icore in range(len(trab))]))
-    return tra_concat
-
-
-def read_time_h5(h5folder: Path) -> Iterator[Tuple[int, int]]:
+            if key in tra:
+                _get_field(h5pool, xdmf_file, items_bk[ipos],
+                           out=tra[key][start:stop])
+                continue
+            data = _get_field(h5pool, xdmf_file, items_bk[ipos])[1]
+            tra[key] = np.empty(bounds[key][-1], dtype=data.dtype)
+            tra[key][start:stop] = data.reshape(-1)
+    tra_blocks: Dict[str, List[ndarray]] = {}
+    for (infoname, ibk), data in sorted(tra.items(), key=itemgetter(0)):
+        blocks = tra_blocks.setdefault(infoname, [])
+        blocks.extend(np.empty(0, dtype=data.dtype)
+                      for _ in range(ibk - len(blocks)))
+        blocks.append(data)
+    return tra_blocks
+
+
+def read_time_h5(h5folder: Path,
+                 first: int = 0) -> Iterator[Tuple[int, int]]:
     """Iterate through (isnap, istep) recorded in h5folder/'time_botT.h5'.
 
     Args:
         h5folder: directory of HDF5 output files.
+        first: snapshots before this one are skipped without being read.
     Yields:
         tuple (isnap, istep).
     """
     with h5py.File(h5folder / 'time_botT.h5', 'r') as h5f:
-        for name, dset in h5f.items():
+        for name in h5f:
             isnap = int(name[-5:])
+            if isnap < first:
+                continue
+            dset = h5f[name]
             if len(dset) == 3:
                 istep = int(dset[2])
             else:
@@ -0,0 +1,496 @@
+"""Export StagYY runs to a chunked store and read them back.
+
+A store holds everything StagPy reads from the output files of a run: the
+parameters, time series, radial profiles, reference state, geometry, fields,
+surface fields and tracers.  Each array is written separately, laid out by
+snapshot and variable, so that any of them can be read without going through
+the others.  Two formats are available:
+
+- ``'h5'``: a single HDF5 file, arrays are compressed and chunked.  Fields
+  are chunked along the parallel subdomains of the run.
+- ``'npy'``: a directory of ``.npy`` files, one per array.  They are not
+  compressed, but parts of them can be read through a memory map.
+
+Stores are written with :func:`convert` and read back transparently by
+:class:`~stagpy.stagyydata.StagyyData` when given the path of a store.
+"""
+
+from __future__ import annotations
+from collections import abc
+from pathlib import Path
+import json
+import shutil
+import typing
+
+import f90nml
+import h5py
+import numpy as np
+import pandas as pd
+
+from . import error, phyvars, stagyyparsers
+
+if typing.TYPE_CHECKING:
+    from os import PathLike
+    from typing import (Any, Dict, Iterator, List, Mapping, Optional,
+                        Sequence, Tuple, Union)
+    from f90nml.namelist import Namelist
+    from numpy import ndarray
+    from pandas import DataFrame
+    from ._step import Step
+    from .stagyydata import StagyyData
+
+
+_STORE_VERSION = 1
+# name of the metadata of stores, dataset of HDF5 stores or json file of
+# directory stores
+_META = 'stagpy_store'
+
+
+def is_store(path: PathLike) -> bool:
+    """Whether a path points to a store written by :func:`convert`."""
+    path = Path(path)
+    if path.is_dir():
+        return (path / f'{_META}.json').is_file()
+    if path.is_file() and h5py.is_hdf5(path):
+        with h5py.File(path, 'r') as h5f:
+            return _META in h5f
+    return False
+
+
+class _H5Writer:
+    """Write arrays in an HDF5 store."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._h5f = h5py.File(path, 'x')
+
+    def write(self, key: str, values: ndarray,
+              chunks: Optional[Tuple[int, ...]] = None) -> None:
+        if values.ndim and values.size:
+            self._h5f.create_dataset(key, data=values, chunks=chunks or True,
+                                     compression='gzip', shuffle=True)
+        else:
+            self._h5f.create_dataset(key, data=values)
+
+    def close(self, meta: Optional[Dict[str, Any]]) -> None:
+        if meta is not None:
+            self._h5f.create_dataset(_META, data=json.dumps(meta))
+        self._h5f.close()
+
+
+class _NpyWriter:
+    """Write arrays in a directory of npy files."""
+
+    def __init__(self, path: Path):
+        path.mkdir(parents=True)
+        self._path = path
+
+    def write(self, key: str, values: ndarray,
+              chunks: Optional[Tuple[int, ...]] = None) -> None:
+        npyfile = self._path / f'{key}.npy'
+        npyfile.parent.mkdir(parents=True, exist_ok=True)
+        np.save(npyfile, values)
+
+    def close(self, meta: Optional[Dict[str, Any]]) -> None:
+        if meta is not None:
+            (self._path / f'{_META}.json').write_text(json.dumps(meta))
+
+
+def _read_box(values: Any, box: Optional[Sequence[slice]]) -> ndarray:
+    """Read the smallest region containing a box, then the box itself."""
+    if box is None:
+        return np.asarray(values[()])
+    bounds = stagyyparsers._box_bounds(box, values.shape)
+    region = values[tuple(slice(low, high) for low, high in bounds)]
+    return np.asarray(region[tuple(slice(None, None, slc.step)
+                                   for slc in box)])
+
+
+class _H5Reader:
+    """Read arrays of an HDF5 store."""
+
+    def __init__(self, path: Path, h5pool: stagyyparsers.H5FilePool):
+        self._path = path
+        self._h5pool = h5pool
+
+    def meta(self) -> Dict[str, Any]:
+        with self._h5pool.open(self._path) as h5f:
+            return json.loads(h5f[_META][()])
+
+    def shape(self, key: str) -> Tuple[int, ...]:
+        with self._h5pool.open(self._path) as h5f:
+            return h5f[key].shape
+
+    def read(self, key: str,
+             box: Optional[Sequence[slice]] = None) -> ndarray:
+        with self._h5pool.open(self._path) as h5f:
+            return _read_box(h5f[key], box)
+
+
+class _NpyReader:
+    """Read arrays of a directory of npy files."""
+
+    def __init__(self, path: Path):
+        self._path = path
+
+    def meta(self) -> Dict[str, Any]:
+        return json.loads((self._path / f'{_META}.json').read_text())
+
+    def _load(self, key: str, mmap: bool) -> ndarray:
+        return np.load(self._path / f'{key}.npy',
+                       mmap_mode='r' if mmap else None)
+
+    def shape(self, key: str) -> Tuple[int, ...]:
+        return self._load(key, True).shape
+
+    def read(self, key: str,
+             box: Optional[Sequence[slice]] = None) -> ndarray:
+        return _read_box(self._load(key, box is not None), box)
+
+
+def _jsonable(value: Any) -> Any:
+    """Convert numpy scalars to python ones."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _snap_key(isnap: int) -> str:
+    return f'{isnap:05d}'
+
+
+class _StoredRprofs(abc.Mapping):
+    """Radial profiles of a store indexed by time steps.
+
+    Profiles are only read when accessed.
+    """
+
+    def __init__(self, store: RunStore):
+        self._store = store
+        isteps = store._read('rprofs/isteps')
+        self._index = {int(istep): ipos for ipos, istep in enumerate(isteps)}
+
+    def __getitem__(self, istep: int) -> DataFrame:
+        ipos = self._index[istep]
+        meta = self._store.meta['rprofs']
+        values = self._store._read('rprofs/values', (slice(ipos, ipos + 1),))
+        nrows, ncols = meta['shapes'][ipos]
+        return pd.DataFrame(values[0, :nrows, :ncols],
+                            columns=meta['names'][:ncols])
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+class RunStore:
+    """Read a run exported with :func:`convert`.
+
+    Args:
+        path: path of the store.
+        h5pool: pool of HDF5 files, used to read HDF5 stores.
+
+    Attributes:
+        path: path of the store.
+        meta: metadata of the store, recording what it contains.
+        snaps: time step of each snapshot in the store.
+    """
+
+    def __init__(self, path: PathLike, h5pool: stagyyparsers.H5FilePool):
+        self.path = Path(path)
+        self._reader: Union[_H5Reader, _NpyReader]
+        if self.path.is_dir():
+            self._reader = _NpyReader(self.path)
+        else:
+            self._reader = _H5Reader(self.path, h5pool)
+        self.meta = self._reader.meta()
+        if self.meta.get('version') != _STORE_VERSION:
+            raise error.StoreError(
+                self.path, f"unsupported version {self.meta.get('version')}")
+        self.snaps = {int(isnap): istep
+                      for isnap, istep in self.meta['snaps'].items()}
+
+    def _read(self, key: str,
+              box: Optional[Sequence[slice]] = None) -> ndarray:
+        return self._reader.read(key, box)
+
+    def par(self) -> Namelist:
+        """Parameters of the run."""
+        # built from pairs to keep the order of parameters
+        return f90nml.Namelist(
+            (section, f90nml.Namelist(list(params.items())))
+            for section, params in self.meta['par'].items())
+
+    def _frame(self, key: str) -> Optional[DataFrame]:
+        if key not in self.meta['frames']:
+            return None
+        return self._stored_frame(key)
+
+    def _stored_frame(self, key: str) -> DataFrame:
+        frame = self.meta['frames'][key]
+        index = pd.Index(self._read(f'{key}/index'), name=frame['index'])
+        return pd.DataFrame(self._read(f'{key}/values'), index=index,
+                            columns=frame['columns'])
+
+    def tseries(self) -> Optional[DataFrame]:
+        """Time series."""
+        return self._frame('tseries')
+
+    def rprofs(self) -> Tuple[Mapping[int, DataFrame], Optional[DataFrame]]:
+        """Radial profiles indexed by time steps and their times."""
+        if 'rprofs' not in self.meta:
+            return {}, None
+        return _StoredRprofs(self), self._frame('rtimes')
+
+    def rprof_array(self) -> Tuple[ndarray, ndarray, List[str]]:
+        """Radial profiles of all time steps in a single array.
+
+        See :func:`stagpy.stagyyparsers.rprof_array`.
+        """
+        if 'rprofs' not in self.meta:
+            return np.array([], dtype=np.int_), np.empty((0, 0, 0)), []
+        return (self._read('rprofs/isteps'), self._read('rprofs/values'),
+                list(self.meta['rprofs']['names']))
+
+    def refstate(
+        self
+    ) -> Optional[Tuple[List[List[DataFrame]], List[DataFrame]]]:
+        """Reference state profiles.
+
+        See :func:`stagpy.stagyyparsers.refstate`.
+        """
+        if 'refstate' not in self.meta:
+            return None
+        systems: List[List[DataFrame]] = []
+        for isys, nphases in enumerate(self.meta['refstate']['systems']):
+            systems.append(
+                [self._stored_frame(f'refstate/system{isys}/phase{iph}')
+                 for iph in range(nphases)])
+        adiabats = [self._stored_frame(f'refstate/adiabat{iad}')
+                    for iad in range(self.meta['refstate']['adiabats'])]
+        return systems, adiabats
+
+    def header(self, isnap: int) -> Optional[Dict[str, Any]]:
+        """Geometry information of a snapshot."""
+        meta = self.meta['headers'].get(str(isnap))
+        if meta is None:
+            return None
+        header = dict(meta['scalars'])
+        for name in meta['arrays']:
+            header[name] = self._read(f'header/{_snap_key(isnap)}/{name}')
+        return header
+
+    def _field_key(self, isnap: int, name: str) -> Optional[str]:
+        if name not in self.meta['fields'].get(str(isnap), ()):
+            return None
+        return f'fields/{_snap_key(isnap)}/{name}'
+
+    def field_shape(self, isnap: int, name: str) -> Optional[Tuple[int, ...]]:
+        """Shape of a field, None if it isn't in the store."""
+        key = self._field_key(isnap, name)
+        return None if key is None else self._reader.shape(key)
+
+    def field(self, isnap: int, name: str,
+              box: Optional[Sequence[slice]] = None) -> Optional[ndarray]:
+        """Read a field or a surface field.
+
+        Args:
+            isnap: snapshot index.
+            name: name of the field.
+            box: if not None, only this region of the field is read, as
+                slices along the x, y, z directions and blocks.  Missing
+                slices select the whole extent of their direction, the z
+                slice is ignored for surface fields.
+        Returns:
+            the field, None if it isn't in the store.
+        """
+        key = self._field_key(isnap, name)
+        if key is None:
+            return None
+        if box is not None:
+            box = [*box, *(slice(None) for _ in range(4 - len(box)))]
+            if name in phyvars.SFIELD:
+                del box[2]
+        return self._read(key, box)
+
+    def tracers(self, isnap: int, name: str) -> Optional[List[ndarray]]:
+        """Tracers data of a snapshot, organized by block."""
+        nblocks = self.meta['tracers'].get(str(isnap), {}).get(name)
+        if nblocks is None:
+            return None
+        return [self._read(f'tracers/{_snap_key(isnap)}/{name}/{iblock}')
+                for iblock in range(nblocks)]
+
+
+def _write_frame(writer: Union[_H5Writer, _NpyWriter], meta: Dict[str, Any],
+                 key: str, frame: Optional[DataFrame]) -> None:
+    """Write a table of numbers."""
+    if frame is None:
+        return
+    writer.write(f'{key}/values', frame.to_numpy(dtype=np.float64))
+    writer.write(f'{key}/index', frame.index.to_numpy())
+    meta['frames'][key] = {'columns': list(map(_jsonable, frame.columns)),
+                           'index': _jsonable(frame.index.name)}
+
+
+def _write_rprofs(writer: Union[_H5Writer, _NpyWriter], meta: Dict[str, Any],
+                  sdat: StagyyData) -> None:
+    """Write radial profiles of all time steps."""
+    profs, times = sdat._rprof_and_times
+    if times is None:
+        return
+    isteps, values, names = stagyyparsers.rprof_array(profs)
+    # profiles are padded with NaN in the array, keep track of their shape
+    filled = ~np.isnan(values)
+    shapes = [[int(np.count_nonzero(step_filled.any(axis=1))),
+               int(np.count_nonzero(step_filled.any(axis=0)))]
+              for step_filled in filled]
+    writer.write('rprofs/isteps', isteps)
+    # one chunk per time step
+    writer.write('rprofs/values', values,
+                 (1, *values.shape[1:]) if values.size else None)
+    meta['rprofs'] = {'names': names, 'shapes': shapes}
+    _write_frame(writer, meta, 'rtimes', times)
+
+
+def _write_refstate(writer: Union[_H5Writer, _NpyWriter],
+                    meta: Dict[str, Any], sdat: StagyyData) -> None:
+    """Write reference state profiles."""
+    try:
+        systems, adiabats = sdat.refstate.systems, sdat.refstate.adiabats
+    except error.NoRefstateError:
+        return
+    for isys, phases in enumerate(systems):
+        for iph, phase in enumerate(phases):
+            _write_frame(writer, meta, f'refstate/system{isys}/phase{iph}',
+                         phase)
+    for iad, adiabat in enumerate(adiabats):
+        _write_frame(writer, meta, f'refstate/adiabat{iad}', adiabat)
+    meta['refstate'] = {'systems': [len(phases) for phases in systems],
+                        'adiabats': len(adiabats)}
+
+
+def _write_header(writer: Union[_H5Writer, _NpyWriter], meta: Dict[str, Any],
+                  isnap: int, header: Dict[str, Any]) -> None:
+    """Write geometry information of a snapshot."""
+    scalars = {}
+    arrays = []
+    for name, value in header.items():
+        if isinstance(value, (np.ndarray, tuple, list)):
+            writer.write(f'header/{_snap_key(isnap)}/{name}',
+                         np.asarray(value))
+            arrays.append(name)
+        else:
+            scalars[name] = _jsonable(value)
+    meta['headers'][str(isnap)] = {'scalars': scalars, 'arrays': arrays}
+
+
+def _field_chunks(header: Dict[str, Any],
+                  shape: Tuple[int, ...]) -> Optional[Tuple[int, ...]]:
+    """Chunks of a field matching the parallel subdomains of the run."""
+    if 'ncs' not in header or len(shape) != 4 or not all(shape):
+        return None
+    edges = stagyyparsers.subdomain_edges({**header, 'xyp': 0})
+    return tuple(max(1, min(int(edge[1] - edge[0]), size))
+                 for edge, size in zip(edges, shape))
+
+
+def _tracer_names(step: Step) -> List[str]:
+    """Names of the tracers data available in a snapshot."""
+    sdat = step.sdat
+    assert step.isnap is not None
+    data = stagyyparsers.tracers(
+        sdat.filename('tra', step.isnap, force_legacy=True), memmap=True)
+    if data is not None:
+        return list(data)
+    if sdat.hdf5 is None or not (sdat.hdf5 / 'DataTracers.xmf').is_file():
+        return []
+    xdmf = sdat._xdmf('DataTracers.xmf')
+    if step.isnap >= len(xdmf.snaps):
+        return []
+    names = dict.fromkeys('xyz')
+    for _, grid in xdmf.grids(step.isnap):
+        names.update(dict.fromkeys(grid.attributes))
+    return list(names)
+
+
+def _write_snap(writer: Union[_H5Writer, _NpyWriter], meta: Dict[str, Any],
+                step: Step) -> None:
+    """Write fields, surface fields and tracers of a snapshot."""
+    isnap = step.isnap
+    assert isnap is not None
+    meta['snaps'][str(isnap)] = step.istep
+    names = []
+    header = None
+    for fields, variables in ((step.fields, phyvars.FIELD),
+                              (step.sfields, phyvars.SFIELD)):
+        for name in variables:
+            try:
+                values = fields[name].values
+            except error.MissingDataError:
+                continue
+            if header is None:
+                header = fields._header
+                assert header is not None
+                _write_header(writer, meta, isnap, header)
+            writer.write(f'fields/{_snap_key(isnap)}/{name}', values,
+                         _field_chunks(header, values.shape))
+            names.append(name)
+            # fields are only read once, don't keep them around
+            del fields[name]
+    meta['fields'][str(isnap)] = names
+    tracers = {}
+    for name, data in step.tracers.load(_tracer_names(step)).items():
+        if data is None:
+            continue
+        for iblock, block in enumerate(data):
+            writer.write(f'tracers/{_snap_key(isnap)}/{name}/{iblock}',
+                         np.asarray(block))
+        tracers[name] = len(data)
+    meta['tracers'][str(isnap)] = tracers
+
+
+def convert(sdat: StagyyData, dest: PathLike,
+            fmt: Optional[str] = None) -> Path:
+    """Export a run to a store.
+
+    Args:
+        sdat: the run to export.
+        dest: path of the store, it must not exist.
+        fmt: format of the store, ``'h5'`` for a single HDF5 file or
+            ``'npy'`` for a directory of npy files.  If set to None, the
+            store is an HDF5 file if dest has a ``.h5`` suffix, a directory
+            otherwise.
+    Returns:
+        the path of the store.
+    """
+    dest = Path(dest)
+    if fmt is None:
+        fmt = 'h5' if dest.suffix == '.h5' else 'npy'
+    if fmt not in ('h5', 'npy'):
+        raise error.StoreError(dest, f'unknown store format {fmt}')
+    if dest.exists():
+        raise error.StoreError(dest, 'path already exists')
+    writer: Union[_H5Writer, _NpyWriter]
+    writer = _H5Writer(dest) if fmt == 'h5' else _NpyWriter(dest)
+    meta: Dict[str, Any] = {
+        'version': _STORE_VERSION, 'par': sdat.par, 'frames': {},
+        'snaps': {}, 'headers': {}, 'fields': {}, 'tracers': {}}
+    try:
+        _write_frame(writer, meta, 'tseries', sdat.tseries._data)
+        _write_rprofs(writer, meta, sdat)
+        _write_refstate(writer, meta, sdat)
+        try:
+            for step in sdat.snaps:
+                _write_snap(writer, meta, step)
+        except error.NoSnapshotError:
+            pass
+    except BaseException:
+        writer.close(None)
+        if dest.is_dir():
+            shutil.rmtree(dest)
+        else:
+            dest.unlink()
+        raise
+    writer.close(meta)
+    return dest
@@ -0,0 +1,89 @@
+"""Monitor a running StagYY simulation."""
+
+from __future__ import annotations
+from time import sleep
+import typing
+
+from . import conf, error, field, _helpers
+from .stagyydata import StagyyData
+from .time_series import plot_time_series
+
+if typing.TYPE_CHECKING:
+    from typing import List, Optional
+
+
+def _plot_new_tseries(sdat: StagyyData, last: Optional[int]) -> Optional[int]:
+    """Plot time series if they extend past a given time step.
+
+    Args:
+        sdat: a :class:`~stagpy.stagyydata.StagyyData` instance.
+        last: last time step of the time series plotted before.
+
+    Returns:
+        the last time step of the time series.
+    """
+    try:
+        istep = sdat.tseries.isteps[-1]
+    except error.MissingDataError:
+        return last
+    if istep != last:
+        plot_time_series(sdat, conf.watch.time)
+    return istep
+
+
+def _plot_new_snap(sdat: StagyyData, lovs: List[List[List[str]]],
+                   last: Optional[int]) -> Optional[int]:
+    """Plot the last snapshot if it wasn't plotted before.
+
+    Args:
+        sdat: a :class:`~stagpy.stagyydata.StagyyData` instance.
+        lovs: nested list of variables, see :func:`stagpy.field._plot_snap`.
+        last: index of the snapshot plotted before.
+
+    Returns:
+        the index of the last plotted snapshot.
+    """
+    try:
+        step = sdat.snaps[-1]
+    except (error.NoSnapshotError, error.InvalidSnapshotError):
+        return last
+    if step.isnap == last:
+        return last
+    try:
+        field._plot_snap(step, lovs, {})
+    except (error.ParsingError, error.MissingDataError, OSError):
+        # snapshot still being written (missing or truncated files), try
+        # again at the next check
+        return last
+    return step.isnap
+
+
+def cmd() -> None:
+    """Implementation of watch subcommand.
+
+    The run is checked for new data at regular intervals, only the data
+    written since the previous check is read.  Time series are plotted again
+    when they have new time steps, and the last snapshot is plotted when a
+    new one is found.
+
+    Other Parameters:
+        conf.watch
+        conf.core
+    """
+    sdat = StagyyData()
+    lovs = _helpers.list_of_vars(conf.watch.field)
+    # no more than two fields in a subplot
+    lovs = [[slov[:2] for slov in plov] for plov in lovs]
+    last_istep: Optional[int] = None
+    last_isnap: Optional[int] = None
+    ncheck = 0
+    while True:
+        if conf.watch.time:
+            last_istep = _plot_new_tseries(sdat, last_istep)
+        if lovs:
+            last_isnap = _plot_new_snap(sdat, lovs, last_isnap)
+        ncheck += 1
+        if conf.watch.nchecks is not None and ncheck >= conf.watch.nchecks:
+            return
+        sleep(conf.watch.interval)
+        sdat.refresh()
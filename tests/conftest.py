@@ -22,3 +22,17 @@ def sdat(example_dir):
 @pytest.fixture(scope='module')
 def step(sdat):
     return sdat.snaps[-1]
+
+
+@pytest.fixture(scope='session', autouse=True)
+def cache_dir(tmp_path_factory):
+    import stagpy.config
+    import stagpy._index
+    home = tmp_path_factory.mktemp('home')
+    cache = home / '.cache' / 'stagpy'
+    with pytest.MonkeyPatch.context() as mpc:
+        mpc.setattr(stagpy.config, 'CACHE_DIR', cache)
+        mpc.setattr(stagpy._index, 'CACHE_DIR', cache)
+        # stagpy run in a subprocess has its cache in this home directory
+        mpc.setenv('HOME', str(home))
+        yield cache
@@ -65,6 +65,16 @@ def test_plates_subcmd():
     assert func is stagpy.plates.cmd
 
 
+def test_watch_subcmd():
+    func = stagpy.args.parse_args(['watch'])
+    assert func is stagpy.watch.cmd
+
+
+def test_convert_subcmd():
+    func = stagpy.args.parse_args(['convert'])
+    assert func is stagpy.commands.convert_cmd
+
+
 def test_info_subcmd():
     func = stagpy.args.parse_args(['info'])
     assert func is stagpy.commands.info_cmd
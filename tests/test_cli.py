@@ -14,6 +14,7 @@ def dir_isnap(request, repo_dir):
     ('stagpy field -o=T.v3', ['stagpy_T_v3{:05d}.pdf']),
     ('stagpy field -o=T-v3', ['stagpy_T{:05d}.pdf',
                               'stagpy_v3{:05d}.pdf']),
+    ('stagpy field -j=2', ['stagpy_T_stream{:05d}.pdf']),
 ])
 def all_cmd_field(request, dir_isnap):
     cmd = request.param[0]
@@ -27,6 +28,7 @@ def all_cmd_field(request, dir_isnap):
 @pytest.fixture(params=[
     ('stagpy rprof', ['stagpy_rprof_Tmean_{}.pdf']),
     ('stagpy rprof -o=Tmean,vzabs', ['stagpy_rprof_Tmean_vzabs_{}.pdf']),
+    ('stagpy rprof -a +tweight', ['stagpy_rprof_Tmean_{}.pdf']),
 ])
 def all_cmd_rprof(request, dir_isnap):
     cmd = request.param[0]
@@ -85,6 +87,28 @@ def test_plates_cli(all_cmd_plates, tmp_path):
     helper_test_cli(all_cmd_plates, tmp_path)
 
 
+def test_watch_cli(dir_isnap, tmp_path):
+    cmd = f'stagpy watch --nchecks=1 -p={dir_isnap[0]}'
+    expected_files = ['stagpy_T_stream{:05d}.pdf'.format(dir_isnap[1]),
+                      'stagpy_time_Nutop_ebalance_Nubot_Tmean.pdf']
+    helper_test_cli((cmd, expected_files), tmp_path)
+
+
+def test_watch_unknown_field_cli(tmp_path, repo_dir):
+    path = repo_dir / 'Examples' / 'ra-100000'
+    subp = subprocess.run(
+        f'stagpy watch --nchecks=1 --field=notavar -p={path} '
+        f'-n={tmp_path}/stagpy', shell=True, stderr=subprocess.PIPE)
+    assert b'UnknownFieldVarError' in subp.stderr
+    assert [path.name for path in tmp_path.iterdir()] == [
+        'stagpy_time_Nutop_ebalance_Nubot_Tmean.pdf']
+
+
+def test_convert_cli(dir_isnap, tmp_path):
+    cmd = f'stagpy convert -p={dir_isnap[0]}'
+    helper_test_cli((cmd, ['stagpy_store.h5']), tmp_path)
+
+
 def test_err_cli():
     subp = subprocess.run('stagpy field', shell=True, stderr=subprocess.PIPE)
     reg = re.compile(br'^Oops!.*\nPlease.*\n\nNoParFileError.*$')
@@ -1,7 +1,9 @@
+import numpy as np
 import pytest
 import stagpy.error
 import stagpy.field
 import stagpy.phyvars
+import stagpy.stagyydata
 
 
 def test_field_unknown(step):
@@ -50,3 +52,56 @@ def test_get_meshes_vec(step):
     assert len(vec1.shape) == 2
     assert xmesh.shape[0] == ymesh.shape[0] == vec1.shape[0] == vec2.shape[0]
     assert xmesh.shape[1] == ymesh.shape[1] == vec1.shape[1] == vec2.shape[1]
+
+
+def test_field_read_single_var(example_dir):
+    sdat = stagpy.stagyydata.StagyyData(example_dir)
+    step = sdat.snaps[-1]
+    pressure = step.fields['p'].values
+    assert 'p' in step.fields._data
+    assert not any(var in step.fields._data for var in ('v1', 'v2', 'v3'))
+    assert pressure.shape[:3] == step.fields['v3'].values.shape[:3]
+
+
+def test_findminmax_stats_reused(example_dir):
+    sdat = stagpy.stagyydata.StagyyData(example_dir)
+    minmax = stagpy.field._findminmax(sdat, ['T'])
+    temp = sdat.snaps[-1].fields['T'].values
+    assert minmax['T'] == (temp.min(), temp.max())
+    sdat = stagpy.stagyydata.StagyyData(example_dir)
+    assert stagpy.field._findminmax(sdat, ['T']) == minmax
+    assert sdat.fields_cache.misses == 0
+
+
+def test_field_sliced(example_dir):
+    sdat = stagpy.stagyydata.StagyyData(example_dir)
+    step = sdat.snaps[-1]
+    part = step.fields.sliced('T', iz=slice(1, None, 2))
+    assert 'T' not in step.fields._data
+    temp = step.fields['T'].values
+    assert (part.values == temp[:, :, 1::2]).all()
+    assert part.meta == step.fields['T'].meta
+    assert (step.fields.sliced('T', iz=-1).values == temp[:, :, -1]).all()
+
+
+def test_field_lazy(example_dir):
+    sdat = stagpy.stagyydata.StagyyData(example_dir)
+    step = sdat.snaps[-1]
+    lazy = step.fields.lazy('T')
+    assert 'T' not in step.fields._data
+    assert lazy.meta == step.fields['T'].meta
+    temp = step.fields['T'].values
+    del step.fields['T']
+    assert lazy.values.shape == temp.shape
+    assert (lazy.values[:, 0, 3] == temp[:, 0, 3]).all()
+    assert (np.asarray(lazy.values) == temp).all()
+    assert np.isclose(lazy.values.mean(), temp.mean())
+    assert lazy.values.max() == temp.max()
+    hist, _ = lazy.values.histogram(5, (0, 1))
+    assert (hist == np.histogram(temp, 5, (0, 1))[0]).all()
+    assert 'T' not in step.fields._data
+
+
+def test_field_lazy_missing(step):
+    with pytest.raises(stagpy.error.MissingDataError):
+        step.fields.lazy('rsc')
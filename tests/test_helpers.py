@@ -1,3 +1,4 @@
+import numpy as np
 import stagpy
 import stagpy._helpers
 
@@ -28,3 +29,14 @@ def test_baredoc():
 def test_list_of_vars():
     expected = [[['a', 'b'], ['c', 'd', 'e']], [['f', 'g'], ['h']]]
     assert stagpy._helpers.list_of_vars('a,b..c,d,,,e-f,g.h-,..,-') == expected
+
+
+def test_growing_array():
+    arr = stagpy._helpers.GrowingArray(np.arange(3))
+    first = arr.values
+    arr.append(np.arange(3, 10))
+    assert (arr.values == np.arange(10)).all()
+    arr.truncate(4)
+    arr.append(np.array([0.5]))
+    assert (arr.values == [0, 1, 2, 3, 0.5]).all()
+    assert (first == np.arange(3)).all()
@@ -1,5 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import pathlib
+import h5py
+import numpy as np
+import pytest
 from stagpy import stagyyparsers as prs
+import stagpy._index
+from stagpy.error import ParsingError
 
 
 def test_time_series_prs(sdat):
@@ -9,6 +16,56 @@ def test_time_series_prs(sdat):
     assert (data.columns[3:] == list(map(str, range(data.shape[1] - 3)))).all()
 
 
+def test_time_series_restart_prs(tmp_path):
+    timefile = tmp_path / 'time.dat'
+    lines = [f'{istep} {val}' for istep, val in
+             [(0, 0.), (1, 1.), (2, 2.), (3, 3.), (2, 4.), (3, 5.), (4, 6.),
+              (1, 7.), (2, 8.)]]
+    timefile.write_text('istep a\n' + '\n'.join(lines) + '\n')
+    data = prs.time_series(timefile, ['a'])
+    assert list(data.index) == [0, 1, 2]
+    assert list(data['a']) == [0., 7., 8.]
+
+
+def test_time_series_h5_restart_prs(tmp_path):
+    timefile = tmp_path / 'TimeSeries.h5'
+    # restarted from step 2 while steps 3 and 4 were written, then from
+    # step 1 before step 3 was reached again
+    rows = [(0, 0.), (1, 1.), (2, 2.), (3, 3.), (4, 4.), (2, 5.), (3, 6.),
+            (1, 7.), (2, 8.)]
+    with h5py.File(timefile, 'w') as h5f:
+        h5f['tseries'] = np.array(rows)
+        h5f['names'] = np.array([b'istep', b'a'])
+    data = prs.time_series_h5(timefile, ['a'])
+    # lines superseded by a restart are dropped even where the time steps
+    # are not duplicated, leaving increasing time steps from the last run
+    assert list(data.index) == [0, 1, 2]
+    assert list(data['a']) == [0., 7., 8.]
+
+
+def test_time_series_malformed_prs(tmp_path):
+    timefile = tmp_path / 'time.dat'
+    timefile.write_text('istep a b\n0 1.0E+00 2.0\n1 1.0-100 3.0\n'
+                        '2 2.0 *****\nx 1.0 1.0\n3 1.5+100 4.0\n')
+    data = prs.time_series(timefile, ['a', 'b'])
+    assert list(data.index) == [0, 1, 2, 3]
+    assert list(data['a']) == [1., 1e-100, 2., 1.5e100]
+    assert data['b'].isna().sum() == 1
+
+
+def test_time_series_chunk_prs(tmp_path):
+    timefile = tmp_path / 'time.dat'
+    timefile.write_text('istep a\n0 0.0\n1 1.')
+    data, end = prs.time_series_chunk(timefile, ['a'])
+    assert list(data.index) == [0]
+    with timefile.open('a') as fid:
+        fid.write('0\n2 2.0\n')
+    data, end = prs.time_series_chunk(timefile, ['a'], end)
+    assert list(data.index) == [1, 2]
+    assert list(data['a']) == [1., 2.]
+    assert prs.time_series_chunk(timefile, ['a'], end) == (None, end)
+
+
 def test_time_series_invalid_prs():
     assert prs.time_series(pathlib.Path('dummy'), []) is None
 
@@ -21,6 +78,54 @@ def test_rprof_prs(sdat):
                for df in data.values())
 
 
+def test_rprof_lazy_prs(sdat):
+    data, time = prs.rprof(sdat.filename('rprof.dat'), [])
+    assert not data._data
+    istep = time.index[-1]
+    assert data[istep].shape[0] == sdat.snaps[-1].geom.nztot
+    assert list(data._data) == [istep]
+
+
+def test_rprof_restart_prs(tmp_path):
+    rproffile = tmp_path / 'rprof.dat'
+    blocks = [(0, 0.), (10, 1.), (20, 2.), (10, 1.5), (30, 3.)]
+    rproffile.write_text(''.join(
+        f'***step: {istep} ; time = {time}\n1.0 {time}\n2.0 {time}\n'
+        for istep, time in blocks))
+    data, time = prs.rprof(rproffile, ['r', 'a'])
+    assert list(data) == list(time.index) == [0, 10, 30]
+    assert list(data[10]['a']) == [1.5, 1.5]
+
+
+def test_rprof_array_prs(tmp_path):
+    rproffile = tmp_path / 'rprof.dat'
+    blocks = [(0, 0., 3), (10, 1., 2), (20, 2., 2), (10, 1.5, 2)]
+    rproffile.write_text(''.join(
+        f'***step: {istep} ; time = {time}\n' +
+        ''.join(f'{iz}.0 {time}\n' for iz in range(nz))
+        for istep, time, nz in blocks))
+    data, _ = prs.rprof(rproffile, ['r'])
+    isteps, profs, names = prs.rprof_array(data)
+    assert list(isteps) == [0, 10]
+    assert names == ['r', '0']
+    assert profs.shape == (2, 3, 2)
+    assert (profs[1, :2, 1] == 1.5).all()
+    assert np.isnan(profs[1, 2]).all()
+
+
+def test_rprof_refresh_prs(tmp_path):
+    rproffile = tmp_path / 'rprof.dat'
+    rproffile.write_text('***step: 0 ; time = 0.0\n1.0 0.0\n'
+                         '***step: 10 ; time = 1.0\n1.0 1.0\n2.')
+    data, _ = prs.rprof(rproffile, ['r', 'a'])
+    assert list(data[10]['r']) == [1.0]
+    with rproffile.open('a') as fid:
+        fid.write('0 1.0\n***step: 5 ; time = 0.5\n1.0 0.5\n')
+    assert data.refresh() == 1
+    assert list(data) == [0, 5]
+    assert list(data.times.index) == [0, 5]
+
+
 def test_rprof_invalid_prs():
     assert prs.rprof(pathlib.Path('dummy'), []) == ({}, None)
 
@@ -44,3 +149,324 @@ def test_fields_istep_prs(sdat):
 
 def test_fields_invalid_prs():
     assert prs.fields(pathlib.Path('dummy')) is None
+
+
+def test_legacy_field_file_blocks(sdat):
+    fieldmap = prs.LegacyFieldFile(sdat.filename('vp', len(sdat.snaps) - 1))
+    flds = fieldmap.assemble()
+    for icpu in fieldmap.subdomains():
+        block = fieldmap.block(icpu)
+        assert not block.flags.writeable
+        assert block.shape[0] == fieldmap.nval == flds.shape[0]
+
+
+def test_legacy_field_file_truncated(sdat, tmp_path):
+    fieldfile = sdat.filename('t', len(sdat.snaps) - 1)
+    truncated = tmp_path / fieldfile.name
+    truncated.write_bytes(fieldfile.read_bytes()[:-4])
+    with pytest.raises(ParsingError):
+        prs.LegacyFieldFile(truncated)
+
+
+def test_fields_ivars_prs(sdat):
+    fieldfile = sdat.filename('vp', len(sdat.snaps) - 1)
+    _, flds = prs.fields(fieldfile)
+    _, flds_p = prs.fields(fieldfile, ivars=[3])
+    assert flds_p.shape == (1,) + flds.shape[1:]
+    assert (flds_p[0] == flds[3]).all()
+
+
+XDMF = """<?xml version="1.0" ?>
+<Xdmf Version="2.0"><Domain>
+<Grid GridType="Collection" CollectionType="Temporal">
+<Grid Name="Snapshot 0" GridType="Collection" CollectionType="Spatial">
+<Time Value="0.5" />
+<Grid Name="meshYin_00001" GridType="Uniform">
+<Geometry GeometryType="X_Y_Z">
+<DataItem Dimensions="3 2 2">NodeCoordinates_00001.h5:/X</DataItem>
+</Geometry>
+<Attribute Name="Temperature" Center="Cell">
+<DataItem Dimensions="2 1 1">Temperature_00000_00000.h5:/Temperature_00001_00000</DataItem>
+</Attribute>
+<Attribute Name="Viscosity" Center="Cell"></Attribute>
+</Grid>
+</Grid>
+</Grid>
+</Domain></Xdmf>
+"""  # noqa: E501
+
+
+def test_tracers_prs(tmp_path):
+    # 32 bits tracers file with 3 blocks and 3 attributes
+    ints = partial(np.array, dtype='i4')
+    floats = partial(np.array, dtype='f4')
+    header = [ints([103]), floats([1, 1]), ints([0]), floats([0]), ints([3]),
+              ints([4, 0, 2]), floats([1]), ints([0])]
+    infos = [b'x'.ljust(16), b'Type'.ljust(16), b'Mass'.ljust(16)]
+    data = np.random.default_rng(0).random((6, 3)).astype('f4')
+    trafile = tmp_path / 'test_tra00000'
+    trafile.write_bytes(b''.join(arr.tobytes() for arr in header) +
+                        b''.join(infos) + data.tobytes())
+    tra = prs.tracers(trafile)
+    assert list(tra) == ['x', 'Type', 'Mass']
+    assert [len(block) for block in tra['Type']] == [4, 0, 2]
+    assert (np.concatenate(tra['Type']) == data[:, 1]).all()
+    part = prs.tracers(trafile, names=['Mass', 'y'], memmap=True)
+    assert list(part) == ['Mass']
+    assert (np.concatenate(part['Mass']) == data[:, 2]).all()
+    assert not part['Mass'][0].flags.writeable
+    most = prs.tracers(trafile, names=['Mass', 'x'])
+    assert list(most) == ['x', 'Mass']
+    assert (np.concatenate(most['x']) == data[:, 0]).all()
+    assert (np.concatenate(most['Mass']) == data[:, 2]).all()
+    assert most['x'][0].base.dtype.names == ('x', 'Mass')
+    trafile.write_bytes(trafile.read_bytes()[:-4])
+    with pytest.raises(ParsingError):
+        prs.tracers(trafile)
+
+
+def test_tracers_invalid_prs():
+    assert prs.tracers(pathlib.Path('dummy')) is None
+
+
+def test_xdmf_index_prs(tmp_path):
+    xdmf_file = tmp_path / 'Data.xmf'
+    xdmf_file.write_text(XDMF)
+    xdmf = prs.XdmfIndex.parse(xdmf_file)
+    snap = xdmf.snap(0)
+    assert snap.time == 0.5
+    assert snap.mo_lambda is None
+    (name, grid), = xdmf.grids(0)
+    assert name == 'meshYin_00001'
+    assert grid.geometry == [
+        prs.XdmfItem('3 2 2', 'NodeCoordinates_00001.h5:/X')]
+    assert grid.attributes['Temperature'].dims == '2 1 1'
+    assert grid.attributes['Viscosity'] is None
+    with pytest.raises(ParsingError):
+        xdmf.snap(1)
+    header = {'nts': np.array([1, 1, 2]), 'ncs': np.ones(3, dtype=int),
+              'ntb': 1, 'rcmb': -1}
+    with pytest.raises(ParsingError):
+        prs.read_field_h5(xdmf_file, 'Viscosity', 0, header, xdmf=xdmf)
+
+
+def test_xdmf_index_reloaded(tmp_path, monkeypatch):
+    xdmf_file = tmp_path / 'Data.xmf'
+    xdmf_file.write_text(XDMF)
+    xdmf = stagpy._index.xdmf_index(xdmf_file, tmp_path / 'index.json')
+    with monkeypatch.context() as mpc:
+        mpc.setattr(prs.XdmfIndex, 'parse', None)
+        reloaded = stagpy._index.xdmf_index(xdmf_file,
+                                            tmp_path / 'index.json')
+    assert reloaded.snaps == xdmf.snaps
+    xdmf_file.write_text(XDMF.replace('0.5', '1.5'))
+    reloaded = stagpy._index.xdmf_index(xdmf_file, tmp_path / 'index.json')
+    assert reloaded.snap(0).time == 1.5
+
+
+def test_xdmf_index_concurrent_writers(tmp_path):
+    xdmf_file = tmp_path / 'Data.xmf'
+    xdmf_file.write_text(XDMF)
+    index_file = tmp_path / 'index' / 'index.json'
+    with ThreadPoolExecutor(8) as pool:
+        indices = list(pool.map(
+            lambda _: stagpy._index.xdmf_index(xdmf_file, index_file),
+            range(32)))
+    assert all(xdmf.snaps == indices[0].snaps for xdmf in indices)
+    assert list(index_file.parent.iterdir()) == [index_file]
+
+
+def _xdmf_snaps(nsnaps, partial=''):
+    """XDMF document with several copies of the snapshot of XDMF."""
+    head, snap = XDMF.split('<Grid Name="Snapshot 0"')
+    snap, tail = snap.rsplit('</Grid>', 1)
+    snap = '<Grid Name="Snapshot 0"' + snap
+    snaps = ''.join(snap.replace('0.5', f'{isnap}.5')
+                    for isnap in range(nsnaps))
+    return head + snaps + partial + '</Grid>' + tail
+
+
+def test_xdmf_index_extend_prs(tmp_path, monkeypatch):
+    xdmf_file = tmp_path / 'Data.xmf'
+    xdmf_file.write_text(_xdmf_snaps(1))
+    xdmf = prs.XdmfIndex.parse(xdmf_file)
+    # snapshots appended before the closing tags, the last one incomplete
+    xdmf_file.write_text(_xdmf_snaps(3)[:-60])
+    with monkeypatch.context() as mpc:
+        mpc.setattr(prs.XdmfIndex, 'parse', None)
+        xdmf.extend()
+    assert [snap.time for snap in xdmf.snaps] == [0.5, 1.5]
+    xdmf_file.write_text(_xdmf_snaps(3))
+    with monkeypatch.context() as mpc:
+        mpc.setattr(prs.XdmfIndex, 'parse', None)
+        xdmf.extend()
+        xdmf.extend()
+    assert xdmf.snaps == prs.XdmfIndex.parse(xdmf_file).snaps
+    assert xdmf.resume == prs.XdmfIndex.parse(xdmf_file).resume
+    # indexed part changed, the document is parsed again
+    xdmf_file.write_text(_xdmf_snaps(2).replace('Version="2.0"', 'V="3"'))
+    xdmf.extend()
+    assert [snap.time for snap in xdmf.snaps] == [0.5, 1.5]
+
+
+def test_xdmf_index_reloaded_extended(tmp_path, monkeypatch):
+    xdmf_file = tmp_path / 'Data.xmf'
+    xdmf_file.write_text(_xdmf_snaps(1))
+    stagpy._index.xdmf_index(xdmf_file, tmp_path / 'index.json')
+    xdmf_file.write_text(_xdmf_snaps(2))
+    with monkeypatch.context() as mpc:
+        mpc.setattr(prs.XdmfIndex, 'parse', None)
+        xdmf = stagpy._index.xdmf_index(xdmf_file, tmp_path / 'index.json')
+        reloaded = stagpy._index.xdmf_index(xdmf_file,
+                                            tmp_path / 'index.json')
+    assert [snap.time for snap in xdmf.snaps] == [0.5, 1.5]
+    assert reloaded.snaps == xdmf.snaps
+
+
+def test_xdmf_index_truncated_prs(tmp_path):
+    xdmf_file = tmp_path / 'Data.xmf'
+    xdmf_file.write_text(XDMF[:-30])
+    with pytest.raises(ParsingError):
+        prs.XdmfIndex.parse(xdmf_file)
+
+
+def test_xdmf_index_snaps_prs(tmp_path):
+    xdmf_file = tmp_path / 'Data.xmf'
+    head, snap = XDMF.split('<Grid Name="Snapshot 0"')
+    snap, tail = snap.rsplit('</Grid>', 1)
+    snap = '<Grid Name="Snapshot 0"' + snap
+    xdmf_file.write_text(head + snap + snap.replace('0.5', '1.5') +
+                         '</Grid>' + tail)
+    xdmf = prs.XdmfIndex.parse(xdmf_file)
+    assert [snap.time for snap in xdmf.snaps] == [0.5, 1.5]
+    assert all(len(snap.grids) == 1 for snap in xdmf.snaps)
+
+
+def test_h5_file_pool(tmp_path):
+    paths = [tmp_path / f'file{i}.h5' for i in range(3)]
+    for i, path in enumerate(paths):
+        with h5py.File(path, 'w') as h5f:
+            h5f['data'] = [i]
+    with prs.H5FilePool(max_open=2) as pool:
+        with pool.open(paths[0]) as h5f0:
+            with pool.open(paths[1]) as h5f1:
+                assert h5f1['data'][0] == 1
+            with pool.open(paths[2]) as h5f2:
+                assert h5f2['data'][0] == 2
+            assert not h5f1  # least recently used idle file is closed
+            assert h5f0['data'][0] == 0  # files in use are not closed
+        with pool.open(paths[2]) as h5f:
+            assert h5f is h5f2
+    assert not h5f0 and not h5f2
+
+
+def test_read_field_h5_box(tmp_path):
+    temp = np.arange(4 * 2 * 3, dtype=float).reshape((4, 2, 3))
+    grids = []
+    with h5py.File(tmp_path / 'T.h5', 'w') as h5f:
+        for icore in range(2):
+            group = f'Temperature_{icore + 1:05d}_00000'
+            h5f[group] = temp[2 * icore:2 * icore + 2].T
+            grids.append(
+                f'<Grid Name="meshYin_{icore + 1:05d}">'
+                '<Attribute Name="Temperature">'
+                f'<DataItem Dimensions="3 2 2">T.h5:/{group}</DataItem>'
+                '</Attribute></Grid>')
+    xdmf_file = tmp_path / 'Data.xmf'
+    xdmf_file.write_text(
+        '<Xdmf><Domain><Grid><Grid Name="Snapshot 0">' + ''.join(grids) +
+        '</Grid></Grid></Domain></Xdmf>')
+    header = {'nts': np.array([4, 2, 3]), 'ncs': np.array([2, 1, 1]),
+              'ntb': 1, 'rcmb': -1}
+    for box in [(slice(1, 3), slice(None), slice(None, None, -2)),
+                (slice(0, 1), slice(1, 2), slice(2, 3)),
+                (slice(3, 3), slice(None), slice(None))]:
+        _, flds = prs.read_field_h5(xdmf_file, 'Temperature', 0, header,
+                                    box=box)
+        assert (flds[0, ..., 0] == temp[box]).all()
+        assert flds.shape[1:4] == temp[box].shape
+    _, flds = prs.read_field_h5(xdmf_file, 'Temperature', 0, header,
+                                box=(slice(None),) * 3 + (slice(1, 2),))
+    assert flds.shape == (1, 4, 2, 3, 0)
+
+
+def test_read_tracers_h5(tmp_path):
+    mass = np.arange(5.)
+    grids = []
+    with h5py.File(tmp_path / 'Tra.h5', 'w') as h5f, \
+            h5py.File(tmp_path / 'Pos.h5', 'w') as h5p:
+        # subdomains are not listed in the order of cores
+        for icore, (start, stop) in [(1, (3, 5)), (0, (0, 3))]:
+            suffix = f'_{icore + 1:05d}_00000'
+            h5f['Mass' + suffix] = mass[start:stop]
+            for axis in 'xyz':
+                h5p[axis + suffix] = -mass[start:stop]
+            geom = ''.join(
+                f'<DataItem Dimensions="{stop - start}">'
+                f'Pos.h5:/{axis}{suffix}</DataItem>' for axis in 'xyz')
+            grids.append(
+                f'<Grid Name="meshYin_{icore + 1:05d}">'
+                f'<Geometry>{geom}</Geometry><Attribute Name="Mass">'
+                f'<DataItem Dimensions="{stop - start}">Tra.h5:/Mass{suffix}'
+                '</DataItem></Attribute></Grid>')
+    xdmf_file = tmp_path / 'DataTracers.xmf'
+    xdmf_file.write_text(
+        '<Xdmf><Domain><Grid><Grid Name="Snapshot 0">' + ''.join(grids) +
+        '</Grid></Grid></Domain></Xdmf>')
+    tra = prs.read_tracers_h5(xdmf_file, ['Mass', 'y', 'Type'], 0)
+    assert sorted(tra) == ['Mass', 'y']
+    assert len(tra['Mass']) == 1
+    assert (tra['Mass'][0] == mass).all()
+    assert (tra['y'][0] == -mass).all()
+    # positions are not read unless requested
+    (tmp_path / 'Pos.h5').unlink()
+    tra = prs.read_tracers_h5(xdmf_file, ['Mass'], 0)
+    assert list(tra) == ['Mass']
+
+
+def test_read_tracers_h5_missing_block(tmp_path):
+    mass = np.arange(3.)
+    with h5py.File(tmp_path / 'Tra.h5', 'w') as h5f:
+        # only the yang block, whose datasets are named <var>2XXXXX_YYYYY
+        h5f['Mass200001_00000'] = mass
+    xdmf_file = tmp_path / 'DataTracers.xmf'
+    xdmf_file.write_text(
+        '<Xdmf><Domain><Grid><Grid Name="Snapshot 0">'
+        '<Grid Name="meshYin_00001"><Attribute Name="Mass">'
+        '<DataItem Dimensions="3">Tra.h5:/Mass200001_00000</DataItem>'
+        '</Attribute></Grid></Grid></Grid></Domain></Xdmf>')
+    tra = prs.read_tracers_h5(xdmf_file, ['Mass'], 0)
+    assert len(tra['Mass']) == 2
+    assert tra['Mass'][0].size == 0
+    assert (tra['Mass'][1] == mass).all()
+
+
+def test_subdomain_edges():
+    header = {'nts': np.array([8, 6, 4]), 'ncs': np.array([2, 3, 1]),
+              'ntb': 2, 'xyp': 1}
+    edges = prs.subdomain_edges(header)
+    assert [list(edge) for edge in edges] == [
+        [0, 4, 9], [0, 2, 4, 7], [0, 4], [0, 1, 2]]
+    edges = prs.subdomain_edges({**header, 'ncb': 1})
+    assert list(edges[3]) == [0, 2]
+
+
+def test_fields_box_prs(tmp_path):
+    # 3D legacy file of a vector field split in 2x3x2 subdomains
+    nts, ncs = (8, 6, 4), (2, 3, 2)
+    ints = partial(np.array, dtype='i4')
+    floats = partial(np.array, dtype='f4')
+    header = [ints([409]), ints(nts), ints([1]), floats([1, 1]), ints(ncs),
+              ints([1]), floats(range(2 * nts[2] + 1)), floats([-1]),
+              ints([0]), floats([0, 0, 1]), floats(range(nts[0])),
+              floats(range(nts[1])), floats(range(nts[2])), floats([2])]
+    data = np.random.default_rng(0).random((1, 2, 3, 2, 1, 2, 3, 5, 4))
+    fieldfile = tmp_path / 'test_vp00000'
+    fieldfile.write_bytes(b''.join(arr.tobytes() for arr in header) +
+                          data.astype('f4').tobytes())
+    _, flds = prs.fields(fieldfile)
+    for box in [(slice(3, 4),), (slice(1, 8, 2), slice(None, None, -1),
+                                 slice(2, 3)), (slice(2, 2),)]:
+        _, part = prs.fields(fieldfile, ivars=[3], box=box)
+        assert (part == flds[3:][(slice(None), *box)]).all()
+        assert part.shape == flds[3:][(slice(None), *box)].shape
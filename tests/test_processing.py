@@ -1,4 +1,8 @@
+import shutil
+import pytest
 from stagpy import processing, phyvars
+from stagpy.error import MissingDataError
+from stagpy.stagyydata import StagyyData
 
 
 def tseries_checks(tseries, expected_size):
@@ -19,6 +23,29 @@ def test_ebalance(sdat):
     tseries_checks(processing.ebalance(sdat), sdat.tseries.time.shape[0] - 1)
 
 
+def test_mobility(sdat):
+    mob = processing.mobility(sdat)
+    tseries_checks(mob, sdat.rprofs_array.isteps.size)
+    step = sdat.steps[sdat.rprofs_array.isteps[-1]]
+    assert mob.values[-1] == pytest.approx(
+        step.rprofs['vrms'].values[-1] / step.timeinfo['vrms'])
+    assert mob.time[-1] == step.timeinfo['t']
+
+
+def test_mobility_missing_step(repo_dir, tmp_path):
+    run = tmp_path / 'run'
+    shutil.copytree(repo_dir / 'Examples' / 'ra-100000', run)
+    timefile = run / 'Op' / 'out_time.dat'
+    lines = timefile.read_text().splitlines(keepends=True)
+    # drop step 200, which has radial profiles
+    timefile.write_text(''.join(
+        line for line in lines if line.split()[0] != '200'))
+    sdat = StagyyData(run)
+    assert 200 in sdat.rprofs_array.isteps
+    with pytest.raises(MissingDataError):
+        processing.mobility(sdat)
+
+
 def test_r_edges(step):
     assert step.rprofs.walls.shape == (step.geom.nztot + 1,)
 
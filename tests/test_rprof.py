@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 import stagpy.error
 import stagpy.rprof
@@ -31,3 +32,25 @@ def test_get_rprof_extra(step):
     assert rad is step.rprofs.walls
     assert prof.shape == rad.shape
     assert isinstance(meta, stagpy.phyvars.Varr)
+
+
+def test_rprofs_averaged(sdat):
+    rprofs = sdat.steps[:].rprofs_averaged
+    steps = list(sdat.steps.filter(rprofs=True))
+    profs = [step.rprofs['Tmean'].values for step in steps]
+    assert np.allclose(rprofs['Tmean'].values, np.mean(profs, axis=0))
+    pmin, pmax = rprofs.percentiles(['Tmean'], [0, 100])['Tmean']
+    assert (pmin.values == np.min(profs, axis=0)).all()
+    assert (pmax.values == np.max(profs, axis=0)).all()
+
+
+def test_rprofs_averaged_time_weighted(sdat):
+    rprofs = sdat.steps[:].rprofs_averaged
+    rprofs.time_weighted = True
+    time = sdat.rtimes.values[:, 0]
+    weights = np.gradient(time)
+    weights[[0, -1]] /= 2
+    profs = [step.rprofs['Tmean'].values
+             for step in sdat.steps.filter(rprofs=True)]
+    assert np.allclose(rprofs['Tmean'].values,
+                       np.average(profs, axis=0, weights=weights))
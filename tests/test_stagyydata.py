@@ -1,7 +1,12 @@
+import pathlib
+import re
+import shutil
+import numpy as np
 import pytest
 import f90nml
 import pandas
 import stagpy.stagyydata
+import stagpy._index
 import stagpy._step
 import stagpy.error
 
@@ -11,7 +16,7 @@ def test_sdat_path(example_dir, sdat):
 
 
 def test_sdat_deflt_nfields_max(sdat):
-    assert sdat.nfields_max == 50
+    assert sdat.nfields_max is None
 
 
 def test_sdat_set_nfields_max(sdat):
@@ -30,6 +35,34 @@ def test_sdat_set_nfields_max_invalid(sdat):
     assert err.value.nfields == 5
 
 
+def test_fields_cache_lru(example_dir):
+    sdat = stagpy.stagyydata.StagyyData(example_dir)
+    step = sdat.snaps[-1]
+    fld_t = step.fields['T']
+    sdat.fields_cache.bytes_max = fld_t.values.nbytes
+    assert step.fields['T'] is fld_t
+    assert sdat.fields_cache.hits == 1
+    step.fields['v3']
+    assert 'T' not in step.fields._data
+    assert sdat.fields_cache.misses == 2
+    assert sdat.fields_cache.evictions == 1
+    assert sdat.fields_cache.nbytes == step.fields['v3'].values.nbytes
+    sdat.fields_cache.clear()
+    assert not step.fields._data
+    assert sdat.fields_cache.nbytes == 0
+
+
+def test_sdat_dtype(example_dir):
+    sdat = stagpy.stagyydata.StagyyData(example_dir, dtype='float32')
+    step = sdat.snaps[-1]
+    temp = step.fields['T'].values
+    assert sdat.fields_cache.nbytes == temp.size * 4
+    assert temp.dtype == step.fields['stream'].values.dtype == 'float32'
+    ref = stagpy.stagyydata.StagyyData(example_dir).snaps[-1].fields['T']
+    assert ref.values.dtype == 'float64'
+    assert (temp == ref.values.astype('float32')).all()
+
+
 def test_sdat_par(sdat):
     assert isinstance(sdat.par, f90nml.namelist.Namelist)
 
@@ -67,6 +100,115 @@ def test_filter_even_steps(sdat):
     assert sdat.steps[::2] == even
 
 
+def test_prefetch_snaps(example_dir):
+    sdat = stagpy.stagyydata.StagyyData(example_dir)
+    view = sdat.snaps[:].prefetch(['T', 'v3'], ahead=2)
+    for step in view:
+        assert 'T' in step.fields._data
+    assert list(view) == list(sdat.snaps)
+    assert sdat.fields_cache.hits == 0
+
+
+def test_rprofs_array(sdat):
+    rprofs = sdat.rprofs_array
+    step = sdat.steps[rprofs.isteps[-1]]
+    assert rprofs.values.shape[:2] == (len(rprofs.isteps), step.geom.nztot)
+    assert (rprofs['Tmean'][-1] == step.rprofs['Tmean'].values).all()
+    assert rprofs.index(step.istep) == len(rprofs.isteps) - 1
+
+
+def test_rprofs_array_unknown(sdat):
+    with pytest.raises(stagpy.error.UnknownRprofVarError):
+        sdat.rprofs_array['InvalidRprof']
+
+
+def test_refresh(repo_dir, tmp_path):
+    run = tmp_path / 'run'
+    shutil.copytree(repo_dir / 'Examples' / 'ra-100000', run)
+    timefile = run / 'Op' / 'out_time.dat'
+    content = timefile.read_bytes()
+    timefile.write_bytes(content[:len(content) // 2])
+    sdat = stagpy.stagyydata.StagyyData(run)
+    nsteps = len(sdat.steps)
+    assert not sdat.refresh()
+    timefile.write_bytes(content)
+    assert sdat.refresh()
+    assert len(sdat.steps) > nsteps
+    ref = stagpy.stagyydata.StagyyData(run)
+    assert sdat.tseries._tseries.equals(ref.tseries._tseries)
+
+
+def test_refresh_restart(repo_dir, tmp_path):
+    run = tmp_path / 'run'
+    shutil.copytree(repo_dir / 'Examples' / 'ra-100000', run)
+    timefile = run / 'Op' / 'out_time.dat'
+    lines = timefile.read_bytes().splitlines(keepends=True)
+    timefile.write_bytes(b''.join(lines[:600]))
+    sdat = stagpy.stagyydata.StagyyData(run)
+    tseries = sdat.tseries._tseries
+    # run restarted from an earlier time step
+    with timefile.open('ab') as fid:
+        fid.writelines(lines[400:])
+    assert sdat.refresh()
+    ref = stagpy.stagyydata.StagyyData(run)
+    assert sdat.tseries._tseries.equals(ref.tseries._tseries)
+    assert len(tseries) == 599
+
+
+def test_refresh_rprofs_array(repo_dir, tmp_path):
+    run = tmp_path / 'run'
+    shutil.copytree(repo_dir / 'Examples' / 'ra-100000', run)
+    rproffile = run / 'Op' / 'out_rprof.dat'
+    content = rproffile.read_bytes()
+    blocks = re.split(rb'(?m)^(?=\*)', content)[1:]
+    rproffile.write_bytes(b''.join(blocks[:3]))
+    sdat = stagpy.stagyydata.StagyyData(run)
+    values = sdat.rprofs_array.values
+    assert len(values) == 3
+    # new profiles, then a restart from the second profile
+    rproffile.write_bytes(content + b''.join(blocks[1:]))
+    assert sdat.refresh()
+    ref = stagpy.stagyydata.StagyyData(run)
+    assert (sdat.rprofs_array.isteps == ref.rprofs_array.isteps).all()
+    assert np.array_equal(sdat.rprofs_array.values, ref.rprofs_array.values,
+                          equal_nan=True)
+    assert len(values) == 3
+
+
+def test_refresh_snaps(repo_dir, tmp_path, monkeypatch):
+    run = tmp_path / 'run'
+    shutil.copytree(repo_dir / 'Examples' / 'ra-100000', run)
+    hidden = tmp_path / 'hidden'
+    hidden.mkdir()
+    for binfile in run.glob('Op/out_*00005'):
+        binfile.rename(hidden / binfile.name)
+    sdat = stagpy.stagyydata.StagyyData(run)
+    assert len(sdat.snaps) == 5
+    for binfile in hidden.iterdir():
+        binfile.rename(run / 'Op' / binfile.name)
+    # only new snapshot numbers are probed, the directory is not rescanned
+    monkeypatch.setattr(pathlib.Path, 'iterdir', None)
+    assert sdat.refresh()
+    assert len(sdat.snaps) == 6
+    assert sdat.snaps[5].fields['T'].values.shape == \
+        sdat.snaps[4].fields['T'].values.shape
+
+
+def test_tracers_positions_read_together(sdat, monkeypatch):
+    calls = []
+
+    def tracers(tracersfile, names):
+        calls.append(names)
+        return {name: [np.zeros(2)] for name in names if name != 'y'}
+    monkeypatch.setattr(stagpy.stagyyparsers, 'tracers', tracers)
+    step = sdat.snaps[-1]
+    assert step.tracers['x'][0].shape == (2,)
+    assert step.tracers['y'] is None
+    assert step.tracers['z'][0].shape == (2,)
+    step.tracers['Type']
+    assert calls == [['x', 'y', 'z'], ['Type']]
+
+
 def test_snaps_last(sdat):
     assert sdat.snaps[-1] is sdat.snaps[len(sdat.snaps) - 1]
 
@@ -76,11 +218,32 @@ def test_snaps_empty(sdat):
         sdat.snaps[len(sdat.snaps)]
 
 
+def test_snap_index_reloaded(sdat, tmp_path, monkeypatch):
+    isnap = len(sdat.snaps) - 1
+    binfiles = sdat._binfiles_set(isnap)
+    index = stagpy._index.SnapIndex(tmp_path / 'index.json')
+    entry = index.entry(isnap, binfiles)
+    assert entry['istep'] == sdat.snaps[-1].istep
+    index.save()
+    monkeypatch.setattr(stagpy.stagyydata.stagyyparsers, 'field_header',
+                        None)
+    index = stagpy._index.SnapIndex(tmp_path / 'index.json')
+    assert index.entry(isnap, binfiles) == entry
+
+
 def test_step_is_snap(sdat):
     istep = sdat.snaps[-1].istep
     assert sdat.steps[istep] is sdat.snaps[-1]
 
 
+def test_step_isnap_bisect(example_dir):
+    sdat = stagpy.stagyydata.StagyyData(example_dir)
+    istep = sdat.steps[-1].istep
+    view = sdat.steps[istep - 1:].filter(snap=True)
+    assert [step.isnap for step in view] == [len(sdat.snaps) - 1]
+    assert sdat.steps[istep - 1].isnap is None
+
+
 def test_step_sdat(sdat):
     assert all(s.sdat is sdat for s in sdat.steps)
 
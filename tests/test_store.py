@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import stagpy.error
+import stagpy.stagyydata
+import stagpy.store
+
+
+@pytest.fixture(scope='module', params=['h5', 'npy'])
+def sdat_store(request, sdat, tmp_path_factory):
+    dest = tmp_path_factory.mktemp('store') / 'run'
+    stagpy.store.convert(sdat, dest, request.param)
+    return stagpy.stagyydata.StagyyData(dest)
+
+
+def test_is_store(sdat, sdat_store):
+    assert stagpy.store.is_store(sdat_store._store.path)
+    assert not stagpy.store.is_store(sdat.path)
+
+
+def test_store_par(sdat, sdat_store):
+    assert sdat_store.par == sdat.par
+    assert sdat_store.hdf5 is None
+
+
+def test_store_tseries(sdat, sdat_store):
+    assert np.array_equal(sdat_store.tseries['Tmean'].values,
+                          sdat.tseries['Tmean'].values)
+    assert np.array_equal(sdat_store.tseries.isteps, sdat.tseries.isteps)
+
+
+def test_store_rprofs(sdat, sdat_store):
+    assert sdat_store.rtimes.equals(sdat.rtimes)
+    istep = sdat.rtimes.index[-1]
+    assert np.array_equal(sdat_store.steps[istep].rprofs['Tmean'].values,
+                          sdat.steps[istep].rprofs['Tmean'].values)
+    assert sdat_store.rprofs_array.names == sdat.rprofs_array.names
+    assert np.array_equal(sdat_store.rprofs_array.values,
+                          sdat.rprofs_array.values, equal_nan=True)
+
+
+def test_store_snaps(sdat, sdat_store):
+    assert len(sdat_store.snaps) == len(sdat.snaps)
+    assert sdat_store.snaps[-1].istep == sdat.snaps[-1].istep
+    assert sdat_store.snaps[-1].time == sdat.snaps[-1].time
+
+
+def test_store_fields(sdat, sdat_store):
+    step, step_store = sdat.snaps[-1], sdat_store.snaps[-1]
+    assert np.array_equal(step_store.fields['T'].values,
+                          step.fields['T'].values)
+    assert np.array_equal(step_store.fields.sliced('T', iz=3).values,
+                          step.fields['T'].values[:, :, 3])
+    assert np.array_equal(step_store.geom.r_walls, step.geom.r_walls)
+
+
+def test_store_fields_missing(sdat_store):
+    with pytest.raises(stagpy.error.MissingDataError):
+        sdat_store.snaps[-1].fields['rs1']
+
+
+def test_convert_existing(sdat, tmp_path):
+    with pytest.raises(stagpy.error.StoreError):
+        stagpy.store.convert(sdat, tmp_path)
@@ -0,0 +1,35 @@
+import matplotlib.pyplot as plt
+import pytest
+import stagpy.error
+import stagpy.field
+import stagpy.watch
+
+
+@pytest.mark.parametrize('exc', [
+    stagpy.error.MissingDataError('partial'),
+    stagpy.error.ParsingError('file', 'file is too short'),
+    OSError('not there yet'),
+])
+def test_plot_new_snap_incomplete(sdat, monkeypatch, exc):
+    def plot_scalar(*args, **kwargs):
+        raise exc
+    monkeypatch.setattr(stagpy.field, 'plot_scalar', plot_scalar)
+    nfigs = len(plt.get_fignums())
+    assert stagpy.watch._plot_new_snap(sdat, [[['T']]], None) is None
+    # the figure is closed before trying again
+    assert len(plt.get_fignums()) == nfigs
+
+
+def test_plot_new_snap_unknown_var(sdat):
+    with pytest.raises(stagpy.error.UnknownFieldVarError):
+        stagpy.watch._plot_new_snap(sdat, [[['notavar']]], None)
+
+
+def test_plot_new_snap(sdat, monkeypatch):
+    plotted = []
+    monkeypatch.setattr(stagpy.field, '_plot_snap',
+                        lambda step, *args: plotted.append(step.isnap))
+    last = sdat.snaps[-1].isnap
+    assert stagpy.watch._plot_new_snap(sdat, [[['T']]], None) == last
+    assert stagpy.watch._plot_new_snap(sdat, [[['T']]], last) == last
+    assert plotted == [last]